@@ -1,56 +1,67 @@
-from pymongo import MongoClient
 import logging
 import os
-from dotenv import load_dotenv
+import sys
+from datetime import datetime, timezone
+from query_modeling import INDEX_PLAN, ensure_indexes
 
-def main():
-    # logging setup
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s"
-    )
-    load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import instrumentation, compact_encoding
 
-    MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in .env")
+WATERMARK_COL = "pipeline_watermarks"
+AGG_COL = "accidents_aggregated"
+STAGING_COL = "accidents_aggregated_staging"
 
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command("ping")
-    logging.info("Connected to MongoDB Atlas")
+# "full" = rebuild accidents_aggregated, "incremental" = fold in clean docs past the gold watermark
+RUN_MODE = os.getenv("RUN_MODE", "full")
+# "mongo" = aggregate accidents_clean in MongoDB, "parquet" = group the Parquet mirror with pyarrow
+# (parquet_mirror.py); the parquet backend always does a full rebuild
+READ_BACKEND = os.getenv("READ_BACKEND", "mongo")
 
-    db = client["bigdata_capstone"]
 
-    # Input data source 
-    clean_col = db["accidents_clean"]
+# ------------------------------------------------------------
+# AGGREGATION PIPELINE:
+#   Aggregate accident data by State and Severity
+#   Compute count, average distance, and average temperature.
+#   Sums and value counts are stored next to the averages so
+#   later deltas can be merged without rescanning.
+# ------------------------------------------------------------
+def numeric_count(field):
+    return {"$sum": {"$cond": [{"$isNumber": f"${field}"}, 1, 0]}}
 
-    # Output aggregated data
-    agg_col = db["accidents_aggregated"]
 
-    logging.info("Connected to MongoDB collections")
+# names maps the wide field names to the stored ones (compact_encoding.field_names);
+# the output keeps the wide names either way
+def build_pipeline(match_ids=None, names=None):
+    names = names or {}
+    state, severity, distance, temperature = (
+        names.get(field, field) for field in ["State", "Severity", "Distance(mi)", "Temperature(F)"]
+    )
+    match = {
+        state: {"$ne": None},
+        severity: {"$ne": None}
+    }
+    if match_ids:
+        match["_id"] = match_ids
+
+    return [
 
-    # ------------------------------------------------------------
-    # AGGREGATION PIPELINE:
-    #   Aggregate accident data by State and Severity
-    #   Compute count, average distance, and average temperature
-    # ------------------------------------------------------------
-    pipeline = [
-        
         {
-            "$match": {
-                "State": {"$ne": None},
-                "Severity": {"$ne": None}
-            }
+            "$match": match
         },
         {
             "$group": {
                 "_id": {
-                    "State": "$State",
-                    "Severity": "$Severity"
+                    "State": f"${state}",
+                    "Severity": f"${severity}"
                 },
                 "accident_count": {"$sum": 1},
-                "avg_distance": {"$avg": "$Distance(mi)"},
-                "avg_temperature": {"$avg": "$Temperature(F)"}
+                "avg_distance": {"$avg": f"${distance}"},
+                "avg_temperature": {"$avg": f"${temperature}"},
+                "distance_sum": {"$sum": f"${distance}"},
+                "distance_n": numeric_count(distance),
+                "temperature_sum": {"$sum": f"${temperature}"},
+                "temperature_n": numeric_count(temperature)
             }
         },
         {
@@ -60,7 +71,11 @@ def main():
                 "Severity": "$_id.Severity",
                 "accident_count": 1,
                 "avg_distance": 1,
-                "avg_temperature": 1
+                "avg_temperature": 1,
+                "distance_sum": 1,
+                "distance_n": 1,
+                "temperature_sum": 1,
+                "temperature_n": 1
             }
         },
         {
@@ -71,22 +86,245 @@ def main():
         }
     ]
 
-    logging.info("Starting aggregation pipeline")
 
-    # Execute aggregation
-    results = list(clean_col.aggregate(pipeline, allowDiskUse=True))
+# Same groups and fields as build_pipeline, computed from the Parquet mirror.
+# Only the four needed columns are read and null State partitions are pruned.
+def parquet_gold_results():
+    import pyarrow.compute as pc
+    from bson import ObjectId
+    from parquet_mirror import open_layer, read_manifest
 
-    logging.info(f"Aggregation completed. Records created: {len(results)}")
+    table = open_layer("accidents_clean").to_table(
+        columns=["State", "Severity", "Distance(mi)", "Temperature(F)"],
+        filter=pc.field("State").is_valid() & pc.field("Severity").is_valid()
+    )
+    grouped = table.group_by(["State", "Severity"]).aggregate([
+        ([], "count_all"),
+        ("Distance(mi)", "mean"), ("Distance(mi)", "sum"), ("Distance(mi)", "count"),
+        ("Temperature(F)", "mean"), ("Temperature(F)", "sum"), ("Temperature(F)", "count"),
+    ])
 
-    # Save aggregated data
-    logging.info("Saving aggregated data to accidents_aggregated collection")
+    results = [
+        {
+            "State": row["State"],
+            "Severity": row["Severity"],
+            "accident_count": row["count_all"],
+            "avg_distance": row["Distance(mi)_mean"],
+            "avg_temperature": row["Temperature(F)_mean"],
+            "distance_sum": row["Distance(mi)_sum"] or 0,
+            "distance_n": row["Distance(mi)_count"],
+            "temperature_sum": row["Temperature(F)_sum"] or 0,
+            "temperature_n": row["Temperature(F)_count"],
+        }
+        for row in grouped.to_pylist()
+    ]
+    results.sort(key=lambda r: (r["State"], r["Severity"]))
+    return results, ObjectId(read_manifest("accidents_clean")["last_id"])
+
+
+# ------------------------------------------------------------
+# STREAMING PARTIAL AGGREGATES:
+#   same groups and fields as build_pipeline, folded in one
+#   batch of clean documents at a time while the silver layer
+#   is still being written (pipeline/orchestrator.py)
+# ------------------------------------------------------------
+PARTIAL_FIELDS = ["accident_count", "distance_sum", "distance_n", "temperature_sum", "temperature_n"]
+
+
+def is_number(value):
+    # $isNumber: bools and None do not count
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class GoldPartials:
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, docs):
+        for doc in docs:
+            state, severity = doc.get("State"), doc.get("Severity")
+            if state is None or severity is None:
+                continue
+
+            group = self.groups.get((state, severity))
+            if group is None:
+                group = self.groups[(state, severity)] = dict.fromkeys(PARTIAL_FIELDS, 0)
+            group["accident_count"] += 1
+
+            distance = doc.get("Distance(mi)")
+            if is_number(distance):
+                group["distance_sum"] += distance
+                group["distance_n"] += 1
+            temperature = doc.get("Temperature(F)")
+            if is_number(temperature):
+                group["temperature_sum"] += temperature
+                group["temperature_n"] += 1
+
+    def results(self):
+        results = []
+        for (state, severity), group in sorted(self.groups.items()):
+            results.append({
+                "State": state,
+                "Severity": severity,
+                **group,
+                "avg_distance": group["distance_sum"] / group["distance_n"] if group["distance_n"] else None,
+                "avg_temperature": group["temperature_sum"] / group["temperature_n"] if group["temperature_n"] else None,
+            })
+        return results
+
+
+# ------------------------------------------------------------
+# INCREMENTAL MERGE:
+#   add the delta's sums/counts to the stored group, then
+#   recompute the averages from the merged totals
+# ------------------------------------------------------------
+def merged_average(sum_field, n_field):
+    return {"$cond": [{"$gt": [f"${n_field}", 0]},
+                      {"$divide": [f"${sum_field}", f"${n_field}"]},
+                      None]}
+
+
+def merge_delta_ops(deltas):
+    # imported here so the dashboard modules that import this file skip pymongo's startup cost
+    from pymongo import UpdateOne
+
+    ops = []
+    for d in deltas:
+        added = {
+            field: {"$add": [{"$ifNull": [f"${field}", 0]}, d[field]]}
+            for field in ["accident_count", "distance_sum", "distance_n",
+                          "temperature_sum", "temperature_n"]
+        }
+        ops.append(UpdateOne(
+            {"State": d["State"], "Severity": d["Severity"]},
+            [
+                {"$set": added},
+                {"$set": {
+                    "avg_distance": merged_average("distance_sum", "distance_n"),
+                    "avg_temperature": merged_average("temperature_sum", "temperature_n")
+                }}
+            ],
+            upsert=True
+        ))
+    return ops
+
+
+# ------------------------------------------------------------
+# BLUE/GREEN SWAP:
+#   the pipeline writes straight into a staging collection with
+#   $out, the staging collection is indexed, then renamed over
+#   the live one in a single step. Dashboard readers always see
+#   a complete gold collection.
+# ------------------------------------------------------------
+def swap_in(db, staging, target):
+    # renameCollection with dropTarget, atomic on the server (and supported by mongomock)
+    db[staging].rename(target, dropTarget=True)
 
-    # Clear old aggregated data
-    agg_col.delete_many({})
 
-    # Insert new aggregated records
-    if results:
-        agg_col.insert_many(results)
+def get_watermark(db, layer):
+    doc = db[WATERMARK_COL].find_one({"_id": layer})
+    return doc["last_id"] if doc else None
+
+
+def save_watermark(db, layer, last_id):
+    db[WATERMARK_COL].update_one(
+        {"_id": layer},
+        {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+@instrumentation.stage("gold")
+def main():
+    # logging setup
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    client = get_client()
+    client.admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
+
+    db = get_db("gold")
+
+    # Input data source
+    clean_col = db["accidents_clean"]
+
+    # Output aggregated data
+    agg_col = db[AGG_COL]
+
+    logging.info("Connected to MongoDB collections")
+
+    # accidents_clean may hold compact documents (pipeline/compact_encoding.py)
+    stored = compact_encoding.stored_format(db)
+    names = compact_encoding.field_names(stored["format"])
+    if READ_BACKEND == "parquet":
+        compact_encoding.require_wide(db, "READ_BACKEND=parquet")
+
+    # Pin the newest clean document so the watermark matches what was aggregated
+    last = clean_col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if last is None:
+        logging.info("accidents_clean is empty, nothing to aggregate")
+        return
+
+    watermark = get_watermark(db, "gold") if RUN_MODE == "incremental" and READ_BACKEND == "mongo" else None
+
+    if watermark is not None:
+        logging.info(f"Incremental aggregation from gold watermark {watermark}")
+
+        if watermark >= last["_id"]:
+            logging.info("No new clean documents since the last run")
+            return
+
+        with instrumentation.timed("gold", "aggregate"):
+            deltas = list(clean_col.aggregate(
+                build_pipeline({"$gt": watermark, "$lte": last["_id"]}, names), allowDiskUse=True
+            ))
+        logging.info(f"Merging {len(deltas)} (State, Severity) deltas into accidents_aggregated")
+
+        if deltas:
+            with instrumentation.timed("gold", "merge", len(deltas)):
+                agg_col.bulk_write(merge_delta_ops(deltas), ordered=False)
+
+        save_watermark(db, "gold", last["_id"])
+        logging.info("Incremental aggregation completed successfully")
+        return
+
+    if RUN_MODE == "incremental":
+        logging.info("No gold watermark yet, running a full rebuild")
+
+    logging.info(f"Starting aggregation pipeline (backend={READ_BACKEND})")
+
+    staging_col = db[STAGING_COL]
+    staging_col.drop()
+    if READ_BACKEND == "parquet":
+        # the mirror is a snapshot of accidents_clean up to the last_id in its manifest
+        with instrumentation.timed("gold", "aggregate"):
+            results, last_id = parquet_gold_results()
+        if results:
+            with instrumentation.timed("gold", "insert", len(results)):
+                staging_col.insert_many(results)
+    else:
+        # Execute aggregation into the staging collection (nothing comes back to the client)
+        last_id = last["_id"]
+        with instrumentation.timed("gold", "aggregate"):
+            clean_col.aggregate(
+                build_pipeline({"$lte": last_id}, names) + [{"$out": STAGING_COL}],
+                allowDiskUse=True
+            )
+
+    logging.info(f"Aggregation completed. Records created: {staging_col.estimated_document_count()}")
+
+    # Index before the swap so the live collection is never unindexed
+    with instrumentation.timed("gold", "index"):
+        ensure_indexes(staging_col, INDEX_PLAN[AGG_COL])
+
+    # Save aggregated data
+    logging.info("Swapping staging collection in as accidents_aggregated")
+    with instrumentation.timed("gold", "swap"):
+        swap_in(db, STAGING_COL, AGG_COL)
+
+    save_watermark(db, "gold", last_id)
 
     logging.info("Aggregation process completed successfully")
 
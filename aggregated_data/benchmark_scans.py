@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+from datetime import datetime
+import pyarrow.compute as pc
+from aggregation import build_pipeline
+from parquet_mirror import open_layer, read_layer, read_manifest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_db
+from pipeline import compact_encoding
+
+# --------------------------------------------------------------
+# MONGO VS PARQUET SCAN BENCHMARK
+#   The same three reads against accidents_clean and its Parquet
+#   mirror (run parquet_mirror.py first):
+#     columns  - 4 columns of every document
+#     filtered - one State and one year of Start_Time
+#     group    - the gold State x Severity aggregation
+#   Best of REPEATS runs each.
+# --------------------------------------------------------------
+BENCH_STATE = os.getenv("BENCH_STATE", "CA")
+BENCH_YEAR = int(os.getenv("BENCH_YEAR", "2021"))
+REPEATS = int(os.getenv("REPEATS", "3"))
+COLUMNS = ["State", "Severity", "Distance(mi)", "Temperature(F)"]
+
+
+def best_of(fn):
+    best, rows = None, 0
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def main():
+    clean = get_db()["accidents_clean"]
+    compact_encoding.require_wide(get_db(), "benchmark_scans.py")   # the mirror is always wide
+    print(f"Parquet mirror: {read_manifest('accidents_clean')['rows']:,} rows")
+
+    year_range = {"$gte": datetime(BENCH_YEAR, 1, 1), "$lt": datetime(BENCH_YEAR + 1, 1, 1)}
+    projection = {"_id": 0, **{c: 1 for c in COLUMNS}}
+
+    cases = {
+        "columns": (
+            lambda: sum(1 for _ in clean.find({}, projection).batch_size(10_000)),
+            lambda: read_layer("accidents_clean", columns=COLUMNS).num_rows,
+        ),
+        "filtered": (
+            lambda: sum(1 for _ in clean.find({"State": BENCH_STATE, "Start_Time": year_range}, projection)),
+            lambda: read_layer("accidents_clean", columns=COLUMNS,
+                               filters={"State": BENCH_STATE, "year": BENCH_YEAR}).num_rows,
+        ),
+        "group": (
+            lambda: len(list(clean.aggregate(build_pipeline(), allowDiskUse=True))),
+            lambda: open_layer("accidents_clean").to_table(
+                columns=COLUMNS, filter=pc.field("State").is_valid() & pc.field("Severity").is_valid()
+            ).group_by(["State", "Severity"]).aggregate([([], "count_all"), ("Distance(mi)", "mean"),
+                                                         ("Temperature(F)", "mean")]).num_rows,
+        ),
+    }
+
+    print(f"\n{'case':<10} {'mongo s':>9} {'parquet s':>10} {'rows':>12} {'speedup':>9}")
+    for name, (mongo_scan, parquet_scan) in cases.items():
+        mongo_s, mongo_rows = best_of(mongo_scan)
+        parquet_s, parquet_rows = best_of(parquet_scan)
+        rows = f"{mongo_rows:,}" if mongo_rows == parquet_rows else f"{mongo_rows:,}/{parquet_rows:,}"
+        print(f"{name:<10} {mongo_s:>9.2f} {parquet_s:>10.2f} {rows:>12} {mongo_s / parquet_s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
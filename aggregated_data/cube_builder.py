@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import compact_encoding
+from aggregation import swap_in
+
+# "facet"    = one scan of accidents_clean, all rollups from a single $facet
+# "parallel" = one pipeline per rollup, run concurrently, each ending in $out
+CUBE_MODE = os.getenv("CUBE_MODE", "facet")
+
+# ------------------------------------------------------------
+# GOLD CUBE ROLLUPS
+#   Every rollup keeps additive measures (sum, numeric count,
+#   min, max) so it can be re-aggregated at a coarser grain
+#   (see rollup_pipeline) without touching accidents_clean.
+# ------------------------------------------------------------
+MEASURES = {
+    "distance": "Distance(mi)",
+    "temperature": "Temperature(F)",
+}
+
+ROLLUPS = {
+    "accidents_cube_state_severity_month": {
+        "State": "$State",
+        "Severity": "$Severity",
+        "year": {"$year": "$Start_Time"},
+        "month": {"$month": "$Start_Time"},
+    },
+    "accidents_cube_hour_weekday": {
+        "hour": {"$hour": "$Start_Time"},
+        "weekday": {"$isoDayOfWeek": "$Start_Time"},   # 1 = Monday
+    },
+    "accidents_cube_weather_severity": {
+        "Weather_Condition": "$Weather_Condition",
+        "Severity": "$Severity",
+    },
+    "accidents_cube_county": {
+        "State": "$State",
+        "County": "$County",
+    },
+}
+
+
+def measure_accumulators():
+    acc = {"accident_count": {"$sum": 1}}
+    for name, field in MEASURES.items():
+        acc[f"{name}_sum"] = {"$sum": f"${field}"}
+        acc[f"{name}_n"] = {"$sum": {"$cond": [{"$isNumber": f"${field}"}, 1, 0]}}
+        acc[f"{name}_min"] = {"$min": f"${field}"}
+        acc[f"{name}_max"] = {"$max": f"${field}"}
+    return acc
+
+
+def rollup_stages(dims):
+    # dates only matter for the rollups that group on Start_Time
+    needs_time = any(isinstance(expr, dict) for expr in dims.values())
+    match = {"Start_Time": {"$type": "date"}} if needs_time else {}
+    for expr in dims.values():
+        if isinstance(expr, str):
+            match[expr[1:]] = {"$ne": None}
+
+    fields = {dim: f"$_id.{dim}" for dim in dims}
+    measures = {key: 1 for key in measure_accumulators()}
+
+    return [
+        {"$match": match},
+        {"$group": {"_id": dims, **measure_accumulators()}},
+        {"$project": {"_id": 0, **fields, **measures}},
+    ]
+
+
+# ------------------------------------------------------------
+# RE-AGGREGATION AT A COARSER GRAIN
+#   e.g. rollup_pipeline(["State", "year"]) on the
+#   state/severity/month cube gives yearly totals per State
+# ------------------------------------------------------------
+def rollup_pipeline(keep_dims):
+    group = {"_id": {dim: f"${dim}" for dim in keep_dims}, "accident_count": {"$sum": "$accident_count"}}
+    averages = {}
+    for name in MEASURES:
+        group[f"{name}_sum"] = {"$sum": f"${name}_sum"}
+        group[f"{name}_n"] = {"$sum": f"${name}_n"}
+        group[f"{name}_min"] = {"$min": f"${name}_min"}
+        group[f"{name}_max"] = {"$max": f"${name}_max"}
+        averages[f"avg_{name}"] = {"$cond": [{"$gt": [f"${name}_n", 0]},
+                                             {"$divide": [f"${name}_sum", f"${name}_n"]},
+                                             None]}
+    return [
+        {"$group": group},
+        {"$set": averages},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def build_facet_pipeline():
+    return [{"$facet": {name: rollup_stages(dims) for name, dims in ROLLUPS.items()}}]
+
+
+def main():
+    # logging setup
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    client = get_client()
+    client.admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
+
+    db = get_db("gold")
+    clean_col = db["accidents_clean"]
+    compact_encoding.require_wide(db, "cube_builder.py")
+
+    logging.info(f"Building {len(ROLLUPS)} cube rollups (mode={CUBE_MODE})")
+
+    if CUBE_MODE == "parallel":
+        def build(name):
+            clean_col.aggregate(rollup_stages(ROLLUPS[name]) + [{"$out": name}], allowDiskUse=True)
+            db[name].create_index([(dim, 1) for dim in ROLLUPS[name]], name=f"idx_{name}_dims")
+            return name, db[name].estimated_document_count()
+
+        with ThreadPoolExecutor(max_workers=len(ROLLUPS)) as pool:
+            for name, count in pool.map(build, ROLLUPS):
+                logging.info(f"{name}: {count:,} cells")
+    else:
+        # a single scan; the $facet result is one document, so it has to stay
+        # under 16MB (a few tens of thousands of cells is fine). Each cube is
+        # written to a staging collection and swapped in, so readers never see
+        # it empty or half-written
+        facets = next(clean_col.aggregate(build_facet_pipeline(), allowDiskUse=True))
+        for name, cells in facets.items():
+            staging_col = db[f"{name}_staging"]
+            staging_col.drop()
+            if cells:
+                staging_col.insert_many(cells)
+            staging_col.create_index([(dim, 1) for dim in ROLLUPS[name]], name=f"idx_{name}_dims")
+            swap_in(db, staging_col.name, name)
+            logging.info(f"{name}: {len(cells):,} cells")
+
+    logging.info("Cube build completed successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from query_modeling import DASHBOARD_PROJECTION
+from geo_tiles import TILE_COL, viewport_query
+
+# ------------------------------------------------------------
+# DASHBOARD DATA LAYER
+#   Every sidebar filter is pushed into the MongoDB query, and
+#   only the fields the charts use are projected, so the app
+#   never pulls a whole gold collection into pandas.
+#   Without a date range, the dashboard reads accidents_aggregated
+#   (the State/Severity query is covered by
+#   idx_agg_dashboard_covering). With a date range, it re-aggregates
+#   the State x Severity x month cube, which returns the same shape.
+# ------------------------------------------------------------
+AGG_COL = "accidents_aggregated"
+DIST_COL = "accidents_distributions"
+MONTH_CUBE = "accidents_cube_state_severity_month"
+
+
+def build_filter(states, severities):
+    return {"State": {"$in": list(states)}, "Severity": {"$in": list(severities)}}
+
+
+def month_key(year, month):
+    return year * 100 + month
+
+
+def filter_options(db):
+    agg = db[AGG_COL]
+    options = {
+        "states": sorted(s for s in agg.distinct("State") if s is not None),
+        "severities": sorted(s for s in agg.distinct("Severity") if s is not None),
+        "months": None,
+    }
+
+    cube = db[MONTH_CUBE]
+    first = cube.find_one({}, {"_id": 0, "year": 1, "month": 1}, sort=[("year", 1), ("month", 1)])
+    last = cube.find_one({}, {"_id": 0, "year": 1, "month": 1}, sort=[("year", -1), ("month", -1)])
+    if first and last:
+        options["months"] = (month_key(first["year"], first["month"]), month_key(last["year"], last["month"]))
+    return options
+
+
+def month_range_pipeline(states, severities, first_month, last_month):
+    """State x Severity totals for months first_month..last_month (YYYYMM) from the month cube."""
+    key = {"$add": [{"$multiply": ["$year", 100]}, "$month"]}
+    return [
+        {"$match": {
+            **build_filter(states, severities),
+            "$expr": {"$and": [{"$gte": [key, first_month]}, {"$lte": [key, last_month]}]},
+        }},
+        {"$group": {
+            "_id": {"State": "$State", "Severity": "$Severity"},
+            "accident_count": {"$sum": "$accident_count"},
+            "distance_sum": {"$sum": "$distance_sum"},
+            "distance_n": {"$sum": "$distance_n"},
+            "temperature_sum": {"$sum": "$temperature_sum"},
+            "temperature_n": {"$sum": "$temperature_n"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "State": "$_id.State",
+            "Severity": "$_id.Severity",
+            "accident_count": 1,
+            "avg_distance": {"$cond": [{"$gt": ["$distance_n", 0]},
+                                       {"$divide": ["$distance_sum", "$distance_n"]}, None]},
+            "avg_temperature": {"$cond": [{"$gt": ["$temperature_n", 0]},
+                                          {"$divide": ["$temperature_sum", "$temperature_n"]}, None]},
+        }},
+        {"$sort": {"State": 1, "Severity": 1}},
+    ]
+
+
+def query_aggregated(db, states, severities, months=None):
+    if not states or not severities:
+        return []
+    if months:
+        return list(db[MONTH_CUBE].aggregate(month_range_pipeline(states, severities, *months)))
+    return list(db[AGG_COL].find(build_filter(states, severities), DASHBOARD_PROJECTION)
+                .sort([("State", 1), ("Severity", 1)]))
+
+
+def query_distributions(db, states, severities):
+    if not states or not severities:
+        return []
+    return list(db[DIST_COL].find(build_filter(states, severities), {"_id": 0}))
+
+
+TILE_PROJECTION = {"_id": 0, "location": 1, "accident_count": 1, "avg_severity": 1, "severity_counts": 1}
+
+
+def query_tiles(db, zoom, south, west, north, east):
+    """Heatmap cells of one zoom level inside the viewport (index on zoom + row + col)."""
+    cells = db[TILE_COL].find(viewport_query(zoom, south, west, north, east), TILE_PROJECTION)
+    return [
+        {"lng": c["location"]["coordinates"][0], "lat": c["location"]["coordinates"][1],
+         "accident_count": c["accident_count"], "avg_severity": c["avg_severity"],
+         **{f"severity_{s}": n for s, n in c["severity_counts"].items()}}
+        for c in cells
+    ]
+
+
+# ------------------------------------------------------------
+# PARQUET BACKEND (READ_BACKEND=parquet)
+#   same results from the Parquet mirror; State is a partition
+#   column, so a state filter only opens those directories
+# ------------------------------------------------------------
+def parquet_filter_options():
+    import os
+    from parquet_mirror import read_layer, layer_path
+
+    agg = read_layer(AGG_COL, columns=["State", "Severity"])
+    options = {
+        "states": sorted({s for s in agg["State"].to_pylist() if s is not None}),
+        "severities": sorted({s for s in agg["Severity"].to_pylist() if s is not None}),
+        "months": None,
+    }
+    if os.path.isdir(layer_path(MONTH_CUBE)):
+        keys = [month_key(r["year"], r["month"]) for r in read_layer(MONTH_CUBE, columns=["year", "month"]).to_pylist()
+                if r["year"] is not None and r["month"] is not None]
+        if keys:
+            options["months"] = (min(keys), max(keys))
+    return options
+
+
+def parquet_query_aggregated(states, severities, months=None):
+    import pyarrow.compute as pc
+    from parquet_mirror import read_layer
+
+    if not states or not severities:
+        return []
+    filters = {"State": list(states), "Severity": list(severities)}
+    if not months:
+        columns = [f for f, keep in DASHBOARD_PROJECTION.items() if keep]
+        rows = read_layer(AGG_COL, columns=columns, filters=filters).to_pylist()
+        return sorted(rows, key=lambda r: (r["State"], r["Severity"]))
+
+    first, last = months
+    cube = read_layer(MONTH_CUBE, filters={**filters, "year": (first // 100, last // 100)})
+    key = pc.add(pc.multiply(cube["year"], 100), cube["month"])
+    cube = cube.filter(pc.and_(pc.greater_equal(key, first), pc.less_equal(key, last)))
+    sums = ["accident_count", "distance_sum", "distance_n", "temperature_sum", "temperature_n"]
+    grouped = cube.group_by(["State", "Severity"]).aggregate([(c, "sum") for c in sums])
+
+    rows = []
+    for g in grouped.to_pylist():
+        rows.append({
+            "State": g["State"],
+            "Severity": g["Severity"],
+            "accident_count": g["accident_count_sum"],
+            "avg_distance": g["distance_sum_sum"] / g["distance_n_sum"] if g["distance_n_sum"] else None,
+            "avg_temperature": g["temperature_sum_sum"] / g["temperature_n_sum"] if g["temperature_n_sum"] else None,
+        })
+    return sorted(rows, key=lambda r: (r["State"], r["Severity"]))
+
+
+def parquet_query_distributions(states, severities):
+    from parquet_mirror import read_layer
+
+    if not states or not severities:
+        return []
+    return read_layer(DIST_COL, filters={"State": list(states), "Severity": list(severities)}).to_pylist()
@@ -0,0 +1,162 @@
+import logging
+import os
+import sys
+import time
+from aggregation import swap_in
+from quantile_sketch import PERCENTILES, HISTOGRAM_BINS, Distribution
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import compact_encoding
+
+DIST_COL = "accidents_distributions"
+STAGING_COL = "accidents_distributions_staging"
+
+# "auto"   = $percentile on MongoDB 7.0+, otherwise the Python sketch
+# "server" = always $percentile (fails on older servers)
+# "sketch" = stream accidents_clean through KLL sketches in Python
+PERCENTILE_MODE = os.getenv("PERCENTILE_MODE", "auto")
+BATCH_SIZE = 5000
+
+# ------------------------------------------------------------
+# DISTRIBUTION METRICS PER (State, Severity):
+#   p50/p90/p99 and a fixed-bin histogram for each metric, so
+#   the dashboard can draw real distributions instead of a box
+#   plot of averages. Duration is End_Time - Start_Time in
+#   minutes.
+# ------------------------------------------------------------
+METRIC_EXPRS = {
+    "distance": "$Distance(mi)",
+    "temperature": "$Temperature(F)",
+    "visibility": "$Visibility(mi)",
+    "duration": {"$cond": [
+        {"$and": [{"$eq": [{"$type": "$Start_Time"}, "date"]},
+                  {"$eq": [{"$type": "$End_Time"}, "date"]}]},
+        {"$divide": [{"$subtract": ["$End_Time", "$Start_Time"]}, 60000]},
+        None
+    ]},
+}
+
+
+def duration_minutes(doc):
+    start, end = doc.get("Start_Time"), doc.get("End_Time")
+    if start is None or end is None or not hasattr(start, "year") or not hasattr(end, "year"):
+        return None
+    return (end - start).total_seconds() / 60
+
+
+def bin_count_expr(metric, i):
+    edges = HISTOGRAM_BINS[metric]
+    value = f"${metric}"
+    # $lt would also match null, so only numbers are counted
+    conds = [{"$isNumber": value}]
+    if i > 0:
+        conds.append({"$gte": [value, edges[i]]})
+    if i + 1 < len(edges):
+        conds.append({"$lt": [value, edges[i + 1]]})
+    return {"$sum": {"$cond": [{"$and": conds}, 1, 0]}}
+
+
+def build_distribution_pipeline():
+    group = {"_id": {"State": "$State", "Severity": "$Severity"}, "accident_count": {"$sum": 1}}
+    shape = {"_id": 0, "State": "$_id.State", "Severity": "$_id.Severity", "accident_count": 1}
+
+    for metric, edges in HISTOGRAM_BINS.items():
+        group[f"{metric}_n"] = {"$sum": {"$cond": [{"$isNumber": f"${metric}"}, 1, 0]}}
+        group[f"{metric}_pct"] = {"$percentile": {"input": f"${metric}", "p": PERCENTILES, "method": "approximate"}}
+        for i in range(len(edges)):
+            group[f"{metric}_b{i}"] = bin_count_expr(metric, i)
+
+        shape[metric] = {
+            "n": f"${metric}_n",
+            "percentiles": f"${metric}_pct",
+            "bins": {"$literal": edges},
+            "hist": [f"${metric}_b{i}" for i in range(len(edges))],
+        }
+
+    return [
+        {"$match": {"State": {"$ne": None}, "Severity": {"$ne": None}}},
+        {"$project": {"State": 1, "Severity": 1, **METRIC_EXPRS}},
+        {"$group": group},
+        {"$project": shape},
+        {"$sort": {"State": 1, "Severity": 1}},
+    ]
+
+
+# ------------------------------------------------------------
+# PYTHON FALLBACK:
+#   one mergeable Distribution per group and metric, so the
+#   same code can combine partial results from several scans
+# ------------------------------------------------------------
+def sketch_distributions(docs):
+    groups = {}
+    for doc in docs:
+        state, severity = doc.get("State"), doc.get("Severity")
+        if state is None or severity is None:
+            continue
+
+        key = (state, severity)
+        if key not in groups:
+            groups[key] = {"accident_count": 0, **{m: Distribution(m) for m in HISTOGRAM_BINS}}
+        group = groups[key]
+        group["accident_count"] += 1
+
+        group["distance"].add(doc.get("Distance(mi)"))
+        group["temperature"].add(doc.get("Temperature(F)"))
+        group["visibility"].add(doc.get("Visibility(mi)"))
+        group["duration"].add(duration_minutes(doc))
+
+    return [
+        {"State": state, "Severity": severity, "accident_count": group["accident_count"],
+         **{m: group[m].to_dict() for m in HISTOGRAM_BINS}}
+        for (state, severity), group in sorted(groups.items())
+    ]
+
+
+def server_supports_percentile(client):
+    major, minor = (int(x) for x in client.server_info()["version"].split(".")[:2])
+    return (major, minor) >= (7, 0)
+
+
+def main():
+    # logging setup
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    client = get_client()
+    client.admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
+
+    db = get_db("gold")
+    clean_col = db["accidents_clean"]
+    compact_encoding.require_wide(db, "distributions.py")
+    staging_col = db[STAGING_COL]
+    staging_col.drop()
+
+    mode = PERCENTILE_MODE
+    if mode == "auto":
+        mode = "server" if server_supports_percentile(client) else "sketch"
+    logging.info(f"Building distribution metrics (mode={mode})")
+
+    start = time.perf_counter()
+    if mode == "server":
+        clean_col.aggregate(build_distribution_pipeline() + [{"$out": STAGING_COL}], allowDiskUse=True)
+    else:
+        projection = {"_id": 0, "State": 1, "Severity": 1, "Distance(mi)": 1, "Temperature(F)": 1,
+                      "Visibility(mi)": 1, "Start_Time": 1, "End_Time": 1}
+        cursor = clean_col.find({}, projection).batch_size(BATCH_SIZE)
+        results = sketch_distributions(cursor)
+        if results:
+            staging_col.insert_many(results)
+    elapsed = time.perf_counter() - start
+
+    staging_col.create_index([("State", 1), ("Severity", 1)], name="idx_dist_state_severity")
+    logging.info(f"{staging_col.estimated_document_count():,} groups in {elapsed:.1f}s, swapping in {DIST_COL}")
+    swap_in(db, STAGING_COL, DIST_COL)
+
+    logging.info("Distribution metrics completed successfully")
+
+
+if __name__ == "__main__":
+    main()
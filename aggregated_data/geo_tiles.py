@@ -0,0 +1,150 @@
+import logging
+import math
+import os
+import sys
+import time
+from aggregation import swap_in
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import compact_encoding
+
+TILE_COL = "accidents_geo_tiles"
+STAGING_COL = "accidents_geo_tiles_staging"
+
+# ------------------------------------------------------------
+# HIERARCHICAL LAT/LNG GRID
+#   zoom -> cell size in degrees. Each size divides the next
+#   coarser one, so only the finest level is computed from
+#   accidents_clean; every coarser level is rolled up from the
+#   level below it.
+# ------------------------------------------------------------
+ZOOM_LEVELS = {
+    0: 4.0,
+    1: 1.0,
+    2: 0.25,
+    3: 0.05,
+}
+SEVERITIES = [1, 2, 3, 4]
+# the dashboard picks the finest zoom that keeps a viewport under this many cells
+MAX_VIEWPORT_CELLS = int(os.getenv("MAX_VIEWPORT_CELLS", "4000"))
+
+
+def cell_index(lat, lng, size):
+    return math.floor((lat + 90) / size), math.floor((lng + 180) / size)
+
+
+def pick_zoom(south, west, north, east):
+    """Finest zoom whose grid covers the viewport with at most MAX_VIEWPORT_CELLS cells."""
+    best = min(ZOOM_LEVELS)
+    for zoom in sorted(ZOOM_LEVELS):
+        size = ZOOM_LEVELS[zoom]
+        cells = math.ceil((north - south) / size + 1) * math.ceil((east - west) / size + 1)
+        if cells <= MAX_VIEWPORT_CELLS:
+            best = zoom
+    return best
+
+
+def viewport_query(zoom, south, west, north, east):
+    """Cells of one zoom level that overlap the viewport, by their stored grid row/col.
+    (A $geoWithin polygon on a 2dsphere index follows great-circle edges, which
+    bow away from the lat/lng lines and drop cells along the viewport edges.)"""
+    size = ZOOM_LEVELS[zoom]
+    row_low, col_low = cell_index(south, west, size)
+    row_high, col_high = cell_index(north, east, size)
+    return {"zoom": zoom, "row": {"$gte": row_low, "$lte": row_high}, "col": {"$gte": col_low, "$lte": col_high}}
+
+
+def _cell_fields(zoom, size):
+    row, col = "$_id.row", "$_id.col"
+    known = {"$add": [f"$sev_{s}" for s in SEVERITIES]}
+    return {
+        "_id": {"$concat": [f"z{zoom}:", {"$toString": row}, ":", {"$toString": col}]},
+        "zoom": {"$literal": zoom},
+        "row": row,
+        "col": col,
+        "location": {
+            "type": "Point",
+            "coordinates": [
+                {"$add": [{"$multiply": [col, size]}, -180 + size / 2]},
+                {"$add": [{"$multiply": [row, size]}, -90 + size / 2]},
+            ],
+        },
+        "accident_count": 1,
+        "severity_counts": {str(s): f"$sev_{s}" for s in SEVERITIES},
+        "severity_sum": 1,
+        "avg_severity": {"$cond": [{"$gt": [known, 0]}, {"$divide": ["$severity_sum", known]}, None]},
+    }
+
+
+def finest_level_pipeline(zoom, size):
+    return [
+        {"$match": {"Start_Lat": {"$gte": -90, "$lte": 90}, "Start_Lng": {"$gte": -180, "$lte": 180}}},
+        {"$group": {
+            "_id": {
+                "row": {"$toInt": {"$floor": {"$divide": [{"$add": ["$Start_Lat", 90]}, size]}}},
+                "col": {"$toInt": {"$floor": {"$divide": [{"$add": ["$Start_Lng", 180]}, size]}}},
+            },
+            "accident_count": {"$sum": 1},
+            "severity_sum": {"$sum": {"$cond": [{"$in": ["$Severity", SEVERITIES]}, "$Severity", 0]}},
+            **{f"sev_{s}": {"$sum": {"$cond": [{"$eq": ["$Severity", s]}, 1, 0]}} for s in SEVERITIES},
+        }},
+        {"$project": _cell_fields(zoom, size)},
+        {"$merge": {"into": STAGING_COL, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def rollup_level_pipeline(child_zoom, zoom, size):
+    ratio = round(size / ZOOM_LEVELS[child_zoom])
+    return [
+        {"$match": {"zoom": child_zoom}},
+        {"$group": {
+            "_id": {
+                "row": {"$toInt": {"$floor": {"$divide": ["$row", ratio]}}},
+                "col": {"$toInt": {"$floor": {"$divide": ["$col", ratio]}}},
+            },
+            "accident_count": {"$sum": "$accident_count"},
+            "severity_sum": {"$sum": "$severity_sum"},
+            **{f"sev_{s}": {"$sum": f"$severity_counts.{s}"} for s in SEVERITIES},
+        }},
+        {"$project": _cell_fields(zoom, size)},
+        {"$merge": {"into": STAGING_COL, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def main():
+    # logging setup
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    client = get_client()
+    client.admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
+
+    db = get_db("gold")
+    clean_col = db["accidents_clean"]
+    compact_encoding.require_wide(db, "geo_tiles.py")
+    staging_col = db[STAGING_COL]
+    staging_col.drop()
+
+    zooms = sorted(ZOOM_LEVELS, reverse=True)   # finest first
+    for i, zoom in enumerate(zooms):
+        size = ZOOM_LEVELS[zoom]
+        start = time.perf_counter()
+        if i == 0:
+            clean_col.aggregate(finest_level_pipeline(zoom, size), allowDiskUse=True)
+        else:
+            staging_col.aggregate(rollup_level_pipeline(zooms[i - 1], zoom, size), allowDiskUse=True)
+        cells = staging_col.count_documents({"zoom": zoom})
+        logging.info(f"zoom {zoom} ({size} deg): {cells:,} cells in {time.perf_counter() - start:.1f}s")
+
+    # the dashboard always filters on zoom and a row/col range (see viewport_query)
+    staging_col.create_index([("zoom", 1), ("row", 1), ("col", 1)], name="idx_tiles_zoom_row_col")
+    swap_in(db, STAGING_COL, TILE_COL)
+
+    logging.info("Geo tiles completed successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import compact_encoding
+
+# ------------------------------------------------------------
+# PARQUET MIRROR OF THE SILVER AND GOLD LAYERS
+#   Streams accidents_clean and the gold collections into
+#   hive-partitioned Parquet datasets (dictionary encoding,
+#   zstd, row-group statistics). Readers prune partitions and
+#   row groups with read_layer(..., filters=...) and only load
+#   the columns they ask for.
+# ------------------------------------------------------------
+PARQUET_DIR = os.getenv(
+    "PARQUET_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lakehouse")
+)
+MANIFEST = "_mirror.json"
+BATCH_SIZE = 50_000
+ROW_GROUP_ROWS = 128 * 1024
+
+# collection -> partition columns ("year" is derived from Start_Time)
+LAYERS = {
+    "accidents_clean": ["State", "year"],
+    "accidents_aggregated": ["State"],
+    "accidents_distributions": ["State"],
+    "accidents_cube_state_severity_month": ["State", "year"],
+    "accidents_cube_hour_weekday": [],
+    "accidents_cube_weather_severity": [],
+    "accidents_cube_county": ["State"],
+}
+
+# declared silver schema, so every streamed batch has the same Arrow types
+_FLOATS = ["Start_Lat", "Start_Lng", "End_Lat", "End_Lng", "Distance(mi)", "Temperature(F)",
+           "Wind_Chill(F)", "Humidity(%)", "Pressure(in)", "Visibility(mi)", "Wind_Speed(mph)",
+           "Precipitation(in)"]
+_BOOLS = ["Amenity", "Bump", "Crossing", "Give_Way", "Junction", "No_Exit", "Railway", "Roundabout",
+          "Station", "Stop", "Traffic_Calming", "Traffic_Signal", "Turning_Loop"]
+_STRINGS = ["ID", "Source", "Description", "Street", "City", "County", "State", "Zipcode", "Country",
+            "Timezone", "Airport_Code", "Wind_Direction", "Weather_Condition", "Sunrise_Sunset",
+            "Civil_Twilight", "Nautical_Twilight", "Astronomical_Twilight"]
+_TIMESTAMPS = ["Start_Time", "End_Time", "Weather_Timestamp"]
+
+CLEAN_SCHEMA = pa.schema(
+    [(f, pa.string()) for f in _STRINGS]
+    + [("Severity", pa.int64())]
+    + [(f, pa.timestamp("ms")) for f in _TIMESTAMPS]
+    + [(f, pa.float64()) for f in _FLOATS]
+    + [(f, pa.bool_()) for f in _BOOLS]
+    + [("year", pa.int32())]
+)
+
+
+def layer_path(name):
+    return os.path.join(PARQUET_DIR, name)
+
+
+def _fits(value, arrow_type):
+    if value is None:
+        return True
+    if pa.types.is_string(arrow_type):
+        return isinstance(value, str)
+    if pa.types.is_boolean(arrow_type):
+        return isinstance(value, bool)
+    if pa.types.is_timestamp(arrow_type):
+        return isinstance(value, datetime)
+    if pa.types.is_integer(arrow_type):
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def clean_record_batch(docs):
+    """Silver documents -> RecordBatch in CLEAN_SCHEMA.
+
+    A value that does not fit its declared type raises ValueError:
+    nulling or stringifying it would let READ_BACKEND=parquet
+    validation pass documents that fail against MongoDB.
+    """
+    columns = []
+    for field in CLEAN_SCHEMA:
+        if field.name == "year":
+            values = [d["Start_Time"].year if isinstance(d.get("Start_Time"), datetime) else None for d in docs]
+        else:
+            values = [d.get(field.name) for d in docs]
+            bad = [i for i, v in enumerate(values) if not _fits(v, field.type)]
+            if bad:
+                doc, value = docs[bad[0]], values[bad[0]]
+                raise ValueError(f"{field.name}={value!r} ({type(value).__name__}) in {doc.get('ID')} does not fit "
+                                 f"the mirror's {field.type} column ({len(bad)} such values in this batch); "
+                                 "fix silver (see validate_accidents_schema.py) before mirroring it")
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=CLEAN_SCHEMA)
+
+
+def _partitioning(names, schema):
+    if not names:
+        return None
+    return ds.partitioning(pa.schema([schema.field(n) for n in names]), flavor="hive")
+
+
+def write_layer(name, data, schema):
+    """Replace the mirror of one layer. `data` is a Table or an iterable of RecordBatches.
+
+    The files are written next to the layer and only replace it once
+    every batch is written, so a failed export keeps the old mirror.
+    """
+    path = layer_path(name)
+    partial = path + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    parquet = ds.ParquetFileFormat()
+    ds.write_dataset(
+        data,
+        partial,
+        schema=schema,
+        format=parquet,
+        partitioning=_partitioning(LAYERS[name], schema),
+        file_options=parquet.make_write_options(use_dictionary=True, write_statistics=True, compression="zstd"),
+        max_rows_per_group=ROW_GROUP_ROWS,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(partial, path)
+
+
+def write_manifest(name, **info):
+    with open(os.path.join(layer_path(name), MANIFEST), "w") as f:
+        json.dump(info, f, indent=2, default=str)
+
+
+def read_manifest(name):
+    with open(os.path.join(layer_path(name), MANIFEST)) as f:
+        return json.load(f)
+
+
+# ------------------------------------------------------------
+# READING WITH PUSHDOWN
+#   filters: {column: value | list of values | (low, high)}
+#   partition columns prune directories, the rest use the
+#   row-group min/max statistics
+# ------------------------------------------------------------
+def filter_expression(filters):
+    expr = None
+    for column, wanted in (filters or {}).items():
+        field = pc.field(column)
+        if isinstance(wanted, tuple):
+            part = (field >= wanted[0]) & (field <= wanted[1])
+        elif isinstance(wanted, (list, set)):
+            part = field.isin(list(wanted))
+        elif wanted is None:
+            part = field.is_null()
+        else:
+            part = field == wanted
+        expr = part if expr is None else expr & part
+    return expr
+
+
+def open_layer(name):
+    partitioning = "hive" if LAYERS[name] else None
+    # the "_mirror.json" manifest is skipped by the default "_" ignore prefix
+    return ds.dataset(layer_path(name), format="parquet", partitioning=partitioning)
+
+
+def read_layer(name, columns=None, filters=None):
+    return open_layer(name).to_table(columns=columns, filter=filter_expression(filters))
+
+
+def iter_layer(name, columns=None, filters=None, batch_size=BATCH_SIZE):
+    for batch in open_layer(name).to_batches(columns=columns, filter=filter_expression(filters),
+                                             batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+# ------------------------------------------------------------
+# EXPORT
+# ------------------------------------------------------------
+def export_clean(db):
+    col = db["accidents_clean"]
+    compact_encoding.require_wide(db, "parquet_mirror.py")
+    last = col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        batch = []
+        query = {"_id": {"$lte": last["_id"]}} if last else {}
+        for doc in col.find(query, {"_id": 0}).batch_size(5000):
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                rows += len(batch)
+                yield clean_record_batch(batch)
+                batch = []
+        if batch:
+            rows += len(batch)
+            yield clean_record_batch(batch)
+
+    write_layer("accidents_clean", batches(), CLEAN_SCHEMA)
+    # last_id lets aggregation.py keep the gold watermark right when it reads the mirror
+    write_manifest("accidents_clean", rows=rows, last_id=str(last["_id"]) if last else None,
+                   exported_at=datetime.now())
+    return rows
+
+
+def export_gold(db, name):
+    docs = list(db[name].find({}, {"_id": 0}))
+    if not docs:
+        # nothing to infer a schema from; drop the old mirror rather than leave stale rows
+        shutil.rmtree(layer_path(name), ignore_errors=True)
+        return 0
+    table = pa.Table.from_pylist(docs)
+    if "year" in table.column_names:
+        table = table.set_column(table.schema.get_field_index("year"), "year", pc.cast(table["year"], pa.int32()))
+    write_layer(name, table, table.schema)
+    write_manifest(name, rows=len(docs), exported_at=datetime.now())
+    return len(docs)
+
+
+def main():
+    # logging setup
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    client = get_client()
+    client.admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
+    db = get_db()
+
+    existing = set(db.list_collection_names())
+    for name in LAYERS:
+        if name not in existing:
+            logging.info(f"{name}: not in MongoDB, skipped")
+            continue
+
+        start = time.perf_counter()
+        if name == "accidents_clean":
+            rows = export_clean(db)
+        else:
+            rows = export_gold(db, name)
+        logging.info(f"{name}: {rows:,} rows -> {layer_path(name)} in {time.perf_counter() - start:.1f}s")
+
+    logging.info("Parquet mirror export completed successfully")
+
+
+if __name__ == "__main__":
+    main()
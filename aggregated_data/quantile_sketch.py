@@ -0,0 +1,123 @@
+import math
+import random
+from bisect import bisect_right
+
+# --------------------------------------------------------------
+# DISTRIBUTION METRICS
+#   metric name -> histogram bin edges. Bin i holds values in
+#   [edges[i], edges[i+1]); the first bin also takes anything
+#   below edges[0] and the last bin is open-ended, so every
+#   number lands in exactly len(edges) bins.
+# --------------------------------------------------------------
+PERCENTILES = [0.5, 0.9, 0.99]
+
+HISTOGRAM_BINS = {
+    "distance": [0, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50],                 # miles
+    "temperature": [-20, 0, 20, 32, 50, 70, 90, 110],                      # F
+    "visibility": [0, 0.5, 1, 2, 5, 10, 20],                               # miles
+    "duration": [0, 15, 30, 60, 120, 240, 480, 1440, 10080],               # minutes
+}
+
+
+def bin_index(edges, value):
+    return max(bisect_right(edges, value) - 1, 0)
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and not math.isnan(v)
+
+
+# --------------------------------------------------------------
+# KLL QUANTILE SKETCH (mergeable, bounded memory)
+#   Level h holds items that each stand for 2**h inputs. A full
+#   level is sorted and every other item is promoted, so memory
+#   stays around 3k items however long the stream is.
+# --------------------------------------------------------------
+class KLLSketch:
+    def __init__(self, k=200, rng=None):
+        self.k = k
+        self.rng = rng or random.Random()
+        self.levels = [[]]
+        self.n = 0
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        for h in range(len(self.levels)):
+            if len(self.levels[h]) < self._capacity(h):
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[h])
+            # an odd item out stays behind so no weight is lost
+            self.levels[h] = [items.pop()] if len(items) % 2 else []
+            self.levels[h + 1].extend(items[self.rng.randrange(2)::2])
+
+    def _size(self):
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.n += 1
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.n += other.n
+        while self._size() >= self._max_size():
+            self._compress()
+
+    def quantiles(self, qs):
+        weighted = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+        if not weighted:
+            return [None] * len(qs)
+
+        total = sum(w for _, w in weighted)
+        results = []
+        for q in qs:
+            target = q * total
+            running = 0
+            for value, weight in weighted:
+                running += weight
+                if running >= target:
+                    break
+            results.append(value)
+        return results
+
+
+class Distribution:
+    """Percentile sketch plus fixed-bin histogram for one metric of one group."""
+
+    def __init__(self, metric, k=200, rng=None):
+        self.metric = metric
+        self.edges = HISTOGRAM_BINS[metric]
+        self.sketch = KLLSketch(k, rng)
+        self.hist = [0] * len(self.edges)
+
+    def add(self, value):
+        if not _is_number(value):
+            return
+        self.sketch.add(value)
+        self.hist[bin_index(self.edges, value)] += 1
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.hist = [a + b for a, b in zip(self.hist, other.hist)]
+
+    def to_dict(self):
+        # same shape as the server-side $percentile output in distributions.py
+        return {
+            "n": self.sketch.n,
+            "percentiles": self.sketch.quantiles(PERCENTILES),
+            "bins": self.edges,
+            "hist": self.hist,
+        }
@@ -1,12 +1,180 @@
 import os
+import sys
+import json
 import logging
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import compact_encoding
 
-def main():
-    load_dotenv()
+# "report" = explain the workload only
+# "apply"  = also create missing planned indexes and drop redundant ones, then explain again
+ADVISOR_MODE = os.getenv("ADVISOR_MODE", "apply")
+RANGE_START = datetime.fromisoformat(os.getenv("RANGE_START", "2021-01-01"))
+RANGE_END = datetime.fromisoformat(os.getenv("RANGE_END", "2021-02-01"))
+REPORT_PATH = os.getenv("REPORT_PATH", "index_advisor_report.json")
+
+
+# ----------------------------------------------------------
+# INDEX PLAN
+#   build "before_load": needed while documents are written
+#   (duplicate detection / idempotent upserts), created by the
+#   loading scripts themselves.
+#   build "after_load": secondary indexes. Bulk loads go faster
+#   without them, so silver full rebuilds drop them and this
+#   script (or aggregation.py for its staging collection)
+#   builds them once the data is in.
+# ----------------------------------------------------------
+INDEX_PLAN = {
+    # ingest upserts on _id (the CSV row number), so bronze needs no index of its own
+    "accidents_raw": [],
+    "accidents_clean": [
+        {"name": "idx_clean_id_unique", "keys": [("ID", 1)], "unique": True, "build": "before_load"},
+        # covers the gold $match/$group: every field it reads is in the key
+        {"name": "idx_clean_agg_covering",
+         "keys": [("State", 1), ("Severity", 1), ("Distance(mi)", 1), ("Temperature(F)", 1), ("_id", 1)],
+         "build": "after_load"},
+        # time-range scans and the cube rollups only ever ask for real dates
+        {"name": "idx_clean_start_time",
+         "keys": [("Start_Time", 1), ("State", 1), ("Severity", 1)],
+         "partialFilterExpression": {"Start_Time": {"$type": "date"}},
+         "build": "after_load"},
+    ],
+    "accidents_aggregated": [
+        # covers the dashboard query (filter on State/Severity, read the metrics)
+        {"name": "idx_agg_dashboard_covering",
+         "keys": [("State", 1), ("Severity", 1), ("accident_count", 1), ("avg_distance", 1), ("avg_temperature", 1)],
+         "build": "after_load"},
+    ],
+}
+
+
+# ----------------------------------------------------------
+# DECLARED WORKLOAD
+#   the queries the pipeline and dashboard actually run
+# ----------------------------------------------------------
+DASHBOARD_PROJECTION = {"_id": 0, "State": 1, "Severity": 1, "accident_count": 1,
+                        "avg_distance": 1, "avg_temperature": 1}
+
+
+# names: wide -> stored field names of accidents_clean (compact_encoding.field_names)
+def build_workload(names=None):
+    from aggregation import build_pipeline
+
+    names = names or {}
+    start_time, state, severity = (names.get(field, field) for field in ["Start_Time", "State", "Severity"])
+    return [
+        {"name": "gold $match/$group", "collection": "accidents_clean",
+         "pipeline": build_pipeline(names=names)},
+        {"name": "dashboard State/Severity filter", "collection": "accidents_aggregated",
+         "filter": {"State": {"$in": ["CA", "TX", "FL"]}, "Severity": {"$in": [2, 3]}},
+         "projection": DASHBOARD_PROJECTION},
+        {"name": "Start_Time range scan", "collection": "accidents_clean",
+         "filter": {start_time: {"$type": "date", "$gte": RANGE_START, "$lt": RANGE_END}},
+         "projection": {"_id": 0, start_time: 1, state: 1, severity: 1}},
+    ]
+
+
+def explain(db, query):
+    if "pipeline" in query:
+        command = {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}}
+    else:
+        command = {"find": query["collection"], "filter": query["filter"],
+                   "projection": query.get("projection", {})}
+    return db.command("explain", command, verbosity="executionStats")
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def summarize_explain(result):
+    """Plan stages, index names and executionStats totals from a find or aggregate explain."""
+    stages, indexes, stats = [], [], None
+    for node in _walk(result):
+        if isinstance(node.get("stage"), str):
+            stages.append(node["stage"])
+            if "indexName" in node:
+                indexes.append(node["indexName"])
+        if stats is None and "totalDocsExamined" in node:
+            stats = node
+
+    stats = stats or {}
+    docs_examined = stats.get("totalDocsExamined", 0)
+    if "COLLSCAN" in stages:
+        access = "COLLSCAN"
+    elif "IXSCAN" in stages and docs_examined == 0 and "FETCH" not in stages:
+        access = "COVERED"
+    elif "IXSCAN" in stages:
+        access = "IXSCAN"
+    else:
+        access = "OTHER"
+
+    return {
+        "access": access,
+        "indexes": sorted(set(indexes)),
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "docs_examined": docs_examined,
+        "returned": stats.get("nReturned", 0),
+        "millis": stats.get("executionTimeMillis", 0),
+    }
 
+
+# ----------------------------------------------------------
+# INDEX MANAGEMENT
+# ----------------------------------------------------------
+def _index_options(spec):
+    options = {"name": spec["name"]}
+    if spec.get("unique"):
+        options["unique"] = True
+    if "partialFilterExpression" in spec:
+        options["partialFilterExpression"] = spec["partialFilterExpression"]
+    return options
+
+
+def redundant_indexes(existing, specs):
+    """Unplanned, non-unique indexes whose keys are a prefix of a planned index."""
+    planned = {spec["name"] for spec in specs}
+    redundant = []
+    for name, info in existing.items():
+        if name == "_id_" or name in planned or info.get("unique"):
+            continue
+        keys = list(info["key"])
+        if any(list(spec["keys"])[:len(keys)] == keys and "partialFilterExpression" not in spec
+               for spec in specs):
+            redundant.append(name)
+    return redundant
+
+
+def ensure_indexes(col, specs, build=None, logger=None):
+    """Create missing planned indexes (optionally only one build phase) and drop redundant ones."""
+    existing = col.index_information()
+    for spec in specs:
+        if build and spec["build"] != build:
+            continue
+        current = existing.get(spec["name"])
+        if current and list(current["key"]) != list(spec["keys"]):
+            col.drop_index(spec["name"])
+            current = None
+        if current is None:
+            if logger:
+                logger.info(f"Creating {spec['name']} on {col.name}")
+            col.create_index(spec["keys"], **_index_options(spec))
+
+    for name in redundant_indexes(col.index_information(), specs):
+        if logger:
+            logger.info(f"Dropping {name} on {col.name} (prefix of a planned index)")
+        col.drop_index(name)
+
+
+def main():
     # Logging setup
     logging.basicConfig(
         level=logging.INFO,
@@ -15,38 +183,43 @@ def main():
     logger = logging.getLogger(__name__)
 
     # MongoDB connection
-    MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in .env")
-
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client = get_client()
     client.admin.command("ping")
-    logger.info("Connected to MongoDB Atlas")
+    logger.info(f"Connected to {backend_label()}")
 
-    db = client["bigdata_capstone"]
-
-    clean_col = db["accidents_clean"]
-    agg_col = db["accidents_aggregated"]
+    db = get_db()
+    # accidents_clean may hold compact documents or be a time-series collection
+    stored = compact_encoding.stored_format(db)
+    plan = dict(INDEX_PLAN)
+    plan["accidents_clean"] = compact_encoding.stored_index_specs(INDEX_PLAN["accidents_clean"], stored)
+    workload = build_workload(compact_encoding.field_names(stored["format"]))
 
     # ----------------------------------------------------------
     # QUERY MODELING / INDEXING
-    #   Aggregation by State and Severity
-    #   Streamlit dashboard filtering
+    #   explain the workload, apply the index plan, explain again
     # ----------------------------------------------------------
+    passes = ["before", "after"] if ADVISOR_MODE == "apply" else ["current"]
+    report = {query["name"]: {} for query in workload}
 
-    logger.info("Creating index on accidents_clean (State, Severity)")
-    clean_col.create_index(
-        [("State", 1), ("Severity", 1)],
-        name="idx_clean_state_severity"
-    )
+    for label in passes:
+        if label == "after":
+            for collection, specs in plan.items():
+                ensure_indexes(db[collection], specs, logger=logger)
 
-    logger.info("Creating index on accidents_aggregated (State, Severity)")
-    agg_col.create_index(
-        [("State", 1), ("Severity", 1)],
-        name="idx_agg_state_severity"
-    )
+        for query in workload:
+            summary = summarize_explain(explain(db, query))
+            report[query["name"]][label] = summary
+            logger.info(f"[{label}] {query['name']}: {summary['access']} {summary['indexes']} | "
+                        f"keys {summary['keys_examined']:,} | docs {summary['docs_examined']:,} | "
+                        f"returned {summary['returned']:,} | {summary['millis']} ms")
+
+    for collection in INDEX_PLAN:
+        logger.info(f"{collection} indexes: {sorted(db[collection].index_information())}")
+
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
 
-    logger.info("Query modeling indexes created successfully")
+    logger.info(f"Index advisor report written to {REPORT_PATH}")
 
 
 if __name__ == "__main__":
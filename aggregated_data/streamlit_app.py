@@ -1,10 +1,15 @@
 import os
+import sys
 import streamlit as st
-from pymongo import MongoClient
 import pandas as pd
 import logging
 import plotly.express as px
-from dotenv import load_dotenv
+from dashboard_queries import (filter_options, query_aggregated, query_distributions, query_tiles,
+                               parquet_filter_options, parquet_query_aggregated, parquet_query_distributions)
+from geo_tiles import pick_zoom
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_db
 
 # ------------------------------------------------------------
 # Logging setup
@@ -27,80 +32,108 @@ st.title("US Accidents Aggregation Dashboard")
 st.write("State × Severity based accident statistics (from MongoDB accidents_aggregated)")
 
 # ------------------------------------------------------------
-# MongoDB connection 
+# MongoDB connection (STORAGE_BACKEND, see pipeline/storage.py)
 # ------------------------------------------------------------
-load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    st.error("MONGO_URI not found in .env")
-    st.stop()
-
-DB_NAME = "bigdata_capstone"
 AGG_COL = "accidents_aggregated"   # <-- THIS is your gold collection
+# seconds a cached query result stays valid (gold collections are swapped in, never edited)
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "600"))
+# "parquet" = read gold tables from the Parquet mirror (the heatmap always uses MongoDB)
+READ_BACKEND = os.getenv("READ_BACKEND", "mongo")
 
 # ------------------------------------------------------------
 # Load data from MongoDB
+#   get_db() hands out one pooled client for the whole app
+#   process (reruns included); query results are cached per
+#   filter combination (see dashboard_queries.py)
 # ------------------------------------------------------------
-@st.cache_data(show_spinner=True)
-def load_data():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    db = client[DB_NAME]
-    agg_col = db[AGG_COL]
+try:
+    get_db()
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
 
-    data = list(agg_col.find())
-    df = pd.DataFrame(data)
-    return df
+@st.cache_data(ttl=CACHE_TTL, show_spinner=True)
+def load_filter_options():
+    if READ_BACKEND == "parquet":
+        return parquet_filter_options()
+    return filter_options(get_db())
 
-logger.info("Loading aggregated data from MongoDB")
-df = load_data()
+@st.cache_data(ttl=CACHE_TTL, show_spinner=True)
+def load_data(states, severities, months):
+    if READ_BACKEND == "parquet":
+        return pd.DataFrame(parquet_query_aggregated(states, severities, months))
+    return pd.DataFrame(query_aggregated(get_db(), states, severities, months))
+
+# Percentiles and histograms per (State, Severity), built by distributions.py
+@st.cache_data(ttl=CACHE_TTL, show_spinner=True)
+def load_distributions(states, severities):
+    if READ_BACKEND == "parquet":
+        return parquet_query_distributions(states, severities)
+    return query_distributions(get_db(), states, severities)
+
+# Precomputed grid cells from geo_tiles.py, only the ones inside the viewport
+@st.cache_data(ttl=CACHE_TTL, show_spinner=True)
+def load_tiles(zoom, south, west, north, east):
+    return pd.DataFrame(query_tiles(get_db(), zoom, south, west, north, east))
+
+logger.info("Loading filter options from MongoDB")
+options = load_filter_options()
 
 # ------------------------------------------------------------
 # Basic checks
 # ------------------------------------------------------------
-if df.empty:
+if not options["states"]:
     st.error("No aggregated data found in accidents_aggregated.")
     st.stop()
 
-# Drop MongoDB _id if you don’t want it displayed
-if "_id" in df.columns:
-    df = df.drop(columns=["_id"])
-
-# Make sure numeric columns are numeric 
-for c in ["accident_count", "avg_distance", "avg_temperature", "Severity"]:
-    if c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-st.subheader("Preview of Aggregated Data")
-st.dataframe(df.head(50), use_container_width=True)
-
 # ------------------------------------------------------------
 # Sidebar filters
 # ------------------------------------------------------------
 st.sidebar.header("Filters")
 
-states = sorted(df["State"].dropna().unique().tolist())
+states = options["states"]
 selected_states = st.sidebar.multiselect(
     "Select State(s)",
     options=states,
     default=states[:5] if len(states) >= 5 else states
 )
 
-severity_levels = sorted(df["Severity"].dropna().unique().tolist())
+severity_levels = options["severities"]
 selected_severity = st.sidebar.multiselect(
     "Select Severity Level(s)",
     options=severity_levels,
     default=severity_levels
 )
 
-filtered_df = df[
-    (df["State"].isin(selected_states)) &
-    (df["Severity"].isin(selected_severity))
-]
+# month range only when the month cube exists (cube_builder.py)
+selected_months = None
+if options["months"] and st.sidebar.checkbox("Filter by month range"):
+    first, last = options["months"]
+    months = [y * 100 + m for y in range(first // 100, last // 100 + 1) for m in range(1, 13)
+              if first <= y * 100 + m <= last]
+    selected_months = st.sidebar.select_slider(
+        "Months",
+        options=months,
+        value=(first, last),
+        format_func=lambda k: f"{k // 100}-{k % 100:02d}"
+    )
+
+logger.info("Loading aggregated data from MongoDB")
+filtered_df = load_data(tuple(selected_states), tuple(selected_severity), selected_months)
+distributions = load_distributions(tuple(selected_states), tuple(selected_severity))
 
 if filtered_df.empty:
     st.warning("No results for your filter selection.")
     st.stop()
 
+# Make sure numeric columns are numeric 
+for c in ["accident_count", "avg_distance", "avg_temperature", "Severity"]:
+    if c in filtered_df.columns:
+        filtered_df[c] = pd.to_numeric(filtered_df[c], errors="coerce")
+
+st.subheader("Preview of Aggregated Data")
+st.dataframe(filtered_df.head(50), use_container_width=True)
+
 # ------------------------------------------------------------
 # KPIs
 # ------------------------------------------------------------
@@ -127,18 +160,57 @@ fig_count = px.bar(
 st.plotly_chart(fig_count, use_container_width=True)
 
 # ------------------------------------------------------------
-# Visualization 2: Avg Distance by Severity (boxplot)
+# Visualization 2: Distance distribution by Severity
+#   percentiles come from accidents_distributions; the box plot
+#   of per-state averages is only a fallback when it is missing
 # ------------------------------------------------------------
-st.subheader("Average Accident Distance (mi) by Severity")
+# already filtered by State/Severity in MongoDB; not split by month
+dist_rows = distributions
 
-fig_distance = px.box(
-    filtered_df,
-    x="Severity",
-    y="avg_distance",
-    color="Severity",
-    title="Average Accident Distance by Severity (aggregated across states)"
-)
-st.plotly_chart(fig_distance, use_container_width=True)
+if dist_rows:
+    metric = st.selectbox("Distribution metric", ["distance", "duration", "temperature", "visibility"])
+    labels = {"distance": "Distance (mi)", "duration": "Duration (min)",
+              "temperature": "Temperature (F)", "visibility": "Visibility (mi)"}
+    st.subheader(f"{labels[metric]} Percentiles by State and Severity")
+
+    pct_df = pd.DataFrame([
+        {"State": d["State"], "Severity": d["Severity"], "percentile": f"p{round(p * 100)}", "value": v}
+        for d in dist_rows
+        for p, v in zip([0.5, 0.9, 0.99], d[metric]["percentiles"] or [])
+    ])
+    if not pct_df.empty:
+        fig_pct = px.strip(
+            pct_df,
+            x="Severity",
+            y="value",
+            color="percentile",
+            hover_data=["State"],
+            title=f"p50 / p90 / p99 {labels[metric]} per state, by Severity"
+        )
+        st.plotly_chart(fig_pct, use_container_width=True)
+
+    # histograms share fixed bins, so the selection is just a sum of counts
+    bins = dist_rows[0][metric]["bins"]
+    hist = [sum(d[metric]["hist"][i] for d in dist_rows) for i in range(len(bins))]
+    bin_labels = [f"{low}–{high}" for low, high in zip(bins, bins[1:])] + [f"{bins[-1]}+"]
+    fig_hist = px.bar(
+        x=bin_labels,
+        y=hist,
+        labels={"x": labels[metric], "y": "Accidents"},
+        title=f"{labels[metric]} histogram (selected states and severities)"
+    )
+    st.plotly_chart(fig_hist, use_container_width=True)
+else:
+    st.subheader("Average Accident Distance (mi) by Severity")
+
+    fig_distance = px.box(
+        filtered_df,
+        x="Severity",
+        y="avg_distance",
+        color="Severity",
+        title="Average Accident Distance by Severity (aggregated across states)"
+    )
+    st.plotly_chart(fig_distance, use_container_width=True)
 
 # ------------------------------------------------------------
 # Visualization 3: Avg Temperature by Severity
@@ -160,4 +232,35 @@ fig_temp = px.line(
 )
 st.plotly_chart(fig_temp, use_container_width=True)
 
+# ------------------------------------------------------------
+# Visualization 4: Accident heatmap
+#   the zoom level follows the viewport size, so a whole-country
+#   view gets coarse cells and a city view gets fine ones
+# ------------------------------------------------------------
+st.subheader("Accident Heatmap")
+
+with st.sidebar.expander("Map viewport"):
+    south, north = st.slider("Latitude", -90.0, 90.0, (24.0, 50.0), step=0.5)
+    west, east = st.slider("Longitude", -180.0, 180.0, (-125.0, -66.0), step=0.5)
+
+zoom = pick_zoom(south, west, north, east)
+tiles_df = load_tiles(zoom, south, west, north, east)
+
+if tiles_df.empty:
+    st.info("No heatmap cells in this viewport. Run geo_tiles.py to build accidents_geo_tiles.")
+else:
+    fig_map = px.scatter_mapbox(
+        tiles_df,
+        lat="lat",
+        lon="lng",
+        size="accident_count",
+        color="avg_severity",
+        hover_data=["accident_count", "severity_1", "severity_2", "severity_3", "severity_4"],
+        mapbox_style="open-street-map",
+        center={"lat": (south + north) / 2, "lon": (west + east) / 2},
+        zoom=3,
+        title=f"Accidents per grid cell (zoom level {zoom}, {len(tiles_df):,} cells; all states and severities)"
+    )
+    st.plotly_chart(fig_map, use_container_width=True)
+
 logger.info("Streamlit app rendered successfully")
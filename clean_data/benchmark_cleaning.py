@@ -0,0 +1,70 @@
+import os
+import copy
+import time
+import random
+from cleaning_rules import clean_document, clean_batch
+
+# --------------------------------------------------------------
+# CLEANING MICRO-BENCHMARK
+#   Per-row clean_document() vs per-batch clean_batch() on
+#   synthetic raw documents. No MongoDB needed.
+# --------------------------------------------------------------
+N_DOCS = int(os.getenv("N_DOCS", "100000"))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "5000"))
+
+
+def make_raw_docs(n, seed=42):
+    rng = random.Random(seed)
+    cities = ["Dayton", " Columbus ", "Houston", "N/A", "", "unknown", "Miami  "]
+    docs = []
+
+    for i in range(n):
+        start = f"2016-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+        docs.append({
+            "ID": f"A-{i}",
+            "Severity": rng.randint(1, 4),
+            "Start_Time": start,
+            "End_Time": start + ".000000000" if rng.random() < 0.3 else start,
+            "Weather_Timestamp": start if rng.random() < 0.9 else float("nan"),
+            "Start_Lat": rng.uniform(25, 49),
+            "Start_Lng": rng.uniform(-124, -67),
+            "Distance(mi)": rng.random() * 5 if rng.random() < 0.95 else float("nan"),
+            "City": rng.choice(cities),
+            "County": "Montgomery",
+            "State": rng.choice(["OH", "TX", "FL", " CA", "na"]),
+            "Zipcode": "45424",
+            "Street": "I-70 E",
+            "Weather_Condition": rng.choice(["Light Rain", "Clear", "null", None]),
+            "Wind_Direction": rng.choice(["SW", "Calm", " N "]),
+            "Temperature(F)": rng.uniform(-10, 100),
+            "Traffic_Signal": rng.random() < 0.2,
+        })
+
+    return docs
+
+
+def main():
+    docs = make_raw_docs(N_DOCS)
+    print(f"Cleaning {N_DOCS:,} synthetic documents (batch size {BATCH_SIZE:,})")
+
+    row_input = copy.deepcopy(docs)
+    t0 = time.perf_counter()
+    row_out = [clean_document(doc) for doc in row_input]
+    row_s = time.perf_counter() - t0
+
+    batch_input = copy.deepcopy(docs)
+    t0 = time.perf_counter()
+    batch_out = []
+    for i in range(0, len(batch_input), BATCH_SIZE):
+        batch_out.extend(clean_batch(batch_input[i:i + BATCH_SIZE]))
+    batch_s = time.perf_counter() - t0
+
+    identical = row_out == batch_out
+    print(f"\n{'mode':<6} {'seconds':>9} {'docs/sec':>12}")
+    print(f"{'row':<6} {row_s:>9.2f} {N_DOCS / row_s:>12,.0f}")
+    print(f"{'batch':<6} {batch_s:>9.2f} {N_DOCS / batch_s:>12,.0f}")
+    print(f"\nSpeedup: {row_s / batch_s:.1f}x | identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main()
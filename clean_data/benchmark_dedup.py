@@ -0,0 +1,62 @@
+import os
+import time
+import random
+from dedup_backends import SetDedup, BitmapDedup, BloomDedup
+
+# --------------------------------------------------------------
+# DEDUP BACKEND BENCHMARK
+#   Feeds the same stream of "A-<int>" IDs (with duplicates) to
+#   each in-memory backend and reports speed and memory.
+#   The index backend keeps nothing in Python (0 MB); its cost
+#   is the server-side unique index, so it is not timed here.
+# --------------------------------------------------------------
+N_IDS = int(os.getenv("N_IDS", "2000000"))
+DUPLICATE_RATE = float(os.getenv("DUPLICATE_RATE", "0.01"))
+BATCH_SIZE = 5000
+
+
+def make_id_stream(n, duplicate_rate, seed=7):
+    rng = random.Random(seed)
+    ids = []
+    for i in range(n):
+        if ids and rng.random() < duplicate_rate:
+            ids.append(rng.choice(ids))
+        else:
+            ids.append(f"A-{i + 1}")
+    return ids
+
+
+def run_backend(backend, ids, committed):
+    duplicates = 0
+    t0 = time.perf_counter()
+
+    for n, accident_id in enumerate(ids, start=1):
+        if backend.seen(accident_id):
+            duplicates += 1
+        else:
+            committed.add(accident_id)
+        if n % BATCH_SIZE == 0:
+            backend.flushed()
+
+    return duplicates, time.perf_counter() - t0
+
+
+def main():
+    ids = make_id_stream(N_IDS, DUPLICATE_RATE)
+    print(f"{N_IDS:,} IDs, ~{DUPLICATE_RATE:.1%} duplicates")
+    print(f"\n{'backend':<8} {'duplicates':>11} {'seconds':>9} {'IDs/sec':>12} {'memory (MB)':>12}")
+
+    for make in [SetDedup, BitmapDedup, None]:
+        # stands in for accidents_clean when the Bloom filter needs an exact answer
+        committed = set()
+        backend = make() if make else BloomDedup(committed.__contains__, expected_items=N_IDS)
+        duplicates, elapsed = run_backend(backend, ids, committed)
+        print(f"{backend.name:<8} {duplicates:>11,} {elapsed:>9.2f} {N_IDS / elapsed:>12,.0f} "
+              f"{backend.memory_bytes() / 1024 ** 2:>12,.1f}")
+        if isinstance(backend, BloomDedup):
+            print(f"  bloom: {backend.confirm_queries:,} exact confirmations "
+                  f"({backend.n_hashes} hashes, {backend.n_bits / 8 / 1024 ** 2:,.1f} MB of bits)")
+
+
+if __name__ == "__main__":
+    main()
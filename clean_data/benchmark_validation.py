@@ -0,0 +1,77 @@
+import os
+import time
+import random
+from datetime import datetime, timedelta
+from validate_accidents_schema import VALIDATORS, BATCH_SIZE
+
+# --------------------------------------------------------------
+# VALIDATION BENCHMARK
+#   docs/sec of each VALIDATION_MODE on synthetic clean
+#   documents (a few percent deliberately invalid).
+#   No MongoDB needed.
+# --------------------------------------------------------------
+N_DOCS = int(os.getenv("N_DOCS", "100000"))
+INVALID_RATE = float(os.getenv("INVALID_RATE", "0.02"))
+
+
+def make_clean_docs(n, invalid_rate, seed=11):
+    rng = random.Random(seed)
+    base = datetime(2016, 2, 8, 5, 46)
+    docs = []
+
+    for i in range(n):
+        start = base + timedelta(minutes=rng.randint(0, 3_000_000))
+        doc = {
+            "ID": f"A-{i}",
+            "Source": "Source2",
+            "Severity": rng.randint(1, 4),
+            "Start_Time": start,
+            "End_Time": start + timedelta(minutes=rng.randint(5, 300)),
+            "Weather_Timestamp": start if rng.random() < 0.9 else None,
+            "Start_Lat": rng.uniform(25, 49),
+            "Start_Lng": rng.uniform(-124, -67),
+            "End_Lat": None,
+            "End_Lng": None,
+            "Distance(mi)": rng.random() * 5 if rng.random() < 0.95 else None,
+            "City": "Dayton",
+            "County": "Montgomery",
+            "State": rng.choice(["OH", "TX", "FL", "CA"]),
+            "Zipcode": "45424",
+            "Country": "US",
+            "Timezone": "US/Eastern",
+            "Weather_Condition": "Light Rain",
+            "Temperature(F)": rng.uniform(-10, 100),
+            "Visibility(mi)": 10.0,
+            "Wind_Speed(mph)": None,
+            "Traffic_Signal": rng.random() < 0.2,
+            "Junction": False,
+        }
+        if rng.random() < invalid_rate:
+            broken = rng.choice(["Severity", "Start_Lat", "State", "End_Time"])
+            doc[broken] = {"Severity": 7, "Start_Lat": 123.0, "State": "Ohio", "End_Time": None}[broken]
+        docs.append(doc)
+
+    return docs
+
+
+def main():
+    docs = make_clean_docs(N_DOCS, INVALID_RATE)
+    print(f"Validating {N_DOCS:,} synthetic documents (batch size {BATCH_SIZE:,})")
+    print(f"\n{'mode':<8} {'valid':>9} {'invalid':>9} {'seconds':>9} {'docs/sec':>12}")
+
+    baseline = None
+    for mode, validate_batch in VALIDATORS.items():
+        valid = 0
+        t0 = time.perf_counter()
+        for i in range(0, N_DOCS, BATCH_SIZE):
+            batch_valid, _, _ = validate_batch(docs[i:i + BATCH_SIZE])
+            valid += batch_valid
+        elapsed = time.perf_counter() - t0
+
+        baseline = baseline or elapsed
+        print(f"{mode:<8} {valid:>9,} {N_DOCS - valid:>9,} {elapsed:>9.2f} {N_DOCS / elapsed:>12,.0f}"
+              f"  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import pandas as pd
+from datetime import datetime
+
+# --------------------------------------------------------------
+# SILVER CLEANING RULES
+#   Shared by silver_cleaning.py, silver_pipeline.py and the
+#   benchmarks. No database access in here.
+# --------------------------------------------------------------
+TEXT_FIELDS = ["City", "County", "State", "Weather_Condition",
+               "Wind_Direction", "Street", "Zipcode"]
+DATETIME_FIELDS = ["Start_Time", "End_Time", "Weather_Timestamp"]
+NULL_TOKENS = {"na", "n/a", "none", "null", "unknown"}
+
+
+# --------------------------------------------------------------
+# TEXT NORMALIZATION HELPER FUNCTIONS
+# -------------------------------------------------------------
+# Trimming leading/trailing whitespace
+def norm_text(x):
+    if x is None:
+        return None
+
+    if isinstance(x, str):
+        s = x.strip()
+        if s == "" or s.lower() in NULL_TOKENS:
+            return None
+        return s
+
+    return x
+
+# Convert date/time strings into Python datetime objects.
+def parse_dt(x):
+    if x is None:
+        return None
+
+    if isinstance(x, datetime):
+        return x
+
+    dt = pd.to_datetime(x, errors="coerce")
+    if pd.isna(dt):
+        return None
+
+    return dt.to_pydatetime()
+
+# prevents MongoDB from storing NaN values
+def nan_to_none(x):
+    if isinstance(x, float) and pd.isna(x):
+        return None
+    return x
+
+
+# --------------------------------------------------------------
+# PER-DOCUMENT CLEANING (steps 1-3, dedup happens in main)
+# --------------------------------------------------------------
+def clean_document(doc):
+    doc.pop("_id", None)
+
+    # ------------------------------------------------------
+    # CLEANING STEP 1: Convert float NaN values to None
+    # ------------------------------------------------------
+    for k, v in list(doc.items()):
+        doc[k] = nan_to_none(v)
+
+    # ------------------------------------------------------
+    # CLEANING STEP 2: Normalize text fields
+    # ------------------------------------------------------
+    for field in TEXT_FIELDS:
+        if field in doc:
+            doc[field] = norm_text(doc[field])
+
+    # ------------------------------------------------------
+    # CLEANING STEP 3: Converts string timestamps into objects
+    # ------------------------------------------------------
+    for dt_field in DATETIME_FIELDS:
+        if dt_field in doc:
+            doc[dt_field] = parse_dt(doc[dt_field])
+
+    return doc
+
+
+
+
+# --------------------------------------------------------------
+# BATCH CLEANING (vectorized)
+#   Same output as calling clean_document() on every doc, but
+#   each step runs once per column for the whole batch.
+#   dtype=object keeps the original Python values (ints stay
+#   ints even when some documents are missing the field).
+# --------------------------------------------------------------
+def _norm_text_column(s):
+    out = s.copy()
+    is_str = s.map(type) == str
+    if not is_str.any():
+        return out
+
+    stripped = s[is_str].astype(str).str.strip()
+    is_null_token = stripped.eq("") | stripped.str.lower().isin(NULL_TOKENS)
+
+    out[is_str] = stripped.astype(object)
+    out[is_null_token[is_null_token].index] = None
+    return out
+
+
+def _parse_dt_column(s):
+    out = s.copy()
+    is_str = s.map(type) == str
+    is_other = s.notna() & ~is_str & ~s.map(lambda x: isinstance(x, datetime))
+
+    if is_str.any():
+        strings = s[is_str]
+        try:
+            parsed = pd.to_datetime(strings, format="ISO8601", errors="coerce")
+        except (ValueError, TypeError):
+            parsed = pd.Series(pd.NaT, index=strings.index)
+
+        ok = parsed.notna()
+        out[ok[ok].index] = [t.to_pydatetime() for t in parsed[ok]]
+
+        # anything the fixed format could not read goes through parse_dt,
+        # so unusual formats still parse exactly like the per-row path
+        failed = strings[~ok]
+        out[failed.index] = [parse_dt(x) for x in failed]
+
+    if is_other.any():
+        out[is_other] = [parse_dt(x) for x in s[is_other]]
+
+    return out
+
+
+def clean_batch(docs):
+    if not docs:
+        return []
+
+    df = pd.DataFrame(docs, dtype=object)
+    df = df.drop(columns=["_id"], errors="ignore")
+
+    # CLEANING STEP 1: Convert NaN (and the NaN padding for missing keys) to None
+    df = df.where(df.notna(), None)
+
+    # CLEANING STEP 2: Normalize text fields
+    for field in TEXT_FIELDS:
+        if field in df.columns:
+            df[field] = _norm_text_column(df[field])
+
+    # CLEANING STEP 3: Converts string timestamps into objects
+    for dt_field in DATETIME_FIELDS:
+        if dt_field in df.columns:
+            df[dt_field] = _parse_dt_column(df[dt_field])
+
+    # rebuild the dicts from plain column lists (faster than to_dict on object columns)
+    columns = list(df.columns)
+    records = [dict(zip(columns, row)) for row in zip(*(df[c].tolist() for c in columns))]
+
+    # drop the keys pandas added for documents that never had them
+    n_cols = len(df.columns)
+    for doc, record in zip(docs, records):
+        if len(doc) - ("_id" in doc) != n_cols:
+            for key in [k for k in record if k not in doc]:
+                del record[key]
+
+    return records
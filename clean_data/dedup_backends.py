@@ -0,0 +1,171 @@
+import re
+import sys
+import math
+import hashlib
+from pymongo.errors import BulkWriteError
+
+# --------------------------------------------------------------
+# DUPLICATE-ID BACKENDS FOR SILVER CLEANING
+#   seen(id) returns True if the ID was already cleaned, and
+#   otherwise remembers it. Pick one with DEDUP_BACKEND=...
+#     set    - Python set of ID strings (original behaviour)
+#     bitmap - 1 bit per numeric part of "A-<int>" IDs
+#     bloom  - Bloom filter, "maybe seen" is confirmed in MongoDB
+#              (the unique index on accidents_clean.ID catches the rest)
+#     index  - unique index on accidents_clean.ID; MongoDB rejects
+#              duplicates and we only count the errors
+# --------------------------------------------------------------
+ID_PATTERN = re.compile(r"^A-(\d+)$")
+CLEAN_ID_INDEX = "idx_clean_id_unique"
+DUPLICATE_KEY_ERROR = 11000
+
+
+def ensure_clean_id_index(clean):
+    clean.create_index("ID", unique=True, name=CLEAN_ID_INDEX)
+
+
+class SetDedup:
+    name = "set"
+    server_side = False
+
+    def __init__(self):
+        self.ids = set()
+
+    def seen(self, accident_id):
+        if accident_id in self.ids:
+            return True
+        self.ids.add(accident_id)
+        return False
+
+    def flushed(self):
+        pass
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.ids) + sum(sys.getsizeof(i) for i in self.ids)
+
+
+class BitmapDedup:
+    name = "bitmap"
+    server_side = False
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.other_ids = set()   # anything that does not look like "A-<int>"
+
+    def seen(self, accident_id):
+        match = ID_PATTERN.match(accident_id)
+        if not match:
+            if accident_id in self.other_ids:
+                return True
+            self.other_ids.add(accident_id)
+            return False
+
+        n = int(match.group(1))
+        byte, bit = divmod(n, 8)
+        if byte >= len(self.bits):
+            # grow by at least 1MB at a time (8M IDs)
+            self.bits.extend(bytes(max(byte + 1 - len(self.bits), 1 << 20)))
+
+        mask = 1 << bit
+        if self.bits[byte] & mask:
+            return True
+        self.bits[byte] |= mask
+        return False
+
+    def flushed(self):
+        pass
+
+    def memory_bytes(self):
+        return (sys.getsizeof(self.bits) + sys.getsizeof(self.other_ids)
+                + sum(sys.getsizeof(i) for i in self.other_ids))
+
+
+class BloomDedup:
+    name = "bloom"
+    # the filter starts empty, so in an incremental run IDs stored by earlier runs
+    # are only caught by the unique index; their duplicate-key errors count as duplicates
+    server_side = True
+
+    # confirm(id) must answer exactly whether id is already stored
+    def __init__(self, confirm, expected_items=8_000_000, false_positive_rate=0.001):
+        self.confirm = confirm
+        n_bits = int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2))
+        self.n_bits = max(n_bits, 8)
+        self.n_hashes = max(1, round(self.n_bits / expected_items * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+        # IDs queued for the next insert_many, not yet visible in MongoDB
+        self.pending = set()
+        self.confirm_queries = 0
+
+    def _positions(self, accident_id):
+        digest = hashlib.blake2b(accident_id.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def seen(self, accident_id):
+        positions = self._positions(accident_id)
+        maybe_seen = all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+        if maybe_seen:
+            # exact confirmation for the (rare) Bloom hits
+            if accident_id in self.pending:
+                return True
+            self.confirm_queries += 1
+            if self.confirm(accident_id):
+                return True
+
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.pending.add(accident_id)
+        return False
+
+    def flushed(self):
+        self.pending.clear()
+
+    def memory_bytes(self):
+        return (sys.getsizeof(self.bits) + sys.getsizeof(self.pending)
+                + sum(sys.getsizeof(i) for i in self.pending))
+
+
+class IndexDedup:
+    name = "index"
+    server_side = True
+
+    def seen(self, accident_id):
+        return False
+
+    def flushed(self):
+        pass
+
+    def memory_bytes(self):
+        return 0
+
+
+def make_dedup_backend(name, clean):
+    if name == "set":
+        return SetDedup()
+    if name == "bitmap":
+        return BitmapDedup()
+    if name == "bloom":
+        ensure_clean_id_index(clean)   # keeps the confirmation lookups cheap
+        return BloomDedup(lambda accident_id: clean.count_documents({"ID": accident_id}, limit=1) > 0)
+    if name == "index":
+        ensure_clean_id_index(clean)
+        return IndexDedup()
+    raise ValueError(f"Unknown DEDUP_BACKEND '{name}' (use set, bitmap, bloom or index)")
+
+
+# Returns how many documents MongoDB rejected as duplicate IDs
+def insert_clean_batch(clean, batch, dedup):
+    try:
+        clean.insert_many(batch, ordered=False)
+        rejected = 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not dedup.server_side or any(err["code"] != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+        rejected = len(errors)
+
+    dedup.flushed()
+    return rejected
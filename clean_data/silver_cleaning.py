@@ -1,60 +1,322 @@
 import os
-import pandas as pd
-from datetime import datetime
-from pymongo import MongoClient
-from dotenv import load_dotenv
-
-load_dotenv()
+import sys
+import time
+import asyncio
+import functools
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from pymongo.errors import BulkWriteError
+from cleaning_rules import clean_document, clean_batch
+from dedup_backends import (make_dedup_backend, insert_clean_batch, ensure_clean_id_index, IndexDedup,
+                            DUPLICATE_KEY_ERROR)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import (get_client, get_db, backend_label, require_shared_storage, async_client, async_db,
+                              STORAGE_BACKEND)
+from pipeline import instrumentation, async_io, compact_encoding
 
 # --------------------------------------------------------------
 # DATABASE CONFIGURATION
+# (the connection comes from pipeline/storage.py, see STORAGE_BACKEND)
 # --------------------------------------------------------------
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI not found in .env")
-
-DB_NAME = "bigdata_capstone"
 RAW_COL = "accidents_raw"
 CLEAN_COL = "accidents_clean"
-MAX_RECORDS = 1_000_000
+WATERMARK_COL = "pipeline_watermarks"
+MAX_RECORDS = int(os.getenv("MAX_RECORDS", "1000000"))   # 0 = no cap
+BATCH_SIZE = 5000
+
+# "row" = clean_document() per document, "batch" = clean_batch() per cursor batch
+CLEAN_MODE = os.getenv("CLEAN_MODE", "row")
+# "full" = rebuild accidents_clean, "incremental" = only raw docs past the silver watermark
+RUN_MODE = os.getenv("RUN_MODE", "full")
+# set / bitmap / bloom / index, see dedup_backends.py
+# (incremental runs need a backend that remembers earlier runs: bloom or index)
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "index" if RUN_MODE == "incremental" else "set")
+# > 1 = split accidents_raw into _id ranges cleaned by this many worker processes
+WORKERS = int(os.getenv("WORKERS", "1"))
+PARTITIONS_PER_WORKER = 4
+# "sync" = blocking cursor + insert_many, "async" = AsyncMongoClient with prefetch and writes in flight
+# (pipeline/async_io.py; single process, needs atlas or local)
+IO_MODE = os.getenv("IO_MODE", "sync")
+# how accidents_clean stores documents: SILVER_FORMAT=wide/compact, SILVER_LAYOUT=collection/timeseries
+# (see pipeline/compact_encoding.py)
+
+
+# Yields (raw _id, cleaned document) in cursor order, one at a time or a batch at a time
+def cleaned_docs(cursor):
+    cursor = instrumentation.timed_cursor(cursor, "silver", BATCH_SIZE)
+
+    if CLEAN_MODE != "batch":
+        for doc in cursor:
+            raw_id = doc.get("_id")
+            with instrumentation.timed("silver", "transform", 1):
+                doc = clean_document(doc)
+            yield raw_id, doc
+        return
+
+    raw_batch = []
+    for doc in cursor:
+        raw_batch.append(doc)
+        if len(raw_batch) >= BATCH_SIZE:
+            raw_ids = [d.get("_id") for d in raw_batch]
+            with instrumentation.timed("silver", "transform", len(raw_batch)):
+                cleaned = clean_batch(raw_batch)
+            yield from zip(raw_ids, cleaned)
+            raw_batch = []
+
+    raw_ids = [d.get("_id") for d in raw_batch]
+    with instrumentation.timed("silver", "transform", len(raw_batch)):
+        cleaned = clean_batch(raw_batch)
+    yield from zip(raw_ids, cleaned)
+
+
+# --------------------------------------------------------------
+# WATERMARKS
+#   silver = last accidents_raw _id that has been cleaned
+#   gold   = last accidents_clean _id that has been aggregated
+# --------------------------------------------------------------
+def get_watermark(db, layer):
+    doc = db[WATERMARK_COL].find_one({"_id": layer})
+    return doc["last_id"] if doc else None
+
 
+def watermark_update(layer, last_id):
+    return {"_id": layer}, {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)}}
 
 
+def save_watermark(db, layer, last_id):
+    db[WATERMARK_COL].update_one(*watermark_update(layer, last_id), upsert=True)
+
+
+# --------------------------------------------------------------
+# PARALLEL CLEANING
+#   accidents_raw is split into _id ranges with $bucketAuto and
+#   each range is cleaned by a worker process with its own
+#   MongoClient (kept for every range the worker takes). Before
+#   the workers start, one $group on accidents_raw finds the
+#   lowest raw _id of every repeated ID; workers skip the other
+#   copies, so the first copy in file order wins no matter which
+#   worker writes first. IDs already in accidents_clean (earlier
+#   incremental runs) are still caught by the unique index.
+#   MAX_RECORDS cannot be honoured deterministically across
+#   workers, so WORKERS>1 needs MAX_RECORDS=0.
 # --------------------------------------------------------------
-# TEXT NORMALIZATION HELPER FUNCTIONS
-# -------------------------------------------------------------
-# Trimming leading/trailing whitespace
-def norm_text(x):
-    if x is None:
-        return None
+def partition_ranges(raw, query, n_partitions):
+    buckets = raw.aggregate([
+        {"$match": query},
+        {"$project": {"_id": 1}},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": n_partitions}},
+    ], allowDiskUse=True)
+
+    # every bucket's max is the next bucket's min, only the last one is inclusive
+    bounds = [(b["_id"]["min"], b["_id"]["max"]) for b in buckets]
+    ranges = []
+    for i, (low, high) in enumerate(bounds):
+        last = i == len(bounds) - 1
+        ranges.append({"$gte": low, "$lte" if last else "$lt": high})
+    return ranges
+
+
+def first_copies(raw, query):
+    """ID -> lowest raw _id, for every ID that appears more than once in the raw documents matching query."""
+    repeated = raw.aggregate([
+        {"$match": query},
+        {"$group": {"_id": "$ID", "first": {"$min": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    return {g["_id"]: g["first"] for g in repeated if isinstance(g["_id"], str) and g["_id"]}
+
+
+def clean_partition(id_range, first_copy=None):
+    first_copy = first_copy or {}
+    db = get_db("silver")
+    raw = db[RAW_COL]
+    clean = db[CLEAN_COL]
+    dedup = IndexDedup()
+    writer = compact_encoding.SilverWriter(db)
+
+    counts = {"inserted": 0, "duplicates": 0, "dropped": 0}
+    batch = []
+
+    cursor = raw.find({"_id": id_range}, no_cursor_timeout=True).sort("_id", 1).batch_size(BATCH_SIZE)
+    def write(batch):
+        stored = writer.prepare(batch)
+        rejected = insert_clean_batch(clean, stored, dedup)
+        counts["inserted"] += len(stored) - rejected
+        counts["duplicates"] += rejected
+
+    for raw_id, doc in cleaned_docs(cursor):
+        accident_id = doc.get("ID")
+        if not accident_id:
+            counts["dropped"] += 1
+            continue
+        if first_copy.get(accident_id, raw_id) != raw_id:
+            counts["duplicates"] += 1   # a later copy; the first one is cleaned by whichever range holds it
+            continue
+
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            write(batch)
+            batch = []
+
+    if batch:
+        write(batch)
 
-    if isinstance(x, str):
-        s = x.strip()
-        if s == "" or s.lower() in {"na", "n/a", "none", "null", "unknown"}:
-            return None
-        return s
+    return counts
+
+
+def run_parallel(db, query):
+    require_shared_storage("WORKERS>1")
+    raw = db[RAW_COL]
+    clean = db[CLEAN_COL]
+    ensure_clean_id_index(clean)
 
-    return x
+    # pin the upper end so the watermark matches exactly what the workers saw
+    last = raw.find_one(query, {"_id": 1}, sort=[("_id", -1)])
+    if last is None:
+        print("No raw documents to clean")
+        return {"inserted": 0, "duplicates": 0, "dropped": 0}
 
-# Convert date/time strings into Python datetime objects.
-def parse_dt(x):
-    if x is None:
-        return None
+    ranges = partition_ranges(raw, query, WORKERS * PARTITIONS_PER_WORKER)
+    first_copy = first_copies(raw, {"_id": {**query.get("_id", {}), "$lte": last["_id"]}})
+    print(f"Cleaning {len(ranges)} _id ranges with {WORKERS} workers ({len(first_copy):,} repeated IDs)")
 
-    if isinstance(x, datetime):
-        return x
+    totals = {"inserted": 0, "duplicates": 0, "dropped": 0}
+    # spawn, so no worker inherits this process's MongoClient
+    clean_range = functools.partial(clean_partition, first_copy=first_copy)
+    with ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for done, counts in enumerate(pool.map(clean_range, ranges), start=1):
+            for key, value in counts.items():
+                totals[key] += value
+            print(f"Ranges done: {done}/{len(ranges)} | inserted: {totals['inserted']:,} | "
+                  f"duplicates: {totals['duplicates']:,} | dropped: {totals['dropped']:,}")
 
-    dt = pd.to_datetime(x, errors="coerce")
-    if pd.isna(dt):
-        return None
+    save_watermark(db, "silver", last["_id"])
+    return totals
 
-    return dt.to_pydatetime()
 
-# prevents MongoDB from storing NaN values
-def nan_to_none(x):
-    if isinstance(x, float) and pd.isna(x):
-        return None
-    return x
+# --------------------------------------------------------------
+# ASYNC CLEANING (IO_MODE=async)
+#   while batch N is being cleaned in the transform pool, the
+#   next cursor batches are already on their way and the
+#   insert_many calls for earlier batches are still in flight.
+#   Dedup runs on the event loop in _id order, so the first copy
+#   of an ID still wins. DEDUP_BACKEND=index leaves dedup to the
+#   unique index, so there only one write is in flight at a time
+#   (concurrent insert_many calls would race for an ID). The
+#   silver watermark only moves past a batch once it and every
+#   batch before it have been written.
+# --------------------------------------------------------------
+def clean_raw_batch(raw_batch):
+    # runs in the transform pool (thread or spawned process)
+    if CLEAN_MODE == "batch":
+        return clean_batch(raw_batch)
+    return [clean_document(doc) for doc in raw_batch]
+
+
+async def clean_async(query):
+    if DEDUP_BACKEND not in {"set", "bitmap", "index"}:
+        raise ValueError("IO_MODE=async supports DEDUP_BACKEND=set, bitmap or index "
+                         "(bloom confirms its hits with blocking queries)")
+
+    client = async_client()
+    pool = async_io.transform_pool()
+    loop = asyncio.get_running_loop()
+    transforms = async_io.InFlight(async_io.TRANSFORM_WORKERS)
+    # the index backend's duplicates are settled by the insert order
+    writes = async_io.InFlight(1 if DEDUP_BACKEND == "index" else async_io.WRITES_IN_FLIGHT)
+
+    db = async_db(client, "silver")
+    raw = db[RAW_COL]
+    clean = db[CLEAN_COL]
+    dedup = make_dedup_backend(DEDUP_BACKEND, get_db("silver")[CLEAN_COL])
+    writer = compact_encoding.SilverWriter(get_db("silver"))
+    counts = {"inserted": 0, "duplicates": 0, "dropped": 0, "skipped": 0}
+
+    async def write(batch):
+        # same duplicate handling as insert_clean_batch
+        stored = writer.prepare(batch)
+        counts["inserted"] -= len(batch) - len(stored)
+        counts["skipped"] += len(batch) - len(stored)
+        batch = stored
+        if not batch:
+            return 0
+        try:
+            await clean.insert_many(batch, ordered=False)
+            return 0
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not dedup.server_side or any(err["code"] != DUPLICATE_KEY_ERROR for err in errors):
+                raise
+            return len(errors)
+
+    async def written(finished):
+        if not finished:
+            return
+        for _, rejected in finished:
+            counts["inserted"] -= rejected
+            counts["duplicates"] += rejected
+        # everything up to the newest finished batch is in accidents_clean
+        await db[WATERMARK_COL].update_one(*watermark_update("silver", finished[-1][0]), upsert=True)
+        print(f"Inserted clean: {counts['inserted']:,} | duplicates skipped: {counts['duplicates']:,}")
+
+    # CLEANING STEP 4 on one cleaned batch; False once MAX_RECORDS is reached.
+    # raw_ids[i] is the raw _id of cleaned[i]; the write is tagged with the last
+    # one handled, so a batch cut short by MAX_RECORDS never moves the watermark
+    # past raw documents that were not cleaned
+    async def dedup_and_write(raw_ids, cleaned):
+        batch = []
+        last_raw_id = raw_ids[-1]
+        for raw_id, doc in zip(raw_ids, cleaned):
+            accident_id = doc.get("ID")
+            if not accident_id:
+                counts["dropped"] += 1
+            elif dedup.seen(accident_id):
+                counts["duplicates"] += 1
+            else:
+                batch.append(doc)
+                counts["inserted"] += 1
+                if MAX_RECORDS and counts["inserted"] >= MAX_RECORDS:
+                    last_raw_id = raw_id
+                    break
+        await written(await writes.submit(write(batch), last_raw_id))
+        return not (MAX_RECORDS and counts["inserted"] >= MAX_RECORDS)
+
+    try:
+        cursor = raw.find(query).sort("_id", 1).batch_size(BATCH_SIZE)
+        more = True
+        async for raw_batch in async_io.prefetched_batches(cursor, BATCH_SIZE, stage="silver"):
+            # read the _ids first, clean_document() pops them
+            raw_ids = [doc["_id"] for doc in raw_batch]
+            cleaning = loop.run_in_executor(pool, clean_raw_batch, raw_batch)
+            for batch_ids, cleaned in await transforms.submit(cleaning, raw_ids):
+                more = more and await dedup_and_write(batch_ids, cleaned)
+            if not more:
+                print(f"\nReached max records limit of {MAX_RECORDS}. Stopping cleaning.")
+                break
+
+        for batch_ids, cleaned in await transforms.drain():
+            if more:
+                more = await dedup_and_write(batch_ids, cleaned)
+        await written(await writes.drain())
+    finally:
+        transforms.cancel()
+        writes.cancel()
+        pool.shutdown(cancel_futures=True)
+        await client.close()
+
+    return counts
+
+
+# Everything except _id_ and unique indexes (those catch duplicates while loading)
+def drop_secondary_indexes(col):
+    dropped = []
+    for name, info in col.index_information().items():
+        if name != "_id_" and not info.get("unique"):
+            col.drop_index(name)
+            dropped.append(name)
+    return dropped
 
 
 # --------------------------------------------------------------
@@ -63,92 +325,131 @@ def nan_to_none(x):
 # accidents_clean
 # --------------------------------------------------------------
 
+@instrumentation.stage("silver")
 def main():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=10000)
-    client.admin.command("ping")
-    print("Connected to MongoDB successfully!")
+    get_client().admin.command("ping")
+    print(f"Connected to {backend_label()} successfully!")
 
-    db = client[DB_NAME]
+    db = get_db("silver")
     raw = db[RAW_COL]
     clean = db[CLEAN_COL]
 
-    # Clean startto prevent duplicate data on re-runs
-    clean.delete_many({})
-    print("Cleared accidents_clean")
+    compact_encoding.check_settings(RUN_MODE, DEDUP_BACKEND, WORKERS, STORAGE_BACKEND)
+    if WORKERS > 1 and MAX_RECORDS:
+        raise ValueError("WORKERS>1 cleans _id ranges concurrently and cannot stop at MAX_RECORDS; "
+                         "set MAX_RECORDS=0 or WORKERS=1")
+    query = {}
+    if RUN_MODE == "incremental":
+        if DEDUP_BACKEND not in {"bloom", "index"}:
+            raise ValueError("Incremental cleaning needs DEDUP_BACKEND=bloom or index "
+                             "(set/bitmap only know the IDs seen in this run)")
+        compact_encoding.check_incremental(db)
+        watermark = get_watermark(db, "silver")
+        if watermark is not None:
+            query = {"_id": {"$gt": watermark}}
+        print(f"Incremental run from silver watermark {watermark}")
+    else:
+        # Clean startto prevent duplicate data on re-runs
+        compact_encoding.reset_clean_collection(db, CLEAN_COL)
+        # secondary indexes slow the bulk load down; query_modeling.py rebuilds them afterwards
+        dropped = drop_secondary_indexes(clean)
+        if dropped:
+            print(f"Dropped secondary indexes until after the load: {dropped}")
+        # accidents_clean gets all new _ids, so the gold layer must rebuild too
+        db[WATERMARK_COL].delete_one({"_id": "gold"})
+        print("Cleared accidents_clean")
+
+    if WORKERS > 1 or IO_MODE == "async":
+        start = time.perf_counter()
+        totals = run_parallel(db, query) if WORKERS > 1 else asyncio.run(clean_async(query))
+        elapsed = time.perf_counter() - start
+
+        print(f"\n{'Parallel' if WORKERS > 1 else 'Async'} cleaning finished")
+        print(f"Inserted into accidents_clean: {totals['inserted']:,}")
+        print(f"Duplicates skipped: {totals['duplicates']:,}")
+        print(f"Dropped (no ID): {totals['dropped']:,}")
+        if totals.get("skipped"):
+            print(f"Skipped (no Start_Time, time-series layout): {totals['skipped']:,}")
+        print(f"Elapsed: {elapsed:.1f}s")
+        return
 
     # Track IDs to avoid duplicates
-    seen_ids = set()
+    dedup = make_dedup_backend(DEDUP_BACKEND, clean)
+    writer = compact_encoding.SilverWriter(db)
+    start = time.perf_counter()
 
     # Counters for reporting
     inserted = 0
     duplicates = 0
+    dropped = 0
 
     batch = []
+    last_raw_id = None
 
-    # Stream data from MongoDB in chunks
-    cursor = raw.find({}, no_cursor_timeout=True).batch_size(5000)
-
-    for doc in cursor:
-        doc.pop("_id", None)
-
-        # ------------------------------------------------------
-        # CLEANING STEP 1: Convert float NaN values to None
-        # ------------------------------------------------------
-        for k, v in list(doc.items()):
-            doc[k] = nan_to_none(v)
+    # Write a batch, then move the watermark past every raw doc handled so far
+    def flush(batch):
+        with instrumentation.timed("silver", "insert", len(batch)):
+            stored = writer.prepare(batch)
+            rejected = insert_clean_batch(clean, stored, dedup) if stored else 0
+        if last_raw_id is not None:
+            save_watermark(db, "silver", last_raw_id)
+        return rejected
 
-        # ------------------------------------------------------
-        # CLEANING STEP 2: Normalize text fields
-        # ------------------------------------------------------
-        for field in ["City", "County", "State", "Weather_Condition",
-                      "Wind_Direction", "Street", "Zipcode"]:
-            if field in doc:
-                doc[field] = norm_text(doc[field])
+    # Stream data from MongoDB in chunks (in _id order so the watermark is meaningful)
+    cursor = raw.find(query, no_cursor_timeout=True).sort("_id", 1).batch_size(BATCH_SIZE)
 
-        # ------------------------------------------------------
-        # CLEANING STEP 3: Converts string timestamps into objects
-        # ------------------------------------------------------
-        for dt_field in ["Start_Time", "End_Time", "Weather_Timestamp"]:
-            if dt_field in doc:
-                doc[dt_field] = parse_dt(doc[dt_field])
+    for raw_id, doc in cleaned_docs(cursor):
+        last_raw_id = raw_id
 
         # ------------------------------------------------------
         # CLEANING STEP 4: Remove duplicate records
         # ------------------------------------------------------
         accident_id = doc.get("ID")
         if not accident_id:
+            dropped += 1
             continue
 
-        if accident_id in seen_ids:
+        if dedup.seen(accident_id):
             duplicates += 1
             continue
 
-        seen_ids.add(accident_id)
-
         # Add cleaned document to batch !!IMPORTANT MILLION LIMIT TRESHOLD HERE 
         batch.append(doc)
         inserted += 1
 
-        if inserted >= MAX_RECORDS:
-            if batch:
-                clean.insert_many(batch, ordered=False)
-                batch = []
+        if MAX_RECORDS and inserted >= MAX_RECORDS:
+            rejected = flush(batch)
+            inserted -= rejected
+            duplicates += rejected
+            batch = []
             print(f"\nReached max records limit of {MAX_RECORDS}. Stopping cleaning.")
             break
 
         # Send new batches to MongoDB
-        if len(batch) >= 5000:
-            clean.insert_many(batch, ordered=False)
+        if len(batch) >= BATCH_SIZE:
+            rejected = flush(batch)
+            inserted -= rejected
+            duplicates += rejected
             batch = []
             print(f"Inserted clean: {inserted:,} | duplicates skipped: {duplicates:,}")
 
     # Insert any remaining documents after 5000 batch
-    if batch:
-        clean.insert_many(batch, ordered=False)
+    rejected = flush(batch)
+    inserted -= rejected
+    duplicates += rejected
+
+    inserted -= writer.skipped
+    elapsed = time.perf_counter() - start
 
     print("\nCleaning finished")
     print(f"Inserted into accidents_clean: {inserted:,}")
     print(f"Duplicates skipped: {duplicates:,}")
+    print(f"Dropped (no ID): {dropped:,}")
+    if writer.skipped:
+        print(f"Skipped (no Start_Time, time-series layout): {writer.skipped:,}")
+    print(f"Stored as: SILVER_FORMAT={writer.fmt}, SILVER_LAYOUT={writer.layout}")
+    print(f"Dedup backend: {dedup.name} | memory: {dedup.memory_bytes() / 1024 ** 2:,.1f} MB | "
+          f"elapsed: {elapsed:.1f}s ({(inserted + duplicates) / elapsed if elapsed else 0:,.0f} docs/sec)")
 
 
 if __name__ == "__main__":
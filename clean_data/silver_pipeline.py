@@ -0,0 +1,226 @@
+import os
+import math
+from datetime import datetime
+from silver_cleaning import (
+    get_client, get_db, backend_label, RAW_COL, CLEAN_COL, WATERMARK_COL, MAX_RECORDS, save_watermark,
+)
+from cleaning_rules import TEXT_FIELDS, DATETIME_FIELDS, NULL_TOKENS, clean_document
+from pipeline import compact_encoding
+
+# --------------------------------------------------------------
+# SERVER-SIDE SILVER CLEANING
+#   Same cleaning rules as silver_cleaning.py, but run as one
+#   aggregation pipeline inside MongoDB, so documents never
+#   travel to Python and back.
+# --------------------------------------------------------------
+# "out" replaces accidents_clean, "merge" upserts into it on ID
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "out")
+PARITY_SAMPLE = int(os.getenv("PARITY_SAMPLE", "1000"))   # 0 = skip the parity check
+
+
+# --------------------------------------------------------------
+# EXPRESSION BUILDERS
+# --------------------------------------------------------------
+# CLEANING STEP 1: every double NaN in the document becomes null
+# (NaN == NaN is true in aggregation expressions)
+def nan_to_null_doc():
+    return {
+        "$arrayToObject": {
+            "$map": {
+                "input": {"$objectToArray": "$$ROOT"},
+                "in": {
+                    "k": "$$this.k",
+                    "v": {
+                        "$cond": [
+                            {"$and": [
+                                {"$eq": [{"$type": "$$this.v"}, "double"]},
+                                {"$eq": ["$$this.v", float("nan")]},
+                            ]},
+                            None,
+                            "$$this.v",
+                        ]
+                    },
+                },
+            }
+        }
+    }
+
+
+# CLEANING STEP 2: same rules as norm_text()
+def norm_text_expr(field):
+    trimmed = {"$trim": {"input": f"${field}"}}
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$ne": [{"$type": f"${field}"}, "string"]}, "then": f"${field}"},
+                {"case": {"$in": [{"$toLower": trimmed}, [""] + sorted(NULL_TOKENS)]}, "then": None},
+            ],
+            "default": trimmed,
+        }
+    }
+
+
+# CLEANING STEP 3: same rules as parse_dt(); unparseable strings become null.
+# Strings with a long fractional part ("...:00.000000000") are retried
+# without it because $dateFromString only accepts milliseconds.
+def parse_dt_expr(field):
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$eq": [{"$type": f"${field}"}, "missing"]}, "then": "$$REMOVE"},
+                {"case": {"$eq": [{"$type": f"${field}"}, "date"]}, "then": f"${field}"},
+                {"case": {"$eq": [{"$type": f"${field}"}, "string"]}, "then": {
+                    "$dateFromString": {
+                        "dateString": {"$trim": {"input": f"${field}"}},
+                        "onError": {
+                            "$dateFromString": {
+                                "dateString": {"$substrCP": [{"$trim": {"input": f"${field}"}}, 0, 19]},
+                                "onError": None,
+                            }
+                        },
+                    }
+                }},
+            ],
+            "default": None,
+        }
+    }
+
+
+def output_stage():
+    if OUTPUT_MODE == "merge":
+        return {"$merge": {"into": CLEAN_COL, "on": "ID",
+                           "whenMatched": "replace", "whenNotMatched": "insert"}}
+    return {"$out": CLEAN_COL}
+
+
+# --------------------------------------------------------------
+# PIPELINE
+#   match_stage lets the parity check run the exact same steps
+#   on a handful of documents; with output=False nothing is written
+# --------------------------------------------------------------
+def build_clean_pipeline(match_stage=None, limit=MAX_RECORDS, output=True):
+    pipeline = []
+    if match_stage:
+        pipeline.append({"$match": match_stage})
+
+    pipeline += [
+        # natural insertion order, so $first keeps the same copy as the Python path
+        {"$sort": {"_id": 1}},
+        {"$replaceWith": nan_to_null_doc()},
+
+        # CLEANING STEP 4: drop records without an ID and remove duplicates
+        {"$match": {"ID": {"$nin": [None, ""]}}},
+        {"$group": {"_id": "$ID", "doc": {"$first": "$$ROOT"}}},
+        {"$replaceWith": "$doc"},
+
+        {"$set": {
+            **{field: norm_text_expr(field) for field in TEXT_FIELDS},
+            **{field: parse_dt_expr(field) for field in DATETIME_FIELDS},
+        }},
+    ]
+
+    if limit:
+        pipeline += [{"$sort": {"_id": 1}}, {"$limit": limit}]
+
+    # accidents_clean gets fresh _ids, like insert_many in the Python path
+    pipeline.append({"$unset": "_id"})
+
+    if output:
+        pipeline.append(output_stage())
+
+    return pipeline
+
+
+# --------------------------------------------------------------
+# PARITY CHECK AGAINST THE PYTHON PATH
+# --------------------------------------------------------------
+def _comparable(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, datetime):
+        # BSON dates only keep milliseconds and come back naive
+        return value.replace(microsecond=value.microsecond // 1000 * 1000, tzinfo=None)
+    return value
+
+
+def parity_check(raw, sample_size):
+    sample = list(raw.find({}).sort("_id", 1).limit(sample_size))
+    ids = [doc["_id"] for doc in sample]
+
+    python_docs = {}
+    for doc in sample:
+        doc = clean_document(doc)
+        if doc.get("ID") and doc["ID"] not in python_docs:
+            python_docs[doc["ID"]] = doc
+
+    pipeline = build_clean_pipeline({"_id": {"$in": ids}}, limit=None, output=False)
+    server_docs = {doc["ID"]: doc for doc in raw.aggregate(pipeline, allowDiskUse=True)}
+
+    mismatches = []
+    for accident_id in python_docs.keys() | server_docs.keys():
+        py_doc = python_docs.get(accident_id, {})
+        srv_doc = server_docs.get(accident_id, {})
+        for field in py_doc.keys() | srv_doc.keys():
+            py_val = _comparable(py_doc.get(field))
+            srv_val = _comparable(srv_doc.get(field))
+            if py_val != srv_val:
+                mismatches.append((accident_id, field, py_val, srv_val))
+
+    print(f"\nParity check on {len(sample):,} raw documents: "
+          f"python={len(python_docs):,} server={len(server_docs):,} mismatched fields={len(mismatches):,}")
+    for accident_id, field, py_val, srv_val in mismatches[:10]:
+        print(f"  ID={accident_id} {field}: python={py_val!r} server={srv_val!r}")
+
+    return mismatches
+
+
+def main():
+    get_client().admin.command("ping")
+    print(f"Connected to {backend_label()} successfully!")
+
+    db = get_db("silver")
+    raw = db[RAW_COL]
+    clean = db[CLEAN_COL]
+
+    if compact_encoding.SILVER_FORMAT != "wide" or compact_encoding.SILVER_LAYOUT != "collection":
+        raise ValueError("silver_pipeline.py writes wide documents to a plain collection; use silver_cleaning.py "
+                         "for SILVER_FORMAT=compact or SILVER_LAYOUT=timeseries")
+
+    if PARITY_SAMPLE:
+        mismatches = parity_check(raw, PARITY_SAMPLE)
+        if mismatches:
+            raise ValueError("Server-side cleaning does not match silver_cleaning.py; not writing.")
+
+    if OUTPUT_MODE == "merge":
+        # $merge on ID needs a unique index on the target (and wide documents to merge into)
+        compact_encoding.check_incremental(db)
+        clean.create_index("ID", unique=True, name="idx_clean_id_unique")
+    else:
+        # $out replaces the collection, but keeps its indexes
+        if compact_encoding.stored_format(db)["layout"] == "timeseries":
+            clean.drop()
+        print(f"Replacing {CLEAN_COL} with $out")
+
+    # pin the input so the silver watermark matches exactly what was cleaned
+    last = raw.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if last is None:
+        print(f"{RAW_COL} is empty, nothing to clean")
+        return
+
+    raw.aggregate(build_clean_pipeline({"_id": {"$lte": last["_id"]}}), allowDiskUse=True)
+    compact_encoding.record_format(db)
+
+    # if MAX_RECORDS cut the run short we cannot tell which raw docs were cleaned,
+    # so the next incremental run starts from the beginning (dedup skips the rest)
+    if not MAX_RECORDS or clean.estimated_document_count() < MAX_RECORDS:
+        save_watermark(db, "silver", last["_id"])
+    else:
+        db[WATERMARK_COL].delete_one({"_id": "silver"})
+    db[WATERMARK_COL].delete_one({"_id": "gold"})
+
+    print("\nServer-side cleaning finished")
+    print(f"Documents in accidents_clean: {clean.estimated_document_count():,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,137 +1,401 @@
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from datetime import datetime
+from collections import Counter
 import os
-from pymongo import MongoClient
+import sys
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import logging
-from dotenv import load_dotenv
 from typing import Optional
+from validation_report import ValidationSummary
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label, require_shared_storage, async_client, async_db
+from pipeline import instrumentation, async_io, compact_encoding
 
-def main():
-    load_dotenv()
-
-    # logging setup .txt file
-    LOG_PATH = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)),
-    "schema_validation_results.txt"
+# "model"   = original path: DataFrame round-trip + one accident_info per record
+# "adapter" = one TypeAdapter(list[accident_info]) call per batch
+# "rules"   = vectorized column checks (FIELD_RULES below), no pydantic at all
+VALIDATION_MODE = os.getenv("VALIDATION_MODE", "model")
+BATCH_SIZE = 5000  # <----- Increasing number may affect performance
+# > 1 = validate _id ranges of accidents_clean in this many worker processes
+WORKERS = int(os.getenv("WORKERS", "1"))
+PARTITIONS_PER_WORKER = 4
+# 1 = also one warning line per invalid document (only in the single-process mode);
+# by default failures only go into the summary JSON
+LOG_INVALID_DOCS = os.getenv("LOG_INVALID_DOCS", "0") == "1"
+# "sync" = blocking cursor, "async" = AsyncMongoClient prefetching the next batches while
+# TRANSFORM_WORKERS batches are validated in a pool (pipeline/async_io.py)
+IO_MODE = os.getenv("IO_MODE", "sync")
+# "mongo" = read accidents_clean, "parquet" = read its Parquet mirror (aggregated_data/parquet_mirror.py)
+READ_BACKEND = os.getenv("READ_BACKEND", "mongo")
+PARQUET_DIR = os.getenv(
+    "PARQUET_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lakehouse")
 )
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(LOG_PATH),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger(__name__)
 
-    # MongoDB connection
-    MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in .env")
+# ----------------------------------------------------------
+# Pydantic SCHEMA USED TO VALIDATE
+# ----------------------------------------------------------
+class accident_info(BaseModel):
+    ID: str
+    Source: Optional[str] = None
+    Severity: int = Field(ge=1, le=4)
 
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    client.admin.command("ping")
-    logger.info("Connected to MongoDB Atlas")
+    Start_Time: datetime
+    End_Time: datetime
+    Weather_Timestamp: Optional[datetime] = None
 
-    db = client["bigdata_capstone"]
-    col = db["accidents_clean"] # Data after cleaning folder
+    Start_Lat: float = Field(ge=-90, le=90)
+    Start_Lng: float = Field(ge=-180, le=180)
+    End_Lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    End_Lng: Optional[float] = Field(default=None, ge=-180, le=180)
 
-    # ----------------------------------------------------------
-    # Pydantic SCHEMA USED TO VALIDATE
-    # ----------------------------------------------------------
-    class accident_info(BaseModel):
-        ID: str
-        Source: Optional[str] = None
-        Severity: int = Field(ge=1, le=4)
+    # Optional: silver stores missing distances as None (they used to reach
+    # the model as NaN through the DataFrame round-trip)
+    Distance_mi: Optional[float] = Field(default=None, alias="Distance(mi)")
 
-        Start_Time: datetime
-        End_Time: datetime
-        Weather_Timestamp: Optional[datetime] = None
+    City: Optional[str] = None
+    County: Optional[str] = None
+    State: str = Field(default=None, min_length=2, max_length=2)
+    Zipcode: Optional[str] = None
+    Country: str = None
+    Timezone: Optional[str] = None
 
-        Start_Lat: float = Field(ge=-90, le=90)
-        Start_Lng: float = Field(ge=-180, le=180)
-        End_Lat: Optional[float] = Field(default=None, ge=-90, le=90)
-        End_Lng: Optional[float] = Field(default=None, ge=-180, le=180)
+    Weather_Condition: Optional[str] = None
+    Temperature_F: Optional[float] = Field(default=None, alias="Temperature(F)")
+    Visibility_mi: Optional[float] = Field(default=None, alias="Visibility(mi)")
+    Wind_Speed_mph: Optional[float] = Field(default=None, alias="Wind_Speed(mph)")
 
-        Distance_mi: float = Field(default=None, alias="Distance(mi)")
+    Traffic_Signal: Optional[bool] = None
+    Junction: Optional[bool] = None
 
-        City: Optional[str] = None
-        County: Optional[str] = None
-        State: str = Field(default=None, min_length=2, max_length=2)
-        Zipcode: Optional[str] = None
-        Country: str = None
-        Timezone: Optional[str] = None
 
-        Weather_Condition: Optional[str] = None
-        Temperature_F: Optional[float] = Field(default=None, alias="Temperature(F)")
-        Visibility_mi: Optional[float] = Field(default=None, alias="Visibility(mi)")
-        Wind_Speed_mph: Optional[float] = Field(default=None, alias="Wind_Speed(mph)")
+accident_list_adapter = TypeAdapter(list[accident_info])
 
-        Traffic_Signal: Optional[bool] = None
-        Junction: Optional[bool] = None
 
+# ----------------------------------------------------------
+# VECTORIZED RULES (same constraints as accident_info)
+#   field: (kind, required, min, max)
+#   length limits apply to strings, value limits to numbers.
+#   Values are accepted the way pydantic's lax mode accepts
+#   them: native types take a fast path, anything else
+#   ("30.5", 1 for a bool, an ISO date string) goes through
+#   the same TypeAdapter coercion as accident_info.
+# ----------------------------------------------------------
+FIELD_RULES = {
+    "ID": ("str", True, None, None),
+    "Source": ("str", False, None, None),
+    "Severity": ("int", True, 1, 4),
+    "Start_Time": ("datetime", True, None, None),
+    "End_Time": ("datetime", True, None, None),
+    "Weather_Timestamp": ("datetime", False, None, None),
+    "Start_Lat": ("float", True, -90, 90),
+    "Start_Lng": ("float", True, -180, 180),
+    "End_Lat": ("float", False, -90, 90),
+    "End_Lng": ("float", False, -180, 180),
+    "Distance(mi)": ("float", False, None, None),
+    "City": ("str", False, None, None),
+    "County": ("str", False, None, None),
+    "State": ("str", True, 2, 2),
+    "Zipcode": ("str", False, None, None),
+    "Country": ("str", True, None, None),
+    "Timezone": ("str", False, None, None),
+    "Weather_Condition": ("str", False, None, None),
+    "Temperature(F)": ("float", False, None, None),
+    "Visibility(mi)": ("float", False, None, None),
+    "Wind_Speed(mph)": ("float", False, None, None),
+    "Traffic_Signal": ("bool", False, None, None),
+    "Junction": ("bool", False, None, None),
+}
+# required fields that accident_info gives a default (State, Country): a document
+# may leave them out, but a stored null still fails
+DEFAULTED = {field for field, (_, required, _, _) in FIELD_RULES.items()
+             if required and not accident_info.model_fields[field].is_required()}
+ABSENT = object()   # the document has no such key
 
-    # Validate documents 
-    valid_count = 0
-    invalid_count = 0
-    processed = 0
+PYTHON_TYPES = {
+    "str": (str,),
+    "int": (int,),
+    "float": (int, float),   # bool is an int, and pydantic's lax mode takes it too
+    "datetime": (datetime,),
+    "bool": (bool,),
+}
+LAX_ADAPTERS = {kind: TypeAdapter(t) for kind, t in
+                {"str": str, "int": int, "float": float, "datetime": datetime, "bool": bool}.items()}
 
-    BATCH_SIZE = 5000  # <----- Increasing number may affect performance 
-    batch = []
 
-    # -----------------------------------
-    # MONGO DB DATA TO PYTHON IN BATCHES
-    # -----------------------------------
-    cursor = col.find({}, no_cursor_timeout=True).batch_size(BATCH_SIZE)
+def _coerce(value, kind):
+    """(value as accident_info would store it, ok) for a non-null value of a non-native type."""
+    try:
+        return LAX_ADAPTERS[kind].validate_python(value), True
+    except ValidationError:
+        return None, False
+
+
+def _column_failures(values, kind, required, low, high, defaulted=False):
+    """Returns {rule name: boolean numpy mask of failing rows} for one column."""
+    n = len(values)
+    is_absent = np.fromiter((v is ABSENT for v in values), dtype=bool, count=n)
+    is_null = np.fromiter((v is None or v is ABSENT for v in values), dtype=bool, count=n)
+    native = PYTHON_TYPES[kind]
+    coerced = [(v, True) if v is None or v is ABSENT or isinstance(v, native) else _coerce(v, kind) for v in values]
+    wrong_type = np.fromiter((not ok for _, ok in coerced), dtype=bool, count=n)
+
+    missing = np.zeros(n, dtype=bool)
+    if required:
+        missing = is_null & ~is_absent if defaulted else is_null
+    failures = {"missing": missing, "type": wrong_type}
+    checkable = ~is_null & ~wrong_type
 
-    logger.info("Starting schema validation")
+    if kind in {"int", "float"} and (low is not None or high is not None):
+        numbers = np.array([v if ok else 0 for (v, _), ok in zip(coerced, checkable)], dtype=float)
+        out_of_range = np.zeros(n, dtype=bool)
+        if low is not None:
+            out_of_range |= ~(numbers >= low)
+        if high is not None:
+            out_of_range |= ~(numbers <= high)
+        failures["range"] = checkable & out_of_range
 
-    for doc in cursor:
-        # remove Mongo _id before validation
-        doc.pop("_id", None)
+    if kind == "str" and (low is not None or high is not None):
+        lengths = np.array([len(v) if ok else 0 for (v, _), ok in zip(coerced, checkable)])
+        failures["length"] = checkable & ((lengths < (low or 0)) | (lengths > (high or np.inf)))
+
+    return failures
+
+
+# ----------------------------------------------------------
+# BATCH VALIDATORS
+#   each returns (valid_count, rule_failures, invalid)
+#   rule_failures: Counter of "field:error_type"
+#   invalid: list of (ID, error list) for every invalid document
+# ----------------------------------------------------------
+def validate_batch_model(batch):
+    valid = 0
+    failures = Counter()
+    invalid = []
+
+    df = pd.DataFrame(batch)
+    for record in df.to_dict(orient="records"):
+        try:
+            accident_info(**record)
+            valid += 1
+        except ValidationError as e:
+            errors = e.errors()
+            failures.update(f"{err['loc'][-1]}:{err['type']}" for err in errors)
+            invalid.append((record.get("ID"), errors))
+
+    return valid, failures, invalid
+
+
+def validate_batch_adapter(batch):
+    try:
+        accident_list_adapter.validate_python(batch)
+        return len(batch), Counter(), []
+    except ValidationError as e:
+        errors = e.errors()
+
+    failures = Counter()
+    per_doc = {}
+    for err in errors:
+        index, field = err["loc"][0], err["loc"][-1]
+        failures[f"{field}:{err['type']}"] += 1
+        per_doc.setdefault(index, []).append(err)
+
+    invalid = [(batch[i].get("ID"), errs) for i, errs in per_doc.items()]
+    return len(batch) - len(per_doc), failures, invalid
+
+
+def validate_batch_rules(batch):
+    n = len(batch)
+    any_failed = np.zeros(n, dtype=bool)
+    failures = Counter()
+    reasons = {}
+
+    for field, (kind, required, low, high) in FIELD_RULES.items():
+        values = [doc.get(field, ABSENT) for doc in batch]
+        for rule, mask in _column_failures(values, kind, required, low, high, field in DEFAULTED).items():
+            count = int(mask.sum())
+            if not count:
+                continue
+            failures[f"{field}:{rule}"] += count
+            any_failed |= mask
+            for i in np.flatnonzero(mask):
+                reasons.setdefault(int(i), []).append({"loc": (field,), "type": rule})
+
+    invalid = [(batch[i].get("ID"), errs) for i, errs in reasons.items()]
+    return n - int(any_failed.sum()), failures, invalid
+
+
+VALIDATORS = {
+    "model": validate_batch_model,
+    "adapter": validate_batch_adapter,
+    "rules": validate_batch_rules,
+}
+
+
+# ----------------------------------------------------------
+# VALIDATION RUNNERS
+# ----------------------------------------------------------
+def log_invalid(logger, invalid):
+    if logger and LOG_INVALID_DOCS:
+        for accident_id, errors in invalid:
+            logger.warning(
+                f"Schema validation failed for ID={accident_id} | errors={errors[:2]}"
+            )
+
+
+# decoder: compact_encoding.Decoder when accidents_clean holds compact documents
+def validate_cursor(cursor, summary, logger=None, decoder=None):
+    validate_batch = VALIDATORS[summary.mode]
+    batch = []
+
+    def run_batch(batch):
+        if decoder:
+            with instrumentation.timed("validate", "decode", len(batch)):
+                batch = decoder.decode_batch(batch)
+        with instrumentation.timed("validate", "validate", len(batch)):
+            valid, failures, invalid = validate_batch(batch)
+        summary.add_batch(len(batch), valid, failures, invalid)
+        log_invalid(logger, invalid)
+
+    for doc in instrumentation.timed_cursor(cursor, "validate", BATCH_SIZE):
         batch.append(doc)
 
         # When batch is full, validate the batch
         if len(batch) >= BATCH_SIZE:
-            df = pd.DataFrame(batch)
-
-            for record in df.to_dict(orient="records"):
-                try:
-                    accident_info(**record)
-                    valid_count += 1
-                except ValidationError as e:
-                    invalid_count += 1
-                    logger.warning(
-                        f"Schema validation failed for ID={record.get('ID')} | errors={e.errors()[:2]}"
-                    )
-
-            processed += len(batch)
-            logger.info(f"Processed: {processed:,} | Valid: {valid_count:,} | Invalid: {invalid_count:,}")
+            run_batch(batch)
+            if logger:
+                logger.info(f"Processed: {summary.processed:,} | Valid: {summary.valid:,} | Invalid: {summary.invalid:,}")
             batch = []
 
     # Validate any remaining docs after running the batch count
     if batch:
-        df = pd.DataFrame(batch)
+        run_batch(batch)
+
+    return summary
+
+
+# Same as validate_cursor, with the next batches read while earlier ones are validated
+async def validate_async(summary, logger=None, decoder=None):
+    validate_batch = VALIDATORS[summary.mode]
+    client = async_client()
+    pool = async_io.transform_pool()
+    loop = asyncio.get_running_loop()
+    checks = async_io.InFlight(async_io.TRANSFORM_WORKERS)
+
+    def add(finished):
+        for n, (valid, failures, invalid) in finished:
+            summary.add_batch(n, valid, failures, invalid)
+            log_invalid(logger, invalid)
+        if finished and logger:
+            logger.info(f"Processed: {summary.processed:,} | Valid: {summary.valid:,} | Invalid: {summary.invalid:,}")
+
+    try:
+        col = async_db(client)["accidents_clean"]
+        cursor = col.find({}, {"_id": 0}).batch_size(BATCH_SIZE)
+        async for batch in async_io.prefetched_batches(cursor, BATCH_SIZE, stage="validate"):
+            if decoder:
+                batch = decoder.decode_batch(batch)
+            add(await checks.submit(loop.run_in_executor(pool, validate_batch, batch), len(batch)))
+        add(await checks.drain())
+    finally:
+        checks.cancel()
+        pool.shutdown(cancel_futures=True)
+        await client.close()
+
+    return summary
+
+
+# Only the columns FIELD_RULES checks are read from the mirror
+def parquet_docs():
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(PARQUET_DIR, "accidents_clean"), format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(columns=list(FIELD_RULES), batch_size=BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+# Runs in a worker process (one MongoClient per worker, reused across ranges); returns a mergeable summary
+def validate_partition(id_range):
+    db = get_db()
+    col = db["accidents_clean"]
+
+    cursor = col.find({"_id": id_range}, {"_id": 0}, no_cursor_timeout=True).batch_size(BATCH_SIZE)
+    return validate_cursor(cursor, ValidationSummary(VALIDATION_MODE), decoder=compact_encoding.decoder_for(db))
+
+
+@instrumentation.stage("validate")
+def main():
+    # logging setup .txt file
+    LOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "schema_validation_results.txt"
+)
+    SUMMARY_PATH = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "schema_validation_summary.json"
+    )
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(LOG_PATH),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    # MongoDB connection
+    get_client().admin.command("ping")
+    logger.info(f"Connected to {backend_label()}")
+
+    db = get_db()
+    col = db["accidents_clean"] # Data after cleaning folder
+    # compact documents are decoded back to the wide fields before they are validated
+    decoder = compact_encoding.decoder_for(db)
+
+    logger.info(f"Starting schema validation (mode={VALIDATION_MODE}, workers={WORKERS}, io={IO_MODE}, backend={READ_BACKEND})")
+
+    if READ_BACKEND == "parquet":
+        compact_encoding.require_wide(db, "READ_BACKEND=parquet")
+        summary = validate_cursor(parquet_docs(), ValidationSummary(VALIDATION_MODE), logger)
+    elif IO_MODE == "async":
+        summary = asyncio.run(validate_async(ValidationSummary(VALIDATION_MODE), logger, decoder))
+    elif WORKERS > 1:
+        from silver_cleaning import partition_ranges
+
+        require_shared_storage("WORKERS>1")
+        ranges = partition_ranges(col, {}, WORKERS * PARTITIONS_PER_WORKER)
+        summary = ValidationSummary(VALIDATION_MODE)
 
-        for record in df.to_dict(orient="records"):
-            try:
-                accident_info(**record)
-                valid_count += 1
-            except ValidationError as e:
-                invalid_count += 1
-                logger.warning(
-                    f"Schema validation failed for ID={record.get('ID')} | errors={e.errors()[:2]}"
-                )
+        # spawn, so no worker inherits this process's MongoClient
+        with ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for done, part in enumerate(pool.map(validate_partition, ranges), start=1):
+                summary.merge(part)
+                logger.info(f"Ranges done: {done}/{len(ranges)} | Processed: {summary.processed:,} | "
+                            f"Valid: {summary.valid:,} | Invalid: {summary.invalid:,}")
+    else:
+        # -----------------------------------
+        # MONGO DB DATA TO PYTHON IN BATCHES
+        # -----------------------------------
+        cursor = col.find({}, {"_id": 0}, no_cursor_timeout=True).batch_size(BATCH_SIZE)
+        summary = validate_cursor(cursor, ValidationSummary(VALIDATION_MODE), logger, decoder)
 
-        processed += len(batch)
+    summary.write_json(SUMMARY_PATH)
 
     logger.info("Schema Validation Complete")
-    logger.info(f"Total processed: {processed:,}")
-    logger.info(f"Valid records: {valid_count:,}")
-    logger.info(f"Invalid records: {invalid_count:,}")
+    logger.info(f"Total processed: {summary.processed:,}")
+    logger.info(f"Valid records: {summary.valid:,}")
+    logger.info(f"Invalid records: {summary.invalid:,}")
+    for rule, count in summary.rule_failures.most_common():
+        logger.info(f"Rule failures {rule}: {count:,}")
+    logger.info(f"Summary with sampled failing IDs written to {SUMMARY_PATH}")
 
 
 if __name__ == "__main__":
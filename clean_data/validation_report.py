@@ -0,0 +1,100 @@
+import json
+import random
+from collections import Counter
+from datetime import datetime, timezone
+
+# --------------------------------------------------------------
+# STRUCTURED VALIDATION SUMMARY
+#   Instead of one log line per invalid document we keep counts
+#   per "field:error_type" plus a small random sample of failing
+#   IDs for every rule. Summaries from different workers merge.
+# --------------------------------------------------------------
+SAMPLE_SIZE = 20
+
+
+class Reservoir:
+    """Uniform sample of at most `size` items from everything passed to add()."""
+
+    def __init__(self, size=SAMPLE_SIZE, rng=None):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self.rng = rng or random.Random()
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        j = self.rng.randrange(self.seen)
+        if j < self.size:
+            self.items[j] = item
+
+    def merge(self, other):
+        """Combine two reservoirs, each source weighted by how many items it saw."""
+        mine, theirs = list(self.items), list(other.items)
+        left = {"mine": self.seen, "theirs": other.seen}
+        merged = []
+
+        while len(merged) < self.size and (mine or theirs):
+            take_mine = theirs == [] or (
+                mine and self.rng.random() < left["mine"] / (left["mine"] + left["theirs"])
+            )
+            source, key = (mine, "mine") if take_mine else (theirs, "theirs")
+            merged.append(source.pop(self.rng.randrange(len(source))))
+            left[key] = max(left[key] - 1, 0)
+
+        self.items = merged
+        self.seen += other.seen
+
+
+class ValidationSummary:
+    def __init__(self, mode, sample_size=SAMPLE_SIZE):
+        self.mode = mode
+        self.sample_size = sample_size
+        self.processed = 0
+        self.valid = 0
+        self.rule_failures = Counter()
+        self.samples = {}
+
+    @property
+    def invalid(self):
+        return self.processed - self.valid
+
+    def add_batch(self, batch_size, valid, failures, invalid):
+        self.processed += batch_size
+        self.valid += valid
+        self.rule_failures.update(failures)
+
+        for accident_id, errors in invalid:
+            for rule in {f"{err['loc'][-1]}:{err['type']}" for err in errors}:
+                if rule not in self.samples:
+                    self.samples[rule] = Reservoir(self.sample_size)
+                self.samples[rule].add(accident_id)
+
+    def merge(self, other):
+        self.processed += other.processed
+        self.valid += other.valid
+        self.rule_failures.update(other.rule_failures)
+        for rule, reservoir in other.samples.items():
+            if rule in self.samples:
+                self.samples[rule].merge(reservoir)
+            else:
+                self.samples[rule] = reservoir
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "processed": self.processed,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "rules": {
+                rule: {"failures": count, "sample_ids": self.samples[rule].items if rule in self.samples else []}
+                for rule, count in self.rule_failures.most_common()
+            },
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1 @@
+# Shared helpers for the raw_data / clean_data / aggregated_data scripts.
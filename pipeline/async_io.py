@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pipeline import instrumentation
+
+# --------------------------------------------------------------
+# ASYNC I/O HELPERS (IO_MODE=async)
+#   With a blocking cursor the CPU waits for every getMore and
+#   the network waits for every transform. Here one event loop
+#   keeps I/O going while a pool does the CPU work:
+#     - prefetched_batches() reads up to PREFETCH_BATCHES cursor
+#       batches ahead of the consumer
+#     - InFlight keeps several transforms (TRANSFORM_WORKERS) or
+#       insert_many calls (WRITES_IN_FLIGHT) outstanding and
+#       hands results back in submission order
+#   Uses pymongo's native AsyncMongoClient (storage.async_client);
+#   Motor is deprecated in favour of it.
+# --------------------------------------------------------------
+PREFETCH_BATCHES = int(os.getenv("PREFETCH_BATCHES", "2"))
+WRITES_IN_FLIGHT = int(os.getenv("WRITES_IN_FLIGHT", "4"))
+# "thread" = clean/validate in threads (pandas releases the GIL in places),
+# "process" = spawned worker processes (no GIL, but every batch is pickled both ways)
+TRANSFORM_POOL = os.getenv("TRANSFORM_POOL", "thread")
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", "2"))
+
+
+def transform_pool():
+    if TRANSFORM_POOL == "thread":
+        return ThreadPoolExecutor(max_workers=TRANSFORM_WORKERS)
+    if TRANSFORM_POOL == "process":
+        # spawn, so no worker inherits the parent's clients
+        return ProcessPoolExecutor(max_workers=TRANSFORM_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    raise ValueError(f"Unknown TRANSFORM_POOL={TRANSFORM_POOL!r} (thread or process)")
+
+
+async def prefetched_batches(cursor, batch_size, depth=None, stage=None):
+    """Yields lists of up to batch_size documents while the next batches are already being read."""
+    batches = asyncio.Queue(maxsize=depth or PREFETCH_BATCHES)
+
+    async def read_ahead():
+        try:
+            while True:
+                batch = await cursor.to_list(batch_size)
+                await batches.put(batch)
+                if not batch:
+                    return
+        except Exception as e:
+            await batches.put(e)
+
+    reader = asyncio.create_task(read_ahead())
+    try:
+        while True:
+            start = time.perf_counter()
+            batch = await batches.get()
+            if isinstance(batch, Exception):
+                raise batch
+            if not batch:
+                return
+            if stage and instrumentation.enabled():
+                # time the consumer sat idle waiting for the network
+                instrumentation.record(stage, "fetch_wait", time.perf_counter() - start, len(batch))
+            yield batch
+    finally:
+        reader.cancel()
+
+
+class InFlight:
+    """At most `limit` awaitables outstanding; results come back as (tag, result) in submission order."""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self.pending = deque()
+
+    async def submit(self, awaitable, tag=None):
+        """Starts awaitable and returns whatever finished in order (waits only when the window is full)."""
+        finished = []
+        if len(self.pending) >= self.limit:
+            head_tag, head = self.pending.popleft()
+            finished.append((head_tag, await head))
+
+        self.pending.append((tag, asyncio.ensure_future(awaitable)))
+        while self.pending and self.pending[0][1].done():
+            head_tag, head = self.pending.popleft()
+            finished.append((head_tag, head.result()))
+        return finished
+
+    async def drain(self):
+        finished = []
+        while self.pending:
+            head_tag, head = self.pending.popleft()
+            finished.append((head_tag, await head))
+        return finished
+
+    def cancel(self):
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
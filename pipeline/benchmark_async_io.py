@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+
+# --------------------------------------------------------------
+# SYNC vs ASYNC I/O UNDER LATENCY
+#   Loads a seeded synthetic CSV into a local mongod once, then
+#   runs silver cleaning and validation with IO_MODE=sync and
+#   IO_MODE=async through latency_proxy.py at each of
+#   LATENCIES_MS (0 = straight to mongod), one fresh process per
+#   run. The async gain is the overlap of cursor reads, writes
+#   and transforms:
+#     STORAGE_BACKEND=local python pipeline/benchmark_async_io.py
+# --------------------------------------------------------------
+ASYNC_BENCH_ROWS = int(os.getenv("ASYNC_BENCH_ROWS", "200000"))
+LATENCIES_MS = [float(ms) for ms in os.getenv("LATENCIES_MS", "0,10,40").split(",")]
+IO_MODES = ["sync", "async"]
+BENCH_STAGES = ["silver", "validate"]
+STAGE_ENV = {
+    "STORAGE_BACKEND": "local",
+    "MAX_RECORDS": "0",
+    "LOG_INVALID_DOCS": "0",
+}
+
+
+# Runs in a spawned process so every run reads its settings fresh
+def run_stages(env, stages, drop_first=False):
+    os.environ.update(env)
+    from pipeline import config, run_local, storage
+
+    if storage.STORAGE_BACKEND != "local":
+        raise ValueError("benchmark_async_io.py drops DB_NAME and needs a local mongod; use STORAGE_BACKEND=local")
+    if drop_first:
+        storage.get_client().drop_database(config.DB_NAME)
+
+    seconds = {}
+    for stage in stages:
+        start = time.perf_counter()
+        run_local.run_stage(stage)
+        seconds[stage] = time.perf_counter() - start
+    return seconds
+
+
+def in_fresh_process(*args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_stages, *args).result()
+
+
+def main():
+    from pipeline.benchmark_pipeline import synthetic_csv
+    from pipeline.latency_proxy import LatencyProxy
+    from pipeline.storage import LOCAL_MONGO_URI
+    from pymongo.uri_parser import parse_uri
+
+    env = {key: os.getenv(key, value) for key, value in STAGE_ENV.items()}
+    csv_path = synthetic_csv(ASYNC_BENCH_ROWS)
+    print(f"Loading {csv_path} into {LOCAL_MONGO_URI}")
+    in_fresh_process({**env, "CSV_PATH": csv_path}, ["ingest"], True)
+
+    host, port = parse_uri(LOCAL_MONGO_URI)["nodelist"][0]
+    results = {}
+    for latency in LATENCIES_MS:
+        proxy = None
+        uri = LOCAL_MONGO_URI
+        if latency:
+            proxy = LatencyProxy(latency, host, port, listen_port=0)
+            proxy.start()
+            uri = proxy.uri()
+
+        for mode in IO_MODES:
+            print(f"\n##### {mode} I/O, +{latency:g} ms per round trip #####")
+            results[(latency, mode)] = in_fresh_process({**env, "LOCAL_MONGO_URI": uri, "IO_MODE": mode},
+                                                        BENCH_STAGES)
+        if proxy:
+            proxy.stop()
+
+    print(f"\n{ASYNC_BENCH_ROWS:,} rows")
+    print(f"{'latency ms':>10} {'stage':<10} {'sync s':>8} {'async s':>8} {'speedup':>8}")
+    for latency in LATENCIES_MS:
+        for stage in BENCH_STAGES:
+            sync_s, async_s = results[(latency, "sync")][stage], results[(latency, "async")][stage]
+            print(f"{latency:>10g} {stage:<10} {sync_s:>8.2f} {async_s:>8.2f} {sync_s / async_s:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
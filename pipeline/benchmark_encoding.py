@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ["", "raw_data", "clean_data", "aggregated_data"]:
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from cleaning_rules import clean_batch
+from csv_parsing import CHUNK_READERS
+from validate_accidents_schema import VALIDATORS
+from aggregation import build_pipeline
+from pipeline import config, compact_encoding
+from pipeline.storage import get_client, backend_label, STORAGE_BACKEND
+
+# --------------------------------------------------------------
+# WIDE vs COMPACT SILVER ENCODING
+#   Cleans a seeded synthetic CSV and compares the two
+#   accidents_clean formats (pipeline/compact_encoding.py):
+#     - BSON bytes per document
+#     - client-side scan: parsing the BSON a cursor receives,
+#       then turning compact documents back into wide ones
+#       (Decoder) and validating them (VALIDATION_MODE=rules)
+#   With STORAGE_BACKEND=local or atlas the documents are also
+#   loaded into scratch collections of BENCH_DB (dropped at the
+#   end) for collStats sizes and timed server scans, including
+#   the compact format in a time-series collection:
+#     STORAGE_BACKEND=memory python pipeline/benchmark_encoding.py
+#     STORAGE_BACKEND=local python pipeline/benchmark_encoding.py
+# --------------------------------------------------------------
+N_DOCS = int(os.getenv("N_DOCS", "100000"))
+BATCH_SIZE = 5000
+REPEATS = int(os.getenv("REPEATS", "3"))
+BENCH_DB = f"{config.DB_NAME}_encoding_bench"
+
+
+def cleaned_synthetic_docs(n):
+    from pipeline.benchmark_pipeline import synthetic_csv
+
+    docs = []
+    for records in CHUNK_READERS["pandas"](synthetic_csv(n), BATCH_SIZE):
+        docs.extend(d for d in clean_batch(records) if d.get("ID"))
+    return docs
+
+
+def best_of(fn):
+    best = None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def client_side(wide, compact, decoder):
+    import bson
+
+    wide_bytes = [bson.encode(d) for d in wide]
+    compact_bytes = [bson.encode(d) for d in compact]
+    wide_blob, compact_blob = b"".join(wide_bytes), b"".join(compact_bytes)
+    validate = VALIDATORS["rules"]
+
+    def validate_batches(docs):
+        for i in range(0, len(docs), BATCH_SIZE):
+            validate(docs[i:i + BATCH_SIZE])
+
+    return {
+        "wide": {
+            "bytes/doc": len(wide_blob) / len(wide),
+            "bson s": best_of(lambda: bson.decode_all(wide_blob)),
+            "decode s": best_of(lambda: bson.decode_all(wide_blob)),
+            "decode+validate s": best_of(lambda: validate_batches(bson.decode_all(wide_blob))),
+        },
+        "compact": {
+            "bytes/doc": len(compact_blob) / len(compact),
+            "bson s": best_of(lambda: bson.decode_all(compact_blob)),
+            "decode s": best_of(lambda: decoder.decode_batch(bson.decode_all(compact_blob))),
+            "decode+validate s": best_of(
+                lambda: validate_batches(decoder.decode_batch(bson.decode_all(compact_blob)))
+            ),
+        },
+    }
+
+
+def server_side(db, wide, compact):
+    names = compact_encoding.field_names("compact")
+    start_time = names["Start_Time"]
+    setups = {
+        "wide": (wide, {}, {}),
+        "compact": (compact, names, {}),
+        "compact+timeseries": (
+            [d for d in compact if start_time in d], names,
+            {"timeseries": {"timeField": start_time, "metaField": names["State"], "granularity": "hours"}},
+        ),
+    }
+
+    results = {}
+    for label, (docs, field_map, options) in setups.items():
+        name = f"bench_{label.replace('+', '_')}"
+        db[name].drop()
+        db.create_collection(name, **options)
+        db[name].insert_many([dict(d) for d in docs], ordered=False)
+
+        stats = db.command("collStats", name)
+        col = db[name]
+        results[label] = {
+            "docs": len(docs),
+            "avgObjSize": stats.get("avgObjSize", 0),
+            "size MB": stats["size"] / 1024 ** 2,
+            "storage MB": stats["storageSize"] / 1024 ** 2,
+            "scan s": best_of(lambda: sum(1 for _ in col.find({}, {"_id": 0}).batch_size(10_000))),
+            "gold s": best_of(lambda: list(col.aggregate(build_pipeline(names=field_map), allowDiskUse=True))),
+        }
+    return results
+
+
+def main():
+    print(f"Cleaning {N_DOCS:,} synthetic rows")
+    wide = cleaned_synthetic_docs(N_DOCS)
+
+    client = get_client()
+    client.drop_database(BENCH_DB)
+    db = client[BENCH_DB]
+    try:
+        writer = compact_encoding.SilverWriter(db, fmt="compact", layout="collection")
+        compact = writer.prepare(wide)
+        decoder = compact_encoding.Decoder(db)
+        assert decoder.decode_batch(compact[:1000]) == wide[:1000], "compact documents do not decode to the wide ones"
+
+        print(f"\nClient side, {len(wide):,} documents (best of {REPEATS})")
+        print(f"{'format':<10} {'bytes/doc':>10} {'bson s':>8} {'to wide s':>10} {'+validate s':>12}")
+        results = client_side(wide, compact, decoder)
+        for label, r in results.items():
+            print(f"{label:<10} {r['bytes/doc']:>10,.0f} {r['bson s']:>8.2f} {r['decode s']:>10.2f} "
+                  f"{r['decode+validate s']:>12.2f}")
+        saved = 1 - results["compact"]["bytes/doc"] / results["wide"]["bytes/doc"]
+        print(f"Compact documents are {saved:.0%} smaller")
+
+        if STORAGE_BACKEND == "memory":
+            print(f"\nServer side skipped on {backend_label()} (use STORAGE_BACKEND=local or atlas)")
+            return
+
+        print(f"\nServer side on {backend_label()}, database {BENCH_DB} (best of {REPEATS})")
+        print(f"{'layout':<20} {'docs':>9} {'avgObjSize':>11} {'size MB':>9} {'storage MB':>11} "
+              f"{'scan s':>8} {'gold s':>8}")
+        for label, r in server_side(db, wide, compact).items():
+            print(f"{label:<20} {r['docs']:>9,} {r['avgObjSize']:>11,.0f} {r['size MB']:>9.1f} "
+                  f"{r['storage MB']:>11.1f} {r['scan s']:>8.2f} {r['gold s']:>8.2f}")
+    finally:
+        client.drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
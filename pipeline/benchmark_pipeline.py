@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+
+# --------------------------------------------------------------
+# END-TO-END PIPELINE BENCHMARK
+#   For each size in BENCH_SIZES: generate (or reuse) a seeded
+#   synthetic CSV, then run ingest -> silver -> validate -> gold
+#   -> dashboard queries in a fresh process on an empty database,
+#   recording per stage:
+#     seconds, rows/sec (CSV rows), peak RSS of the process so far,
+#     and MongoDB opcounters (serverStatus; not on mongomock).
+#   Every run is appended to BENCH_HISTORY and compared with the
+#   last run on the same backend and size.
+#   The database is dropped before each size, so Atlas is refused:
+#     STORAGE_BACKEND=local python pipeline/benchmark_pipeline.py
+#     STORAGE_BACKEND=memory BENCH_SIZES=1000 python pipeline/benchmark_pipeline.py
+# --------------------------------------------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DEFAULTS = {
+    "STORAGE_BACKEND": "local",
+    "MAX_RECORDS": "0",          # silver_cleaning.py caps at 1M otherwise
+    "LOG_INVALID_DOCS": "0",     # one log line per bad document would dominate validate
+}
+
+BENCH_SIZES = [int(n) for n in os.getenv("BENCH_SIZES", "100000,1000000,10000000").split(",")]
+BENCH_SEED = int(os.getenv("BENCH_SEED", "42"))
+BENCH_DIR = os.getenv("BENCH_DIR", os.path.join(ROOT, "data", "synthetic"))
+BENCH_HISTORY = os.getenv("BENCH_HISTORY", os.path.join(ROOT, "benchmark_history.json"))
+BENCH_STAGES = ["ingest", "silver", "validate", "gold", "dashboard"]
+OPCOUNTERS = ["insert", "query", "update", "delete", "getmore", "command"]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _opcounters(client):
+    from pipeline import storage
+
+    if storage.STORAGE_BACKEND == "memory":
+        return None
+    counters = client.admin.command("serverStatus")["opcounters"]
+    return {op: counters[op] for op in OPCOUNTERS}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def synthetic_csv(rows):
+    from pipeline.synthetic_accidents import write_synthetic_csv
+
+    path = os.path.join(BENCH_DIR, f"accidents_{rows}_{BENCH_SEED}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {path}")
+        write_synthetic_csv(path, rows, BENCH_SEED)
+    return path
+
+
+# The sidebar's first load plus one query per state, like a user clicking through
+def dashboard_queries(db):
+    from dashboard_queries import filter_options, query_aggregated
+
+    options = filter_options(db)
+    queries = 1
+    query_aggregated(db, options["states"], options["severities"])
+    queries += 1
+    for state in options["states"]:
+        query_aggregated(db, [state], options["severities"])
+        queries += 1
+    return queries
+
+
+# --------------------------------------------------------------
+# ONE SIZE, IN ITS OWN PROCESS
+#   the stage scripts read CSV_PATH and friends at import, and
+#   peak RSS is per process, so every size gets a fresh one
+# --------------------------------------------------------------
+def run_size(csv_path, rows):
+    for key, value in BENCH_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ["CSV_PATH"] = csv_path
+    from pipeline import config, run_local, storage
+
+    if storage.STORAGE_BACKEND == "atlas":
+        raise ValueError("benchmark_pipeline.py drops DB_NAME before every size; "
+                         "use STORAGE_BACKEND=local or memory")
+
+    client = storage.get_client()
+    client.drop_database(config.DB_NAME)
+    db = storage.get_db()
+
+    stages = {}
+    for stage in BENCH_STAGES:
+        before = _opcounters(client)
+        start = time.perf_counter()
+        if stage == "dashboard":
+            queries = dashboard_queries(db)
+        else:
+            run_local.run_stage(stage)
+        seconds = time.perf_counter() - start
+        after = _opcounters(client)
+
+        stages[stage] = {
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds) if seconds else None,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "mongo_ops": {op: after[op] - before[op] for op in OPCOUNTERS} if before else None,
+        }
+        if stage == "dashboard":
+            stages[stage]["queries"] = queries
+
+    # every repeated ID in the CSV must have been dropped by silver dedup, not earlier or later
+    raw_docs = db["accidents_raw"].estimated_document_count()
+    clean_docs = db["accidents_clean"].estimated_document_count()
+    distinct_ids = next(db["accidents_raw"].aggregate(
+        [{"$group": {"_id": "$ID"}}, {"$count": "n"}], allowDiskUse=True), {"n": 0})["n"]
+    if raw_docs != rows or clean_docs != distinct_ids:
+        raise RuntimeError(f"{rows:,} CSV rows with {distinct_ids:,} distinct IDs gave "
+                           f"{raw_docs:,} raw and {clean_docs:,} clean documents")
+
+    return {
+        "backend": storage.backend_label(),
+        "raw_docs": raw_docs,
+        "clean_docs": clean_docs,
+        "duplicates_dropped": raw_docs - clean_docs,
+        "stages": stages,
+    }
+
+
+# --------------------------------------------------------------
+# HISTORY
+# --------------------------------------------------------------
+def load_history(path=BENCH_HISTORY):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def previous_result(history, backend, rows):
+    for run in reversed(history):
+        result = run["results"].get(str(rows))
+        if result and result["backend"] == backend:
+            return result
+    return None
+
+
+def compare(result, previous):
+    """Per-stage change in seconds against an earlier result, in percent (+ = slower)."""
+    changes = {}
+    for stage, now in result["stages"].items():
+        before = previous["stages"].get(stage) if previous else None
+        if before and before["seconds"]:
+            changes[stage] = round(100 * (now["seconds"] - before["seconds"]) / before["seconds"], 1)
+    return changes
+
+
+def main():
+    history = load_history()
+    run = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "seed": BENCH_SEED,
+        "results": {},
+    }
+
+    for rows in BENCH_SIZES:
+        csv_path = synthetic_csv(rows)
+        print(f"\n##### {rows:,} rows ({csv_path}) #####")
+        # spawn, so the stage modules and the RSS high-water mark start fresh
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_size, csv_path, rows).result()
+
+        changes = compare(result, previous_result(history, result["backend"], rows))
+        result["change_vs_previous_pct"] = changes
+        run["results"][str(rows)] = result
+
+        print(f"\n{rows:,} rows on {result['backend']} | raw {result['raw_docs']:,} | clean {result['clean_docs']:,}")
+        print(f"{'stage':<10} {'seconds':>9} {'rows/sec':>12} {'peak RSS (MB)':>14} {'mongo ops':>10} {'vs last':>8}")
+        for stage, s in result["stages"].items():
+            ops = sum(s["mongo_ops"].values()) if s["mongo_ops"] else "n/a"
+            change = f"{changes[stage]:+.1f}%" if stage in changes else "-"
+            print(f"{stage:<10} {s['seconds']:>9.2f} {s['rows_per_sec'] or 0:>12,} {s['peak_rss_mb']:>14,.0f} "
+                  f"{ops:>10} {change:>8}")
+
+    history.append(run)
+    with open(BENCH_HISTORY, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"\nAppended to {BENCH_HISTORY} ({len(history)} runs)")
+
+
+if __name__ == "__main__":
+    main()
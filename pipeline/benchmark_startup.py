@@ -0,0 +1,65 @@
+import os
+import sys
+import statistics
+import subprocess
+
+# --------------------------------------------------------------
+# IMPORT / STARTUP TIME
+#   Imports every pipeline script in a fresh interpreter with no
+#   MONGO_URI pointing anywhere reachable. An import has to
+#   succeed without touching the network (no side effects), and
+#   the median wall time of REPEATS imports is reported.
+# --------------------------------------------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEATS = int(os.getenv("REPEATS", "5"))
+MODULES = [
+    "ingest_accidents", "db_row_count_schema", "schema_profiler",
+    "silver_cleaning", "silver_pipeline", "validate_accidents_schema",
+    "aggregation", "cube_builder", "distributions", "geo_tiles",
+    "parquet_mirror", "query_modeling", "dashboard_queries",
+]
+# a client that tried to connect would wait for this port until it gives up
+UNREACHABLE_URI = "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=2000"
+
+TIMER = (
+    "import sys, time; t = time.perf_counter(); "
+    "import importlib; importlib.import_module(sys.argv[1]); "
+    "print(time.perf_counter() - t)"
+)
+
+
+def import_seconds(module):
+    path = os.pathsep.join(os.path.join(ROOT, d) for d in ["", "raw_data", "clean_data", "aggregated_data"])
+    env = {**os.environ, "PYTHONPATH": path, "MONGO_URI": UNREACHABLE_URI, "STORAGE_BACKEND": "atlas"}
+    result = subprocess.run([sys.executable, "-c", TIMER, module], env=env, cwd=ROOT,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return float(result.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    print(f"Importing {len(MODULES)} scripts from {ROOT} ({REPEATS} runs each)")
+    print(f"\n{'module':<28} {'median ms':>10}")
+
+    total = 0.0
+    for module in MODULES:
+        times = []
+        for _ in range(REPEATS):
+            seconds, error = import_seconds(module)
+            if error:
+                break
+            times.append(seconds)
+
+        if error:
+            print(f"{module:<28} {'failed':>10}  {error}")
+            continue
+        median = statistics.median(times)
+        total += median
+        print(f"{module:<28} {median * 1000:>10.0f}")
+
+    print(f"{'sum':<28} {total * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import os
+from datetime import datetime
+
+# --------------------------------------------------------------
+# COMPACT SILVER ENCODING
+#   accidents_clean stores every CSV column under its original
+#   name, so each field name ("Weather_Timestamp", ...) is
+#   repeated in every document. SILVER_FORMAT=compact stores:
+#     - short field aliases (FIELD_ALIASES); ID keeps its name so
+#       the dedup backends and the unique index work unchanged
+#     - the POI booleans as one bitmask int "poi" (+ "poin" for
+#       the ones that are null)
+#     - low-cardinality strings (ENUM_FIELDS) as small ints; the
+#       codes live in ENCODING_COL and are shared by all writers.
+#       A value that is not a string keeps its original field
+#       name, so a code is never mistaken for it
+#     - no null fields (decode() puts them back)
+#   SILVER_LAYOUT=timeseries makes accidents_clean a time-series
+#   collection on Start_Time with State as the meta field.
+#   Documents without a Start_Time date cannot go in and are
+#   skipped. There is no unique index, so only full runs with
+#   DEDUP_BACKEND=set/bitmap and WORKERS=1 are supported.
+#   A silver full run records the format in ENCODING_COL, so
+#   readers go by what is stored, not by their own settings.
+# --------------------------------------------------------------
+SILVER_FORMAT = os.getenv("SILVER_FORMAT", "wide")           # "wide" or "compact"
+SILVER_LAYOUT = os.getenv("SILVER_LAYOUT", "collection")     # "collection" or "timeseries"
+ENCODING_COL = "silver_encoding"
+
+FIELD_ALIASES = {
+    "Source": "src", "Severity": "sev", "Start_Time": "t", "End_Time": "te",
+    "Start_Lat": "lat", "Start_Lng": "lng", "End_Lat": "elat", "End_Lng": "elng",
+    "Distance(mi)": "dist", "Description": "desc", "Street": "str", "City": "city",
+    "County": "cty", "State": "st", "Zipcode": "zip", "Country": "ctry", "Timezone": "tz",
+    "Airport_Code": "apt", "Weather_Timestamp": "wt", "Temperature(F)": "temp",
+    "Wind_Chill(F)": "chill", "Humidity(%)": "hum", "Pressure(in)": "pres",
+    "Visibility(mi)": "vis", "Wind_Direction": "wdir", "Wind_Speed(mph)": "wspd",
+    "Precipitation(in)": "prcp", "Weather_Condition": "wx", "Sunrise_Sunset": "sun",
+    "Civil_Twilight": "civ", "Nautical_Twilight": "naut", "Astronomical_Twilight": "astr",
+}
+POI_FIELDS = [
+    "Amenity", "Bump", "Crossing", "Give_Way", "Junction", "No_Exit", "Railway",
+    "Roundabout", "Station", "Stop", "Traffic_Calming", "Traffic_Signal", "Turning_Loop",
+]
+ENUM_FIELDS = [
+    "Source", "Country", "Timezone", "Wind_Direction", "Weather_Condition",
+    "Sunrise_Sunset", "Civil_Twilight", "Nautical_Twilight", "Astronomical_Twilight",
+]
+ALL_FIELDS = ["ID", *FIELD_ALIASES, *POI_FIELDS]
+
+POI_BITS = {field: 1 << i for i, field in enumerate(POI_FIELDS)}
+ALL_POI_BITS = (1 << len(POI_FIELDS)) - 1
+UNALIASED = {alias: field for field, alias in FIELD_ALIASES.items()}
+ENUM_SET = set(ENUM_FIELDS)
+
+
+def field_names(fmt):
+    """wide field name -> stored field name (empty for the wide format)."""
+    return FIELD_ALIASES if fmt == "compact" else {}
+
+
+def stored_format(db):
+    """{"format", "layout"} of what is in accidents_clean (wide/collection if never recorded)."""
+    doc = db[ENCODING_COL].find_one({"_id": "format"}) or {}
+    return {"format": doc.get("format", "wide"), "layout": doc.get("layout", "collection")}
+
+
+def record_format(db, fmt=None, layout=None):
+    doc = {"format": fmt or SILVER_FORMAT, "layout": layout or SILVER_LAYOUT}
+    db[ENCODING_COL].replace_one({"_id": "format"}, doc, upsert=True)
+
+
+def require_wide(db, what):
+    if stored_format(db)["format"] != "wide":
+        raise ValueError(f"{what} reads accidents_clean in the wide format; "
+                         "rebuild silver with SILVER_FORMAT=wide first")
+
+
+# --------------------------------------------------------------
+# SETTINGS CHECKS + COLLECTION SETUP (silver writers)
+# --------------------------------------------------------------
+def check_settings(run_mode, dedup_backend, workers, backend):
+    if SILVER_FORMAT not in {"wide", "compact"}:
+        raise ValueError(f"Unknown SILVER_FORMAT={SILVER_FORMAT!r} (wide or compact)")
+    if SILVER_LAYOUT not in {"collection", "timeseries"}:
+        raise ValueError(f"Unknown SILVER_LAYOUT={SILVER_LAYOUT!r} (collection or timeseries)")
+    if SILVER_LAYOUT == "timeseries":
+        if backend == "memory":
+            raise ValueError("SILVER_LAYOUT=timeseries needs atlas or local (mongomock has no time-series collections)")
+        if run_mode != "full" or dedup_backend not in {"set", "bitmap"} or workers > 1:
+            raise ValueError("SILVER_LAYOUT=timeseries has no unique index on ID: use RUN_MODE=full, "
+                             "DEDUP_BACKEND=set or bitmap and WORKERS=1")
+
+
+def check_incremental(db):
+    stored = stored_format(db)
+    if stored != {"format": SILVER_FORMAT, "layout": SILVER_LAYOUT}:
+        raise ValueError(f"accidents_clean holds {stored}; an incremental run cannot switch to "
+                         f"SILVER_FORMAT={SILVER_FORMAT}, SILVER_LAYOUT={SILVER_LAYOUT} (run a full rebuild)")
+
+
+def reset_clean_collection(db, name):
+    """Empty accidents_clean for a full run, in the configured layout."""
+    names = field_names(SILVER_FORMAT)
+    if SILVER_LAYOUT == "timeseries":
+        db[name].drop()
+        db.create_collection(name, timeseries={
+            "timeField": names.get("Start_Time", "Start_Time"),
+            "metaField": names.get("State", "State"),
+            "granularity": "hours",
+        })
+    else:
+        if stored_format(db)["layout"] == "timeseries":
+            db[name].drop()   # back to a plain collection
+        db[name].delete_many({})
+    record_format(db)
+
+
+# --------------------------------------------------------------
+# WRITE SIDE
+# --------------------------------------------------------------
+class EnumCodes:
+    """value <-> small int per field, allocated once in ENCODING_COL and cached."""
+
+    def __init__(self, db):
+        self.col = db[ENCODING_COL]
+        self.codes = {field: {} for field in ENUM_FIELDS}
+        self.values = {field: {} for field in ENUM_FIELDS}
+        for doc in self.col.find({"code": {"$exists": True}}):
+            self._remember(doc["_id"]["field"], doc["_id"]["value"], doc["code"])
+
+    def _remember(self, field, value, code):
+        self.codes[field][value] = code
+        self.values[field][code] = value
+
+    def code(self, field, value):
+        code = self.codes[field].get(value)
+        if code is None:
+            code = self._allocate(field, value)
+            self._remember(field, value, code)
+        return code
+
+    def _allocate(self, field, value):
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        key = {"field": field, "value": value}
+        existing = self.col.find_one({"_id": key})
+        if existing:
+            return existing["code"]
+        counter = self.col.find_one_and_update({"_id": {"field": field}}, {"$inc": {"next": 1}},
+                                               upsert=True, return_document=ReturnDocument.AFTER)
+        try:
+            self.col.insert_one({"_id": key, "code": counter["next"] - 1})
+        except DuplicateKeyError:
+            # another worker allocated this value first; its code wins (ours is left unused)
+            return self.col.find_one({"_id": key})["code"]
+        return counter["next"] - 1
+
+
+def encode(doc, codes):
+    out = {}
+    poi = 0
+    poi_null = ALL_POI_BITS
+    for field, value in doc.items():
+        bit = POI_BITS.get(field)
+        if bit is not None:
+            if value is not None:
+                poi_null &= ~bit
+                if value:
+                    poi |= bit
+            continue
+        if value is None:
+            continue
+        if field in ENUM_SET:
+            if not isinstance(value, str):
+                out[field] = value
+                continue
+            value = codes.code(field, value)
+        out[FIELD_ALIASES.get(field, field)] = value
+
+    out["poi"] = poi
+    if poi_null:
+        out["poin"] = poi_null
+    return out
+
+
+class SilverWriter:
+    """Turns cleaned (wide) documents into what accidents_clean stores."""
+
+    def __init__(self, db, fmt=None, layout=None):
+        self.fmt = fmt or SILVER_FORMAT
+        self.layout = layout or SILVER_LAYOUT
+        self.codes = EnumCodes(db) if self.fmt == "compact" else None
+        self.skipped = 0   # no Start_Time date (time-series layout only)
+
+    def storable(self, docs):
+        """The documents the layout can hold (all of them, unless it is a time-series collection)."""
+        if self.layout != "timeseries":
+            return docs
+        kept = [d for d in docs if isinstance(d.get("Start_Time"), datetime)]
+        self.skipped += len(docs) - len(kept)
+        return kept
+
+    def prepare(self, docs):
+        docs = self.storable(docs)
+        if self.fmt == "compact":
+            return [encode(d, self.codes) for d in docs]
+        return docs
+
+
+# --------------------------------------------------------------
+# READ SIDE
+# --------------------------------------------------------------
+class Decoder:
+    """Rebuilds the wide document (every known field, nulls included) from a compact one."""
+
+    def __init__(self, db):
+        values = EnumCodes(db).values
+        # stored key -> (wide field, code -> value table or None); "poi"/"poin" are handled below
+        self.keys = {alias: (field, values.get(field)) for field, alias in FIELD_ALIASES.items()}
+        self.keys.update({"poi": (None, None), "poin": (None, None)})
+
+    def decode(self, stored):
+        doc = dict.fromkeys(ALL_FIELDS)
+        keys = self.keys
+        for key, value in stored.items():
+            entry = keys.get(key)
+            if entry is None:
+                doc[key] = value   # ID, a non-string enum value, or a field without an alias
+                continue
+            field, values = entry
+            if field is not None:
+                doc[field] = value if values is None else values[value]
+
+        poi = stored.get("poi", 0)
+        poi_null = stored.get("poin", 0 if "poi" in stored else ALL_POI_BITS)
+        for field, bit in POI_BITS.items():
+            doc[field] = None if poi_null & bit else bool(poi & bit)
+        return doc
+
+    def decode_batch(self, batch):
+        return [self.decode(doc) for doc in batch]
+
+
+def decoder_for(db):
+    """A Decoder when accidents_clean holds compact documents, else None (wide documents are read as they are)."""
+    return Decoder(db) if stored_format(db)["format"] == "compact" else None
+
+
+def stored_index_specs(specs, stored):
+    """An INDEX_PLAN list for accidents_clean as stored (see stored_format): fields renamed
+    for the compact format, unique indexes left out of a time-series collection."""
+    names = field_names(stored["format"])
+    if stored["layout"] == "timeseries":
+        specs = [spec for spec in specs if not spec.get("unique")]
+    renamed = []
+    for spec in specs:
+        spec = dict(spec, keys=[(names.get(field, field), order) for field, order in spec["keys"]])
+        if "partialFilterExpression" in spec:
+            spec["partialFilterExpression"] = {names.get(field, field): condition
+                                               for field, condition in spec["partialFilterExpression"].items()}
+        renamed.append(spec)
+    return renamed
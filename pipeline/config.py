@@ -0,0 +1,70 @@
+import os
+import importlib.util
+
+# --------------------------------------------------------------
+# SHARED PIPELINE SETTINGS
+#   One place for the database name and the client tuning every
+#   script used to hard-code. Importing this module does nothing
+#   but read environment variables; .env is only loaded when a
+#   setting that lives there (MONGO_URI) is first needed.
+# --------------------------------------------------------------
+DB_NAME = os.getenv("DB_NAME", "bigdata_capstone")
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("SERVER_SELECTION_TIMEOUT_MS", "10000"))
+# one client per process shares this many connections between all its threads
+MAX_POOL_SIZE = int(os.getenv("MAX_POOL_SIZE", "20"))
+# wire compression, in order of preference; only pays off over a real network,
+# so the local mongod gets none unless COMPRESSORS is set
+DEFAULT_COMPRESSORS = {"atlas": "zstd,snappy,zlib", "local": ""}
+
+# Write concern per stage. Bronze and silver bulk loads are idempotent
+# and resumable (checkpoints, unique ID index), so they only wait for the
+# primary; gold swaps and anything else wait for a majority.
+# Override with WRITE_CONCERN_<STAGE>=1 / majority.
+WRITE_CONCERNS = {
+    "ingest": {"w": 1, "j": False},
+    "silver": {"w": 1, "j": False},
+    "gold": {"w": "majority"},
+}
+DEFAULT_WRITE_CONCERN = {"w": "majority"}
+
+# modules pymongo can use for each compressor (differs between pymongo versions)
+_COMPRESSOR_MODULES = {
+    "zstd": ["compression.zstd", "backports.zstd", "zstandard"],
+    "snappy": ["snappy"],
+    "zlib": ["zlib"],
+}
+
+_dotenv_loaded = False
+
+
+def env(name, default=None):
+    """os.getenv, after loading .env on first use."""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
+    return os.getenv(name, default)
+
+
+def _importable(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def compressors(backend):
+    """Requested compressors that are installed, so pymongo does not warn about the rest."""
+    requested = os.getenv("COMPRESSORS", DEFAULT_COMPRESSORS.get(backend, ""))
+    return [c for c in requested.split(",")
+            if c and any(_importable(m) for m in _COMPRESSOR_MODULES.get(c, []))]
+
+
+def write_concern(stage):
+    options = dict(WRITE_CONCERNS.get(stage, DEFAULT_WRITE_CONCERN))
+    override = os.getenv(f"WRITE_CONCERN_{stage.upper()}") if stage else None
+    if override:
+        options = {"w": int(override) if override.isdigit() else override}
+    return options
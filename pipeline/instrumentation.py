@@ -0,0 +1,349 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from collections import Counter
+
+# --------------------------------------------------------------
+# INSTRUMENTATION
+#   Off by default; every hook below is a no-op until one of
+#   these is set:
+#     METRICS_FORMAT=json|prometheus
+#       per-phase timings (fetch, transform, validate, insert,
+#       ...) for every stage, plus the MongoDB commands the
+#       driver sent (count, round-trip time, BSON bytes each
+#       way, from a pymongo CommandListener). Written to
+#       METRICS_DIR/<stage>.json or <stage>.prom (Prometheus
+#       text format, node_exporter textfile collector ready)
+#       when the stage's main() returns.
+#     PROFILER=cprofile|sample
+#       wraps each stage's main(): cprofile writes
+#       PROFILE_DIR/<stage>.prof (pstats; snakeviz, flameprof)
+#       but only sees the calling thread, so it is refused for
+#       stages that work in threads (the orchestrator,
+#       INGEST_MODE=parallel ingestion);
+#       sample polls every thread's stack every
+#       PROFILE_INTERVAL_MS and writes <stage>.folded, the
+#       collapsed-stack format of flamegraph.pl, speedscope and
+#       py-spy's raw output.
+#   Only this process is measured: worker processes (WORKERS>1,
+#   INGEST_MODE=parallel parsing) are not.
+# --------------------------------------------------------------
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+PROFILER = os.getenv("PROFILER", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# comma separated stage names to profile, empty = every stage
+PROFILE_STAGES = [s for s in os.getenv("PROFILE_STAGES", "").split(",") if s]
+
+PHASE_FIELDS = ["calls", "docs", "seconds", "max_seconds"]
+COMMAND_FIELDS = ["calls", "failed", "seconds", "request_bytes", "reply_bytes"]
+
+_lock = threading.Lock()
+_phases = {}     # (stage, phase) -> Counter of PHASE_FIELDS
+_commands = {}   # command name -> Counter of COMMAND_FIELDS
+
+
+def enabled():
+    return bool(METRICS_FORMAT)
+
+
+def reset():
+    with _lock:
+        _phases.clear()
+        _commands.clear()
+
+
+# --------------------------------------------------------------
+# PHASE TIMERS
+# --------------------------------------------------------------
+def record(stage, phase, seconds, docs=0):
+    with _lock:
+        totals = _phases.get((stage, phase))
+        if totals is None:
+            totals = _phases[(stage, phase)] = Counter(dict.fromkeys(PHASE_FIELDS, 0))
+        totals["calls"] += 1
+        totals["docs"] += docs
+        totals["seconds"] += seconds
+        totals["max_seconds"] = max(totals["max_seconds"], seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "phase", "docs", "start")
+
+    def __init__(self, stage, phase, docs):
+        self.stage, self.phase, self.docs = stage, phase, docs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, self.phase, time.perf_counter() - self.start, self.docs)
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timed(stage, phase, docs=0):
+    """with timed("silver", "insert", len(batch)): ... records one call of that phase."""
+    if not METRICS_FORMAT:
+        return _NO_TIMER
+    return _Timer(stage, phase, docs)
+
+
+def timed_batches(iterable, stage, phase):
+    """Yields from iterable, recording how long each next() took (a batch's len() as its docs)."""
+    if not METRICS_FORMAT:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        record(stage, phase, time.perf_counter() - start, len(item) if hasattr(item, "__len__") else 1)
+        yield item
+
+
+def timed_cursor(cursor, stage, batch_size, phase="fetch"):
+    """Yields a cursor's documents, recording the fetch time of every batch_size documents."""
+    if not METRICS_FORMAT:
+        yield from cursor
+        return
+
+    waited, n = 0.0, 0
+    iterator = iter(cursor)
+    while True:
+        start = time.perf_counter()
+        try:
+            doc = next(iterator)
+        except StopIteration:
+            break
+        waited += time.perf_counter() - start
+        n += 1
+        yield doc
+        if n == batch_size:
+            record(stage, phase, waited, n)
+            waited, n = 0.0, 0
+    if n:
+        record(stage, phase, waited, n)
+
+
+# --------------------------------------------------------------
+# MONGODB COMMANDS (pymongo CommandListener)
+# --------------------------------------------------------------
+def command_listeners():
+    """Listeners for MongoClient(event_listeners=...); empty while metrics are off."""
+    if not METRICS_FORMAT:
+        return []
+
+    import bson
+    from pymongo import monitoring
+
+    class CommandMetrics(monitoring.CommandListener):
+        def __init__(self):
+            self.request_bytes = {}   # request_id -> encoded size, until the reply arrives
+
+        def started(self, event):
+            self.request_bytes[(event.connection_id, event.request_id)] = len(bson.encode(event.command))
+
+        def _finish(self, event, reply_bytes, failed):
+            sent = self.request_bytes.pop((event.connection_id, event.request_id), 0)
+            with _lock:
+                totals = _commands.get(event.command_name)
+                if totals is None:
+                    totals = _commands[event.command_name] = Counter(dict.fromkeys(COMMAND_FIELDS, 0))
+                totals["calls"] += 1
+                totals["failed"] += failed
+                totals["seconds"] += event.duration_micros / 1e6
+                totals["request_bytes"] += sent
+                totals["reply_bytes"] += reply_bytes
+
+        def succeeded(self, event):
+            self._finish(event, len(bson.encode(event.reply)), 0)
+
+        def failed(self, event):
+            self._finish(event, 0, 1)
+
+    return [CommandMetrics()]
+
+
+# --------------------------------------------------------------
+# EXPORT
+# --------------------------------------------------------------
+def snapshot():
+    with _lock:
+        return {
+            "phases": [{"stage": s, "phase": p, **dict(t)} for (s, p), t in sorted(_phases.items())],
+            "commands": [{"command": c, **dict(t)} for c, t in sorted(_commands.items())],
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(snap):
+    lines = []
+    phase_metrics = [
+        ("pipeline_phase_calls_total", "counter", "calls", "Timed calls (batches) per stage phase"),
+        ("pipeline_phase_docs_total", "counter", "docs", "Documents handled per stage phase"),
+        ("pipeline_phase_seconds_total", "counter", "seconds", "Wall seconds per stage phase"),
+        ("pipeline_phase_seconds_max", "gauge", "max_seconds", "Slowest single call per stage phase"),
+    ]
+    for name, kind, field, help_text in phase_metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for p in snap["phases"]:
+            lines.append(f'{name}{{stage="{_label(p["stage"])}",phase="{_label(p["phase"])}"}} {p[field]}')
+
+    command_metrics = [
+        ("mongodb_commands_total", "calls", "Commands sent to MongoDB"),
+        ("mongodb_command_failures_total", "failed", "Commands that failed"),
+        ("mongodb_command_seconds_total", "seconds", "Round-trip seconds per command"),
+        ("mongodb_command_request_bytes_total", "request_bytes", "BSON bytes sent per command"),
+        ("mongodb_command_reply_bytes_total", "reply_bytes", "BSON bytes received per command"),
+    ]
+    for name, field, help_text in command_metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for c in snap["commands"]:
+            lines.append(f'{name}{{command="{_label(c["command"])}"}} {c[field]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def print_report(snap):
+    print(f"\n{'stage':<10} {'phase':<12} {'calls':>7} {'docs':>10} {'seconds':>9} {'max ms':>8}")
+    for p in snap["phases"]:
+        print(f"{p['stage']:<10} {p['phase']:<12} {p['calls']:>7,} {p['docs']:>10,} "
+              f"{p['seconds']:>9.2f} {p['max_seconds'] * 1000:>8.1f}")
+    if snap["commands"]:
+        print(f"\n{'command':<16} {'calls':>7} {'seconds':>9} {'sent MB':>9} {'received MB':>12}")
+        for c in snap["commands"]:
+            print(f"{c['command']:<16} {c['calls']:>7,} {c['seconds']:>9.2f} "
+                  f"{c['request_bytes'] / 1024 ** 2:>9.2f} {c['reply_bytes'] / 1024 ** 2:>12.2f}")
+
+
+def export(stage):
+    """Write everything recorded in this process so far; returns the file path (None when off)."""
+    if METRICS_FORMAT not in {"json", "prometheus"}:
+        if METRICS_FORMAT:
+            raise ValueError(f"Unknown METRICS_FORMAT={METRICS_FORMAT!r} (json or prometheus)")
+        return None
+
+    snap = snapshot()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    if METRICS_FORMAT == "json":
+        path = os.path.join(METRICS_DIR, f"{stage}.json")
+        with open(path, "w") as f:
+            json.dump({"stage": stage, "written_at": time.time(), **snap}, f, indent=2)
+    else:
+        path = os.path.join(METRICS_DIR, f"{stage}.prom")
+        with open(path, "w") as f:
+            f.write(to_prometheus(snap))
+
+    print_report(snap)
+    print(f"Metrics written to {path}")
+    return path
+
+
+# --------------------------------------------------------------
+# PROFILERS
+# --------------------------------------------------------------
+class StackSampler:
+    """Samples every other thread's Python stack; folded() gives "root;...;leaf count" lines."""
+
+    def __init__(self, interval_s):
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval_s):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profiled(stage, func, *args, threaded=False, **kwargs):
+    if PROFILER not in {"cprofile", "sample"}:
+        raise ValueError(f"Unknown PROFILER={PROFILER!r} (cprofile or sample)")
+    if PROFILER == "cprofile" and threaded:
+        raise ValueError(f"PROFILER=cprofile only profiles the calling thread and {stage} does its work in "
+                         "other threads; use PROFILER=sample, which samples every thread")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    if PROFILER == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            path = os.path.join(PROFILE_DIR, f"{stage}.prof")
+            profiler.dump_stats(path)
+            print(f"cProfile stats written to {path} (python -m pstats {path}, or snakeviz/flameprof)")
+
+    sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        path = os.path.join(PROFILE_DIR, f"{stage}.folded")
+        with open(path, "w") as f:
+            f.write(sampler.folded())
+        print(f"{sum(sampler.stacks.values()):,} stack samples written to {path} "
+              "(flamegraph.pl or speedscope)")
+
+
+def stage(name, threaded=False):
+    """Decorator for a script's main(): optional profiling, then the metrics export.
+    threaded=True marks a stage whose work runs outside the calling thread."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                if PROFILER and (not PROFILE_STAGES or name in PROFILE_STAGES):
+                    return profiled(name, func, *args, threaded=threaded, **kwargs)
+                return func(*args, **kwargs)
+            finally:
+                export(name)
+        return wrapper
+    return decorate
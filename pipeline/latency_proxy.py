@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+import threading
+
+# --------------------------------------------------------------
+# LATENCY PROXY
+#   A TCP proxy in front of a local mongod that holds every chunk
+#   for half of LATENCY_MS in each direction, so each round trip
+#   costs about LATENCY_MS more, as it would to a remote cluster.
+#   Chunks are delayed, not queued behind each other, so this
+#   adds latency without cutting bandwidth. Connect with
+#   directConnection=true, or the driver follows the server's own
+#   address and bypasses the proxy:
+#     LATENCY_MS=40 python pipeline/latency_proxy.py
+#     LOCAL_MONGO_URI="mongodb://127.0.0.1:27018/?directConnection=true" STORAGE_BACKEND=local ...
+# --------------------------------------------------------------
+LATENCY_MS = float(os.getenv("LATENCY_MS", "40"))
+LISTEN_PORT = int(os.getenv("LISTEN_PORT", "27018"))
+TARGET_HOST = os.getenv("TARGET_HOST", "127.0.0.1")
+TARGET_PORT = int(os.getenv("TARGET_PORT", "27017"))
+CHUNK_BYTES = 64 * 1024
+
+
+async def delayed_pipe(reader, writer, delay_s):
+    chunks = asyncio.Queue()
+
+    async def read():
+        while True:
+            data = await reader.read(CHUNK_BYTES)
+            await chunks.put((time.monotonic() + delay_s, data))
+            if not data:
+                return
+
+    reading = asyncio.create_task(read())
+    try:
+        while True:
+            due, data = await chunks.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    finally:
+        reading.cancel()
+        writer.close()
+
+
+class LatencyProxy:
+    def __init__(self, latency_ms=LATENCY_MS, target_host=TARGET_HOST, target_port=TARGET_PORT,
+                 listen_port=LISTEN_PORT):
+        self.latency_ms = latency_ms
+        self.target_host = target_host
+        self.target_port = target_port
+        self.port = listen_port   # 0 = any free port, filled in by start()
+        self.connections = 0
+        self._loop = None
+        self._server = None
+
+    async def _handle(self, client_reader, client_writer):
+        self.connections += 1
+        server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        delay_s = self.latency_ms / 2000
+        await asyncio.gather(
+            delayed_pipe(client_reader, server_writer, delay_s),
+            delayed_pipe(server_reader, client_writer, delay_s),
+            return_exceptions=True,
+        )
+
+    async def _serve(self, ready):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self):
+        """Serve from a background thread; returns the port once it is listening."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self._serve(ready))
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="latency-proxy", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.port
+
+    def stop(self):
+        def shutdown():
+            # runs on the proxy's loop: stop accepting, then drop the open connections
+            self._server.close()
+            for task in asyncio.all_tasks():
+                task.cancel()
+
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(shutdown)
+            self._thread.join(timeout=5)
+
+    def uri(self):
+        return f"mongodb://127.0.0.1:{self.port}/?directConnection=true"
+
+
+def main():
+    proxy = LatencyProxy()
+    proxy.start()
+    print(f"Forwarding 127.0.0.1:{proxy.port} -> {TARGET_HOST}:{TARGET_PORT} "
+          f"with {LATENCY_MS:g} ms added per round trip (Ctrl+C to stop)")
+    print(f"LOCAL_MONGO_URI={proxy.uri()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
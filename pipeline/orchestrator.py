@@ -0,0 +1,371 @@
+import os
+import sys
+import time
+import queue
+import threading
+import importlib
+
+# --------------------------------------------------------------
+# STREAMING ORCHESTRATOR
+#   One process runs bronze -> silver -> validation -> gold as a
+#   DAG of threads joined by bounded in-memory queues:
+#
+#     ingest --> clean --+--> validate
+#                        +--> gold
+#
+#   A CSV chunk is written to accidents_raw and handed straight
+#   to the cleaner; every batch written to accidents_clean is
+#   validated and folded into the gold partial aggregates while
+#   the next chunk is being parsed, so nothing is read back from
+#   MongoDB. A full queue blocks its producer (backpressure), so
+#   at most QUEUE_DEPTH batches wait between two stages.
+#   The stream is always a full rebuild of silver and gold; the
+#   ingest upserts on the CSV row number make re-reading the whole
+#   CSV safe. The cleaner keeps the first copy of a duplicated ID
+#   as it streams past, the same copy silver_cleaning.py keeps.
+#     ORCHESTRATOR_MODE=batch runs the scripts one after another
+#     (the original batch-at-a-time pipeline) instead.
+# --------------------------------------------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ["", "raw_data", "clean_data", "aggregated_data"]:
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from pipeline import storage, instrumentation, compact_encoding
+import ingest_accidents
+import silver_cleaning
+import validate_accidents_schema
+import aggregation
+from csv_parsing import CHUNK_READERS
+from cleaning_rules import clean_document, clean_batch
+from dedup_backends import make_dedup_backend, insert_clean_batch
+from validation_report import ValidationSummary
+from query_modeling import INDEX_PLAN, ensure_indexes
+
+# "stream" = threaded DAG below, "batch" = run BATCH_STAGES' main() in order
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "stream")
+QUEUE_DEPTH = int(os.getenv("QUEUE_DEPTH", "4"))   # batches buffered between two stages
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", str(silver_cleaning.BATCH_SIZE)))   # CSV rows per batch
+SUMMARY_PATH = os.getenv("SUMMARY_PATH", os.path.join(ROOT, "clean_data", "schema_validation_summary.json"))
+POLL_SECONDS = 0.1   # how often a blocked stage checks whether another stage failed
+
+BATCH_STAGES = ["ingest_accidents", "silver_cleaning", "validate_accidents_schema", "aggregation"]
+
+END = None   # sent downstream once a stage has emitted its last batch
+
+
+class Aborted(Exception):
+    """Another stage failed; stop without reporting a second error."""
+
+
+# --------------------------------------------------------------
+# QUEUES + METRICS
+#   blocked_out = seconds a stage waited on a full queue (the
+#   consumer is the bottleneck), waiting_in = seconds it waited
+#   on an empty one (the producer is)
+# --------------------------------------------------------------
+class Channel:
+    def __init__(self, name, stop, depth=None):
+        self.name = name
+        self.stop = stop
+        self.queue = queue.Queue(maxsize=depth or QUEUE_DEPTH)
+        self.max_depth = 0
+
+    # both return the seconds spent blocked
+    def put(self, item):
+        start = time.perf_counter()
+        while True:
+            if self.stop.is_set():
+                raise Aborted()
+            try:
+                self.queue.put(item, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return time.perf_counter() - start
+
+    def get(self):
+        start = time.perf_counter()
+        while True:
+            if self.stop.is_set():
+                raise Aborted()
+            try:
+                item = self.queue.get(timeout=POLL_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        return item, time.perf_counter() - start
+
+
+class Stage:
+    def __init__(self, name, inbox=None, outboxes=()):
+        self.name = name
+        self.inbox = inbox
+        self.outboxes = list(outboxes)
+        self.batches = 0
+        self.docs = 0
+        self.busy = 0.0
+        self.waiting_in = 0.0
+        self.blocked_out = 0.0
+        self.elapsed = 0.0
+
+    def batches_in(self):
+        while True:
+            batch, waited = self.inbox.get()
+            self.waiting_in += waited
+            if batch is END:
+                return
+            yield batch
+
+    def emit(self, batch):
+        for channel in self.outboxes:
+            self.blocked_out += channel.put(batch)
+
+    def done(self, started, n_docs):
+        self.busy += time.perf_counter() - started
+        self.batches += 1
+        self.docs += n_docs
+
+    def metrics(self):
+        return {
+            "batches": self.batches,
+            "docs": self.docs,
+            "busy_s": round(self.busy, 3),
+            "waiting_in_s": round(self.waiting_in, 3),
+            "blocked_out_s": round(self.blocked_out, 3),
+            "elapsed_s": round(self.elapsed, 3),
+        }
+
+
+# --------------------------------------------------------------
+# STAGES (one thread each, all on the shared client)
+# --------------------------------------------------------------
+def ingest_stage(stage, db):
+    raw = db[ingest_accidents.COL_NAME]
+    if ingest_accidents.IDEMPOTENT_WRITES:
+        ingest_accidents.check_row_ids(raw)
+
+    reader = iter(CHUNK_READERS[ingest_accidents.CSV_PARSER](ingest_accidents.CSV_PATH, STREAM_BATCH_SIZE))
+    rows = 0
+    while True:
+        started = time.perf_counter()
+        records = next(reader, None)
+        if records is None:
+            break
+        if records:
+            with instrumentation.timed("ingest", "insert", len(records)):
+                ingest_accidents.write_records(raw, records, rows)
+            rows += len(records)
+        stage.done(started, len(records))
+        if records:
+            stage.emit(records)
+
+
+def clean_stage(stage, db):
+    raw = db[silver_cleaning.RAW_COL]
+    clean = db[silver_cleaning.CLEAN_COL]
+
+    compact_encoding.reset_clean_collection(db, silver_cleaning.CLEAN_COL)
+    silver_cleaning.drop_secondary_indexes(clean)
+    db[silver_cleaning.WATERMARK_COL].delete_one({"_id": "gold"})
+
+    dedup = make_dedup_backend(silver_cleaning.DEDUP_BACKEND, clean)
+    # accidents_clean may get compact documents; validate and gold downstream still see wide ones
+    writer = compact_encoding.SilverWriter(db)
+    counts = {"inserted": 0, "duplicates": 0, "dropped": 0, "over_limit": 0}
+
+    for records in stage.batches_in():
+        started = time.perf_counter()
+        if silver_cleaning.CLEAN_MODE == "batch":
+            docs = clean_batch(records)
+        else:
+            docs = [clean_document(r) for r in records]
+
+        batch = []
+        for doc in docs:
+            # CLEANING STEP 4: Remove duplicate records (same rules as silver_cleaning.py)
+            accident_id = doc.get("ID")
+            if not accident_id:
+                counts["dropped"] += 1
+            elif dedup.seen(accident_id):
+                counts["duplicates"] += 1
+            elif silver_cleaning.MAX_RECORDS and counts["inserted"] >= silver_cleaning.MAX_RECORDS:
+                counts["over_limit"] += 1
+            else:
+                batch.append(doc)
+                counts["inserted"] += 1
+
+        batch = writer.storable(batch)
+        stored = writer.prepare(batch)
+        if stored:
+            with instrumentation.timed("silver", "insert", len(stored)):
+                insert_clean_batch(clean, stored, dedup)
+        stage.done(started, len(batch))
+        if batch:
+            stage.emit(batch)
+
+    # the whole CSV is in accidents_raw by now
+    last = raw.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if last is not None:
+        silver_cleaning.save_watermark(db, "silver", last["_id"])
+    counts["inserted"] -= writer.skipped
+    counts["skipped"] = writer.skipped
+    return counts
+
+
+def validate_stage(stage, db):
+    validate_batch = validate_accidents_schema.VALIDATORS[validate_accidents_schema.VALIDATION_MODE]
+    summary = ValidationSummary(validate_accidents_schema.VALIDATION_MODE)
+
+    for docs in stage.batches_in():
+        started = time.perf_counter()
+        valid, failures, invalid = validate_batch(docs)
+        summary.add_batch(len(docs), valid, failures, invalid)
+        stage.done(started, len(docs))
+
+    summary.write_json(SUMMARY_PATH)
+    return summary
+
+
+def gold_stage(stage, db):
+    partials = aggregation.GoldPartials()
+
+    for docs in stage.batches_in():
+        started = time.perf_counter()
+        partials.add(docs)
+        stage.done(started, len(docs))
+
+    results = partials.results()
+    last = db[silver_cleaning.CLEAN_COL].find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if last is None:
+        return results
+
+    # same blue/green swap as aggregation.py's full rebuild
+    staging_col = db[aggregation.STAGING_COL]
+    staging_col.drop()
+    if results:
+        staging_col.insert_many([dict(r) for r in results])
+    ensure_indexes(staging_col, INDEX_PLAN[aggregation.AGG_COL])
+    aggregation.swap_in(db, aggregation.STAGING_COL, aggregation.AGG_COL)
+    aggregation.save_watermark(db, "gold", last["_id"])
+    return results
+
+
+# --------------------------------------------------------------
+# RUNNERS
+# --------------------------------------------------------------
+def run_stream():
+    """Run the DAG; returns {"stages": ..., "queues": ..., "results": ...}."""
+    if silver_cleaning.DEDUP_BACKEND == "index":
+        raise ValueError("The streaming run needs DEDUP_BACKEND=set, bitmap or bloom "
+                         "(with index the cleaner cannot tell which documents MongoDB rejected)")
+    compact_encoding.check_settings("full", silver_cleaning.DEDUP_BACKEND, 1, storage.STORAGE_BACKEND)
+
+    storage.get_client().admin.command("ping")
+    dbs = {name: storage.get_db(name) for name in ["ingest", "silver", "gold"]}
+
+    stop = threading.Event()
+    to_clean = Channel("ingest->clean", stop)
+    to_validate = Channel("clean->validate", stop)
+    to_gold = Channel("clean->gold", stop)
+
+    stages = [
+        (Stage("ingest", outboxes=[to_clean]), ingest_stage, dbs["ingest"]),
+        (Stage("clean", to_clean, [to_validate, to_gold]), clean_stage, dbs["silver"]),
+        (Stage("validate", to_validate), validate_stage, dbs["silver"]),
+        (Stage("gold", to_gold), gold_stage, dbs["gold"]),
+    ]
+    results, errors = {}, []
+
+    def run_thread(stage, body, db):
+        started = time.perf_counter()
+        try:
+            results[stage.name] = body(stage, db)
+            stage.emit(END)
+        except Aborted:
+            pass
+        except BaseException as e:
+            errors.append((stage.name, e))
+            stop.set()
+        finally:
+            stage.elapsed = time.perf_counter() - started
+
+    threads = [
+        threading.Thread(target=run_thread, args=args, name=f"stage-{args[0].name}")
+        for args in stages
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        name, error = errors[0]
+        raise RuntimeError(f"Stage {name} failed: {error!r}") from error
+
+    return {
+        "stages": {stage.name: stage.metrics() for stage, _, _ in stages},
+        "queues": {c.name: {"depth": c.queue.maxsize, "max_seen": c.max_depth}
+                   for c in [to_clean, to_validate, to_gold]},
+        "results": results,
+    }
+
+
+def run_batch():
+    """Fallback: each script's main() over the whole collection, one after another."""
+    timings = {}
+    for module in BATCH_STAGES:
+        print(f"\n=== {module}.py on {storage.backend_label()} ===")
+        start = time.perf_counter()
+        importlib.import_module(module).main()
+        timings[module] = time.perf_counter() - start
+    return timings
+
+
+def print_metrics(metrics, elapsed):
+    print(f"\n{'stage':<10} {'batches':>8} {'docs':>10} {'busy s':>8} {'wait in s':>10} "
+          f"{'blocked s':>10} {'elapsed s':>10}")
+    for name, m in metrics["stages"].items():
+        print(f"{name:<10} {m['batches']:>8,} {m['docs']:>10,} {m['busy_s']:>8.2f} "
+              f"{m['waiting_in_s']:>10.2f} {m['blocked_out_s']:>10.2f} {m['elapsed_s']:>10.2f}")
+
+    print(f"\n{'queue':<18} {'depth':>6} {'max seen':>9}")
+    for name, q in metrics["queues"].items():
+        print(f"{name:<18} {q['depth']:>6} {q['max_seen']:>9}")
+
+    # the stage with the most busy time sets the pace of the whole stream
+    slowest = max(metrics["stages"], key=lambda s: metrics["stages"][s]["busy_s"])
+    print(f"\nBottleneck: {slowest} | total elapsed: {elapsed:.2f}s")
+
+
+@instrumentation.stage("orchestrator", threaded=True)
+def main():
+    print(f"Orchestrator mode={ORCHESTRATOR_MODE} on {storage.backend_label()}")
+    start = time.perf_counter()
+
+    if ORCHESTRATOR_MODE == "batch":
+        timings = run_batch()
+        for module, seconds in timings.items():
+            print(f"{module:<28} {seconds:>8.2f}s")
+        print(f"{'total':<28} {time.perf_counter() - start:>8.2f}s")
+        return
+    if ORCHESTRATOR_MODE != "stream":
+        raise ValueError(f"Unknown ORCHESTRATOR_MODE={ORCHESTRATOR_MODE!r} (stream or batch)")
+
+    metrics = run_stream()
+    elapsed = time.perf_counter() - start
+
+    counts = metrics["results"]["clean"]
+    summary = metrics["results"]["validate"]
+    print(f"\nInserted into accidents_clean: {counts['inserted']:,} | duplicates skipped: "
+          f"{counts['duplicates']:,} | dropped (no ID): {counts['dropped']:,}")
+    print(f"Validated: {summary.processed:,} | valid: {summary.valid:,} | invalid: {summary.invalid:,} "
+          f"(summary in {SUMMARY_PATH})")
+    print(f"Gold groups: {len(metrics['results']['gold']):,}")
+    print_metrics(metrics, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import importlib
+
+# --------------------------------------------------------------
+# WHOLE PIPELINE IN ONE PROCESS
+#   bronze -> silver -> validation -> gold, every stage's main()
+#   called in order against one shared client. With the default
+#   STORAGE_BACKEND=memory nothing needs a server or the network:
+#     STORAGE_BACKEND=memory CSV_PATH=sample.csv python pipeline/run_local.py
+#   The stage scripts read their settings at import, so the
+#   defaults below are set before any of them is imported.
+# --------------------------------------------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ["", "raw_data", "clean_data", "aggregated_data"]:
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+LOCAL_DEFAULTS = {
+    "STORAGE_BACKEND": "memory",
+    "INGEST_MODE": "sequential",
+    "WORKERS": "1",
+    "PERCENTILE_MODE": "sketch",   # $percentile needs MongoDB 7.0
+}
+for key, value in LOCAL_DEFAULTS.items():
+    os.environ.setdefault(key, value)
+
+from pipeline import config, storage
+
+# stage name -> script module (run in this order)
+STAGES = {
+    "ingest": "ingest_accidents",
+    "silver": "silver_cleaning",
+    "validate": "validate_accidents_schema",
+    "gold": "aggregation",
+    "distributions": "distributions",
+}
+LOCAL_STAGES = os.getenv("LOCAL_STAGES", ",".join(STAGES)).split(",")
+
+
+def run_stage(stage):
+    print(f"\n=== {stage} ({STAGES[stage]}.py) on {storage.backend_label()} ===")
+    importlib.import_module(STAGES[stage]).main()
+
+
+def run(stages=None):
+    """Run the stages in order; returns {stage: seconds}."""
+    stages = stages or LOCAL_STAGES
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown LOCAL_STAGES {unknown} (choose from {list(STAGES)})")
+
+    if storage.STORAGE_BACKEND == "memory":
+        # start from an empty database, also when run twice in one process (tests)
+        storage.get_client().drop_database(config.DB_NAME)
+
+    timings = {}
+    for stage in STAGES:
+        if stage not in stages:
+            continue
+        start = time.perf_counter()
+        run_stage(stage)
+        timings[stage] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    timings = run()
+
+    print("\n--- LOCAL PIPELINE TIMING ---")
+    for stage, seconds in timings.items():
+        print(f"{stage:<14} {seconds:>8.2f}s")
+    print(f"{'total':<14} {sum(timings.values()):>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
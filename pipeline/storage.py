@@ -0,0 +1,140 @@
+import os
+from pipeline import config, instrumentation
+
+# --------------------------------------------------------------
+# STORAGE BACKENDS
+#   Every script gets its client from get_client() (or a database
+#   handle from get_db()), so the same pipeline runs against:
+#     atlas  - MONGO_URI from .env (default, original behaviour)
+#     local  - a local mongod at LOCAL_MONGO_URI
+#     memory - in-process mongomock; no server and no network.
+#              Data only lives as long as the Python process, so
+#              run the stages in one process (run_local.py) and
+#              keep WORKERS=1 (spawned workers would see an empty
+#              database). Server-only features ($bucketAuto,
+#              $percentile, pipeline updates) are not available.
+#   The client is created on first use and then shared by every
+#   stage and thread in the process (one connection pool), tuned
+#   from pipeline/config.py.
+# --------------------------------------------------------------
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "atlas")
+LOCAL_MONGO_URI = os.getenv("LOCAL_MONGO_URI", "mongodb://localhost:27017")
+
+BACKEND_LABELS = {
+    "atlas": "MongoDB Atlas",
+    "local": "local mongod",
+    "memory": "in-memory mongomock",
+}
+
+_client = None
+_client_key = None   # (backend, pid) the client was made for
+
+
+def backend_label():
+    return BACKEND_LABELS.get(STORAGE_BACKEND, STORAGE_BACKEND)
+
+
+def _mongomock_client():
+    try:
+        import mongomock
+    except ImportError as e:
+        raise ValueError("STORAGE_BACKEND=memory needs mongomock (pip install mongomock)") from e
+
+    # pymongo >= 4.11 passes sort= to bulk replace/update ops, mongomock 4.x does not accept it
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ["add_replace", "add_update"]:
+        original = getattr(builder, name)
+        if not getattr(original, "drops_sort", False):
+            def patched(self, *args, _original=original, sort=None, **kwargs):
+                return _original(self, *args, **kwargs)
+            patched.drops_sort = True
+            setattr(builder, name, patched)
+
+    return mongomock.MongoClient()
+
+
+# URI and MongoClient keyword arguments for atlas/local (shared by the sync and async clients)
+def _client_settings():
+    if STORAGE_BACKEND == "local":
+        uri = LOCAL_MONGO_URI
+    elif STORAGE_BACKEND == "atlas":
+        uri = config.env("MONGO_URI")
+        if not uri:
+            raise ValueError("MONGO_URI not found in .env")
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND={STORAGE_BACKEND!r} (atlas, local or memory)")
+
+    options = {
+        "serverSelectionTimeoutMS": config.SERVER_SELECTION_TIMEOUT_MS,
+        "maxPoolSize": config.MAX_POOL_SIZE,
+    }
+    compressors = config.compressors(STORAGE_BACKEND)
+    if compressors:
+        options["compressors"] = compressors
+    # command counts, round-trip times and BSON bytes (METRICS_FORMAT, see instrumentation.py)
+    listeners = instrumentation.command_listeners()
+    if listeners:
+        options["event_listeners"] = listeners
+    return uri, options
+
+
+def _mongo_client():
+    from pymongo import MongoClient
+
+    uri, options = _client_settings()
+    return MongoClient(uri, **options)
+
+
+def get_client():
+    """The process's MongoClient (or mongomock client) for STORAGE_BACKEND, created on first use."""
+    global _client, _client_key
+    # a forked child must not reuse its parent's sockets
+    key = (STORAGE_BACKEND, os.getpid())
+    if _client is None or _client_key != key:
+        _client = _mongomock_client() if STORAGE_BACKEND == "memory" else _mongo_client()
+        _client_key = key
+    return _client
+
+
+def get_db(stage=None):
+    """DB_NAME on the shared client, with the write concern configured for `stage`."""
+    db = get_client()[config.DB_NAME]
+    if STORAGE_BACKEND == "memory":
+        return db   # mongomock has no write concerns
+
+    from pymongo import WriteConcern
+
+    return db.with_options(write_concern=WriteConcern(**config.write_concern(stage)))
+
+
+def async_client():
+    """A new AsyncMongoClient for STORAGE_BACKEND; use it inside one event loop and close it there."""
+    if STORAGE_BACKEND == "memory":
+        raise ValueError("IO_MODE=async needs STORAGE_BACKEND=atlas or local (mongomock has no async client)")
+    from pymongo import AsyncMongoClient
+
+    uri, options = _client_settings()
+    return AsyncMongoClient(uri, **options)
+
+
+def async_db(client, stage=None):
+    """get_db() for an async_client()."""
+    from pymongo import WriteConcern
+
+    return client.get_database(config.DB_NAME, write_concern=WriteConcern(**config.write_concern(stage)))
+
+
+def close_client():
+    """Close the shared client at the end of a process (the memory backend keeps its data)."""
+    global _client, _client_key
+    if _client is None or STORAGE_BACKEND == "memory":
+        return
+    _client.close()
+    _client, _client_key = None, None
+
+
+def require_shared_storage(what):
+    """Worker processes open their own client, which the in-memory backend cannot share."""
+    if STORAGE_BACKEND == "memory":
+        raise ValueError(f"{what} uses worker processes and cannot run with STORAGE_BACKEND=memory "
+                         "(set WORKERS=1 or use atlas/local)")
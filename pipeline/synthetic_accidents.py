@@ -0,0 +1,195 @@
+import os
+import sys
+import csv
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "raw_data"))
+from csv_parsing import ACCIDENT_COLUMNS, BOOL
+
+# --------------------------------------------------------------
+# SYNTHETIC US ACCIDENTS CSV
+#   Seeded generator with the same columns as
+#   US_Accidents_March23.csv, so every stage can be benchmarked
+#   at any size without the real file. The data has the same
+#   problems the cleaning code handles:
+#     - empty cells at roughly the real per-column null rates
+#     - dirty strings ("N/A", "unknown", padded whitespace)
+#     - repeated IDs (DUPLICATE_RATE)
+#     - unparseable or impossible timestamps (BAD_TIME_RATE)
+#   Like the real file, a share of the Zipcodes are ZIP+4
+#   (ZIP4_RATE), so pandas reads the column as strings.
+#   The same (rows, seed) always gives the same file.
+# --------------------------------------------------------------
+SYNTH_ROWS = int(os.getenv("SYNTH_ROWS", "100000"))
+SYNTH_SEED = int(os.getenv("SYNTH_SEED", "42"))
+SYNTH_PATH = os.getenv("SYNTH_PATH", os.path.join("data", "synthetic", f"accidents_{SYNTH_ROWS}_{SYNTH_SEED}.csv"))
+
+DUPLICATE_RATE = 0.01
+BAD_TIME_RATE = 0.005
+DIRTY_RATE = 0.01
+ZIP4_RATE = 0.3
+
+# share of empty cells per column (the rest are always filled)
+NULL_RATES = {
+    "End_Lat": 0.44,
+    "End_Lng": 0.44,
+    "Description": 0.001,
+    "Street": 0.0014,
+    "City": 0.0001,
+    "Zipcode": 0.0003,
+    "Timezone": 0.001,
+    "Airport_Code": 0.003,
+    "Weather_Timestamp": 0.016,
+    "Temperature(F)": 0.021,
+    "Wind_Chill(F)": 0.26,
+    "Humidity(%)": 0.023,
+    "Pressure(in)": 0.018,
+    "Visibility(mi)": 0.023,
+    "Wind_Direction": 0.023,
+    "Wind_Speed(mph)": 0.074,
+    "Precipitation(in)": 0.285,
+    "Weather_Condition": 0.022,
+    "Sunrise_Sunset": 0.003,
+    "Civil_Twilight": 0.003,
+    "Nautical_Twilight": 0.003,
+    "Astronomical_Twilight": 0.003,
+}
+# columns that get "N/A" / "unknown" / padding at DIRTY_RATE
+DIRTY_COLUMNS = ["City", "County", "Street", "Weather_Condition", "Wind_Direction"]
+DIRTY_VALUES = ["N/A", "unknown", "null", "NA", " "]
+BAD_TIMESTAMPS = ["N/A", "not a date", "2021-02-30 10:00:00", "2021-13-01 08:00:00", "24:61"]
+
+# state -> (weight, center lat, center lng, timezone, cities)
+STATES = {
+    "CA": (0.22, 36.5, -119.5, "US/Pacific", ["Los Angeles", "San Diego", "Sacramento", "San Jose"]),
+    "FL": (0.11, 28.0, -81.7, "US/Eastern", ["Miami", "Orlando", "Tampa", "Jacksonville"]),
+    "TX": (0.07, 31.0, -98.5, "US/Central", ["Houston", "Dallas", "Austin", "San Antonio"]),
+    "SC": (0.05, 33.8, -80.9, "US/Eastern", ["Columbia", "Charleston", "Greenville"]),
+    "NY": (0.05, 42.9, -75.5, "US/Eastern", ["New York", "Buffalo", "Rochester"]),
+    "NC": (0.05, 35.5, -79.4, "US/Eastern", ["Charlotte", "Raleigh", "Durham"]),
+    "PA": (0.04, 40.9, -77.8, "US/Eastern", ["Philadelphia", "Pittsburgh", "Harrisburg"]),
+    "OH": (0.03, 40.3, -82.8, "US/Eastern", ["Dayton", "Columbus", "Cleveland"]),
+    "VA": (0.03, 37.5, -78.8, "US/Eastern", ["Richmond", "Norfolk", "Arlington"]),
+    "MN": (0.03, 46.3, -94.3, "US/Central", ["Minneapolis", "Saint Paul", "Duluth"]),
+    "OR": (0.03, 44.0, -120.5, "US/Pacific", ["Portland", "Salem", "Eugene"]),
+    "AZ": (0.02, 34.3, -111.7, "US/Mountain", ["Phoenix", "Tucson", "Mesa"]),
+}
+SEVERITY_WEIGHTS = {1: 0.009, 2: 0.797, 3: 0.168, 4: 0.026}
+WEATHER = ["Fair", "Clear", "Cloudy", "Mostly Cloudy", "Partly Cloudy", "Light Rain", "Overcast",
+           "Light Snow", "Fog", "Rain", "Haze", "Heavy Rain", "Thunderstorm"]
+WIND_DIRECTIONS = ["CALM", "Calm", "N", "NE", "E", "SE", "S", "SW", "W", "NW", "Variable", "VAR"]
+# share of True per POI flag
+POI_RATES = {"Traffic_Signal": 0.148, "Crossing": 0.113, "Junction": 0.074, "Station": 0.026, "Stop": 0.028,
+             "Amenity": 0.012, "Railway": 0.009, "Give_Way": 0.005, "Traffic_Calming": 0.001,
+             "No_Exit": 0.003, "Bump": 0.0005, "Roundabout": 0.0001, "Turning_Loop": 0.0}
+
+FIRST_START = datetime(2016, 1, 14)
+SPAN_MINUTES = int((datetime(2023, 3, 31) - FIRST_START).total_seconds() // 60)
+
+
+def _time(value, rng):
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    # about a third of the real Start/End_Time values carry nanoseconds
+    return text + ".000000000" if rng.random() < 0.3 else text
+
+
+def make_row(i, rng, states, state_weights):
+    state = rng.choices(states, state_weights)[0]
+    _, lat, lng, timezone, cities = STATES[state]
+    start = FIRST_START + timedelta(minutes=rng.randrange(SPAN_MINUTES))
+    end = start + timedelta(minutes=rng.randint(5, 360))
+    start_lat, start_lng = lat + rng.gauss(0, 1.2), lng + rng.gauss(0, 1.5)
+    city = rng.choice(cities)
+    street = f"{rng.choice(['I-', 'US-', 'SR-'])}{rng.randint(1, 99)} {rng.choice('NESW')}"
+    daylight = "Day" if 6 <= start.hour < 19 else "Night"
+    zipcode = f"{rng.randint(10000, 99999)}"
+    if rng.random() < ZIP4_RATE:
+        zipcode += f"-{rng.randint(1, 9999):04d}"
+
+    row = {
+        "ID": f"A-{i}",
+        "Source": rng.choice(["Source1", "Source2", "Source3"]),
+        "Severity": rng.choices(list(SEVERITY_WEIGHTS), list(SEVERITY_WEIGHTS.values()))[0],
+        "Start_Time": _time(start, rng),
+        "End_Time": _time(end, rng),
+        "Start_Lat": round(start_lat, 6),
+        "Start_Lng": round(start_lng, 6),
+        "End_Lat": round(start_lat + rng.uniform(-0.01, 0.01), 6),
+        "End_Lng": round(start_lng + rng.uniform(-0.01, 0.01), 6),
+        "Distance(mi)": round(rng.expovariate(2.0), 3),
+        "Description": f"Accident on {street} near {city}.",
+        "Street": street,
+        "City": city,
+        "County": f"{city} County",
+        "State": state,
+        "Zipcode": zipcode,
+        "Country": "US",
+        "Timezone": timezone,
+        "Airport_Code": "K" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3)),
+        "Weather_Timestamp": (start.replace(minute=0, second=0) + timedelta(minutes=53)).strftime("%Y-%m-%d %H:%M:%S"),
+        "Temperature(F)": round(rng.gauss(62, 19), 1),
+        "Wind_Chill(F)": round(rng.gauss(58, 22), 1),
+        "Humidity(%)": round(rng.uniform(10, 100)),
+        "Pressure(in)": round(rng.gauss(29.5, 0.9), 2),
+        "Visibility(mi)": 10.0 if rng.random() < 0.8 else round(rng.uniform(0, 10), 1),
+        "Wind_Direction": rng.choice(WIND_DIRECTIONS),
+        "Wind_Speed(mph)": round(rng.expovariate(1 / 7.6), 1),
+        "Precipitation(in)": 0.0 if rng.random() < 0.9 else round(rng.expovariate(10), 2),
+        "Weather_Condition": rng.choice(WEATHER),
+        **{flag: rng.random() < rate for flag, rate in POI_RATES.items()},
+        "Sunrise_Sunset": daylight,
+        "Civil_Twilight": daylight,
+        "Nautical_Twilight": daylight,
+        "Astronomical_Twilight": daylight,
+    }
+
+    for column, rate in NULL_RATES.items():
+        if rng.random() < rate:
+            row[column] = None
+    for column in DIRTY_COLUMNS:
+        if row[column] is not None and rng.random() < DIRTY_RATE:
+            row[column] = rng.choice(DIRTY_VALUES + [f"  {row[column]}  "])
+    return row
+
+
+def write_synthetic_csv(path, rows, seed=SYNTH_SEED):
+    """Write `rows` accidents to `path`; returns counts of the injected problems."""
+    rng = random.Random(seed)
+    states = list(STATES)
+    state_weights = [STATES[s][0] for s in states]
+    stats = {"rows": rows, "duplicate_ids": 0, "bad_timestamps": 0}
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ACCIDENT_COLUMNS)
+
+        for i in range(rows):
+            row = make_row(i, rng, states, state_weights)
+            if i and rng.random() < DUPLICATE_RATE:
+                row["ID"] = f"A-{rng.randrange(i)}"
+                stats["duplicate_ids"] += 1
+            if rng.random() < BAD_TIME_RATE:
+                row[rng.choice(["Start_Time", "End_Time"])] = rng.choice(BAD_TIMESTAMPS)
+                stats["bad_timestamps"] += 1
+
+            writer.writerow(
+                "" if row[c] is None else ("True" if row[c] else "False") if kind == BOOL else row[c]
+                for c, kind in ACCIDENT_COLUMNS.items()
+            )
+
+    return stats
+
+
+def main():
+    print(f"Writing {SYNTH_ROWS:,} synthetic accidents (seed {SYNTH_SEED}) to {SYNTH_PATH}")
+    stats = write_synthetic_csv(SYNTH_PATH, SYNTH_ROWS, SYNTH_SEED)
+    print(f"Duplicate IDs: {stats['duplicate_ids']:,} | Bad timestamps: {stats['bad_timestamps']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from csv_parsing import CHUNK_READERS
+
+# --------------------------------------------------------------
+# CSV PARSING BENCHMARK
+#   Compares the original pandas path against the typed pyarrow
+#   path. No MongoDB needed: this only measures parse + record
+#   building. Each parser runs in a fresh process so its peak
+#   RSS is measured on its own.
+# --------------------------------------------------------------
+CSV_PATH = os.getenv("CSV_PATH", os.path.join("data", "raw", "US_Accidents_March23.csv"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "50000"))
+MAX_ROWS = int(os.getenv("MAX_ROWS", "1000000"))   # 0 = whole file
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_parser(parser, path, chunk_size, max_rows):
+    rows = 0
+    t0 = time.perf_counter()
+
+    for records in CHUNK_READERS[parser](path, chunk_size):
+        rows += len(records)
+        if max_rows and rows >= max_rows:
+            break
+
+    elapsed = time.perf_counter() - t0
+    return rows, elapsed, _peak_rss_mb()
+
+
+def main():
+    print(f"Benchmarking {CSV_PATH} | chunk size {CHUNK_SIZE:,} | max rows {MAX_ROWS:,}")
+
+    results = {}
+    for parser in ["pandas", "typed"]:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[parser] = pool.submit(run_parser, parser, CSV_PATH, CHUNK_SIZE, MAX_ROWS).result()
+
+    print(f"\n{'parser':<8} {'rows':>12} {'seconds':>9} {'rows/sec':>12} {'peak RSS (MB)':>14}")
+    for parser, (rows, elapsed, rss) in results.items():
+        print(f"{parser:<8} {rows:>12,} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {rss:>14,.0f}")
+
+    base_rows, base_s, base_rss = results["pandas"]
+    rows, secs, rss = results["typed"]
+    print(f"\nTyped path: {(rows / secs) / (base_rows / base_s):.2f}x throughput, "
+          f"{rss / base_rss:.2f}x peak RSS of the pandas path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import io
+
+# --------------------------------------------------------------
+# US ACCIDENTS COLUMN TYPES
+#   Declared once so the CSV parser never has to guess.
+#   Timestamps stay as strings: the bronze layer stores them
+#   unmodified and silver_cleaning.py parses them.
+# --------------------------------------------------------------
+STRING = "string"
+INT = "int"
+FLOAT = "float"
+BOOL = "bool"
+
+ACCIDENT_COLUMNS = {
+    "ID": STRING,
+    "Source": STRING,
+    "Severity": INT,
+    "Start_Time": STRING,
+    "End_Time": STRING,
+    "Start_Lat": FLOAT,
+    "Start_Lng": FLOAT,
+    "End_Lat": FLOAT,
+    "End_Lng": FLOAT,
+    "Distance(mi)": FLOAT,
+    "Description": STRING,
+    "Street": STRING,
+    "City": STRING,
+    "County": STRING,
+    "State": STRING,
+    "Zipcode": STRING,
+    "Country": STRING,
+    "Timezone": STRING,
+    "Airport_Code": STRING,
+    "Weather_Timestamp": STRING,
+    "Temperature(F)": FLOAT,
+    "Wind_Chill(F)": FLOAT,
+    "Humidity(%)": FLOAT,
+    "Pressure(in)": FLOAT,
+    "Visibility(mi)": FLOAT,
+    "Wind_Direction": STRING,
+    "Wind_Speed(mph)": FLOAT,
+    "Precipitation(in)": FLOAT,
+    "Weather_Condition": STRING,
+    "Amenity": BOOL,
+    "Bump": BOOL,
+    "Crossing": BOOL,
+    "Give_Way": BOOL,
+    "Junction": BOOL,
+    "No_Exit": BOOL,
+    "Railway": BOOL,
+    "Roundabout": BOOL,
+    "Station": BOOL,
+    "Stop": BOOL,
+    "Traffic_Calming": BOOL,
+    "Traffic_Signal": BOOL,
+    "Turning_Loop": BOOL,
+    "Sunrise_Sunset": STRING,
+    "Civil_Twilight": STRING,
+    "Nautical_Twilight": STRING,
+    "Astronomical_Twilight": STRING,
+}
+
+
+# --------------------------------------------------------------
+# PANDAS PATH (original)
+#   where(notnull, None) upcasts every column to object
+#   (pandas, like pyarrow below, is only imported by the path that uses it)
+# --------------------------------------------------------------
+def to_records(chunk):
+    import pandas as pd
+
+    # NULL STORAGE
+    chunk = chunk.where(pd.notnull(chunk), None)
+    return chunk.to_dict("records")
+
+
+def parse_pandas(data):
+    import pandas as pd
+
+    chunk = pd.read_csv(io.BytesIO(data), low_memory=False)
+    return to_records(chunk)
+
+
+# --------------------------------------------------------------
+# TYPED ARROW PATH
+#   pyarrow parses straight into typed column buffers, empty
+#   cells become Arrow nulls, and to_pylist() builds the record
+#   dicts from those buffers (nulls come out as None, no NaN).
+# --------------------------------------------------------------
+def arrow_column_types():
+    import pyarrow as pa
+
+    arrow_types = {STRING: pa.string(), INT: pa.int64(), FLOAT: pa.float64(), BOOL: pa.bool_()}
+    return {name: arrow_types[kind] for name, kind in ACCIDENT_COLUMNS.items()}
+
+
+def arrow_convert_options():
+    import pyarrow.csv as pacsv
+
+    return pacsv.ConvertOptions(
+        column_types=arrow_column_types(),
+        null_values=[""],
+        strings_can_be_null=True,
+        true_values=["True", "true"],
+        false_values=["False", "false"],
+    )
+
+
+def parse_typed(data):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    table = pacsv.read_csv(pa.BufferReader(data), convert_options=arrow_convert_options())
+    return table.to_pylist()
+
+
+# Stream a CSV file as lists of exactly chunk_size records (last one may be shorter)
+def iter_typed_chunks(path, chunk_size, skip_rows=0):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(skip_rows_after_names=skip_rows, block_size=16 * 1024 * 1024),
+        convert_options=arrow_convert_options(),
+    )
+
+    pending = []
+    pending_rows = 0
+
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_size).to_pylist()
+            rest = table.slice(chunk_size)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+
+    if pending_rows:
+        yield pa.Table.from_batches(pending).to_pylist()
+
+
+def iter_pandas_chunks(path, chunk_size, skip_rows=0):
+    import pandas as pd
+
+    skip = range(1, skip_rows + 1)   # keep the header row
+    for chunk in pd.read_csv(path, chunksize=chunk_size, low_memory=False, skiprows=skip):
+        yield to_records(chunk)
+
+
+PARSERS = {"pandas": parse_pandas, "typed": parse_typed}
+CHUNK_READERS = {"pandas": iter_pandas_chunks, "typed": iter_typed_chunks}
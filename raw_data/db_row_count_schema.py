@@ -1,66 +1,67 @@
 import os
-from pymongo import MongoClient
+import sys
 # import pandas as pd
 import logging
-from dotenv import load_dotenv
 
-load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger(__name__)
+COL_NAME = os.getenv("COL_NAME", "accidents_raw")
+SAMPLE_SIZE = int(os.getenv("SAMPLE_SIZE", "10"))
 
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI not found. Make sure .env exists and has MONGO_URI=...")
 
-client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+def _type_name(v):
+    if v is None:
+        return "None"
+    return type(v).__name__
 
-client.admin.command("ping")
-logging.info("Connected to MongoDB Atlas")
 
+def main():
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger(__name__)
 
-DB_NAME = os.getenv("DB_NAME", "bigdata_capstone")
-COL_NAME = os.getenv("COL_NAME", "accidents_raw")  
-SAMPLE_SIZE = int(os.getenv("SAMPLE_SIZE", "10"))
+    get_client().admin.command("ping")
+    logging.info(f"Connected to {backend_label()}")
 
-db = client[DB_NAME]
-col = db[COL_NAME]
-logging.info(f"Using DB={DB_NAME} | Collection={COL_NAME}")
+    db = get_db()
+    col = db[COL_NAME]
+    logging.info(f"Using DB={db.name} | Collection={COL_NAME}")
 
 
-# The following used to be how we showed schema in the code.
-# Unfortunately it takes too long with the new dataset
-# df = pd.DataFrame(col.find())
-# print(df.shape[0])
-# logging.info("dataframe table done")
+    # The following used to be how we showed schema in the code.
+    # Unfortunately it takes too long with the new dataset
+    # (schema_profiler.py now streams the full collection instead)
+    # df = pd.DataFrame(col.find())
+    # print(df.shape[0])
+    # logging.info("dataframe table done")
 
-# pymongo built in way to get row count from database
-row_count = col.count_documents({})
-print(f"row_count: {row_count}")
+    # pymongo built in way to get row count from database
+    row_count = col.count_documents({})
+    print(f"row_count: {row_count}")
 
-logging.info("row count found")
+    logging.info("row count found")
 
-# sampling documents for schema read
-print("\n--- SAMPLE DOCUMENTS (limited) ---")
-sample_docs = list(col.find({}, {"_id": 0}).limit(SAMPLE_SIZE))
-for i, doc in enumerate(sample_docs, start=1):
-    print(f"\n[{i}] {doc}")
+    # sampling documents for schema read
+    print("\n--- SAMPLE DOCUMENTS (limited) ---")
+    sample_docs = list(col.find({}, {"_id": 0}).limit(SAMPLE_SIZE))
+    for i, doc in enumerate(sample_docs, start=1):
+        print(f"\n[{i}] {doc}")
 
-def _type_name(v):
-    if v is None:
-        return "None"
-    return type(v).__name__
+    schema = {}
+    for doc in sample_docs:
+        for k, v in doc.items():
+            schema.setdefault(k, set()).add(_type_name(v))
+
+    print("\n--- INFERRED SCHEMA (from sample) ---")
+    for field in sorted(schema.keys()):
+        types_seen = ", ".join(sorted(schema[field]))
+        print(f"{field}: {types_seen}")
 
-schema = {}
-for doc in sample_docs:
-    for k, v in doc.items():
-        schema.setdefault(k, set()).add(_type_name(v))
+    logging.info("schema collected")
 
-print("\n--- INFERRED SCHEMA (from sample) ---")
-for field in sorted(schema.keys()):
-    types_seen = ", ".join(sorted(schema[field]))
-    print(f"{field}: {types_seen}")
+    print(f"\nSchema inferred from SAMPLE_SIZE={SAMPLE_SIZE}. (Not the entire collection.)")
+    print("Run schema_profiler.py for type histograms, null rates, min/max and distinct counts over the whole collection.")
 
-logging.info("schema collected")
 
-print(f"\nSchema inferred from SAMPLE_SIZE={SAMPLE_SIZE}. (Not the entire collection.)")
+if __name__ == "__main__":
+    main()
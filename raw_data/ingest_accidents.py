@@ -1,43 +1,290 @@
 import os
-import pandas as pd
-from pymongo import MongoClient
-from dotenv import load_dotenv
+import sys
+import time
+import queue
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from pymongo import ReplaceOne
+from csv_parsing import PARSERS, CHUNK_READERS
 
-load_dotenv()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label
+from pipeline import instrumentation
 
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("MONGO_URI not found. Make sure .env is in the capstone folder.")
-
-DB_NAME = "bigdata_capstone"
 COL_NAME = "accidents_raw"
-CSV_PATH = os.path.join("data", "raw", "US_Accidents_March23.csv")
+CHECKPOINT_COL = "ingest_checkpoints"
+CSV_PATH = os.getenv("CSV_PATH", os.path.join("data", "raw", "US_Accidents_March23.csv"))
 CHUNK_SIZE = 50_000   # <-------- Keep chunk size below 100k
 
+# "sequential" = original single read_csv loop, "parallel" = byte range engine
+INGEST_MODE = os.getenv("INGEST_MODE", "sequential")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+WRITE_WORKERS = int(os.getenv("WRITE_WORKERS", "4"))
+RANGE_BYTES = int(os.getenv("RANGE_BYTES", str(32 * 1024 * 1024)))   # ~32MB of CSV per parse task
+# "pandas" = original read_csv + where(notnull, None), "typed" = pyarrow with a declared schema
+CSV_PARSER = os.getenv("CSV_PARSER", "pandas")
 
+# Store each row under its CSV row number (_id = 0, 1, 2, ... in file order) and upsert on it,
+# so a replayed chunk never creates duplicates while repeated IDs are all kept, as in the file
+# (0 = plain insert_many with server-assigned ObjectIds)
+IDEMPOTENT_WRITES = os.getenv("IDEMPOTENT_WRITES", "1") == "1"
+# Ignore saved checkpoints and load the whole file again
+RESET_CHECKPOINTS = os.getenv("RESET_CHECKPOINTS", "0") == "1"
 
-def main():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=10000)
-    client.admin.command("ping")
-    print("Connected to MongoDB")
 
-    db = client[DB_NAME]
-    col = db[COL_NAME]
+# --------------------------------------------------------------
+# PARSING HELPERS (record builders live in csv_parsing.py)
+# --------------------------------------------------------------
+# Split the CSV into byte ranges that start and end on line boundaries.
+# NOTE: assumes no quoted field contains a raw newline (true for US Accidents)
+def split_byte_ranges(path, range_bytes):
+    size = os.path.getsize(path)
+    ranges = []
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+
+        while start < size:
+            f.seek(min(start + range_bytes, size))
+            if f.tell() < size:
+                f.readline()   # move to the start of the next full line
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+
+    return header, ranges
+
+
+# Runs inside a worker process: read one byte range and turn it into records
+def parse_byte_range(path, header, start, end, parser):
+    t0 = time.perf_counter()
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    records = PARSERS[parser](header + data)
+
+    return records, time.perf_counter() - t0
+
+
+# --------------------------------------------------------------
+# WRITES + CHECKPOINTS
+# --------------------------------------------------------------
+# records[0] is CSV data row first_row (0-based, header not counted)
+def write_records(col, records, first_row):
+    if not IDEMPOTENT_WRITES:
+        col.insert_many(records, ordered=False)
+        return
 
-    total = 0
+    ops = []
+    for row, r in enumerate(records, start=first_row):
+        r["_id"] = row
+        ops.append(ReplaceOne({"_id": row}, r, upsert=True))
+    col.bulk_write(ops, ordered=False)
 
-    for chunk in pd.read_csv(CSV_PATH, chunksize=CHUNK_SIZE, low_memory=False):
-        # NULL STORAGE
-        chunk = chunk.where(pd.notnull(chunk), None)
 
-        records = chunk.to_dict("records")
+def check_row_ids(col):
+    # older runs upserted on ID behind a unique index and let the server pick ObjectIds
+    if "idx_raw_id_unique" in col.index_information():
+        col.drop_index("idx_raw_id_unique")
+    if col.find_one({"_id": {"$type": "objectId"}}, {"_id": 1}):
+        raise ValueError(
+            f"{COL_NAME} holds documents with ObjectId _ids from an older run; mixing them with "
+            "row-number _ids would duplicate rows. Drop the collection once, or set IDEMPOTENT_WRITES=0."
+        )
+
+
+# Checkpoints are only valid for the same file split the same way and read by
+# the same parser (parsers may type the same column differently)
+def checkpoint_run_key(mode):
+    unit = RANGE_BYTES if mode == "parallel" else CHUNK_SIZE
+    return f"{os.path.basename(CSV_PATH)}|{os.path.getsize(CSV_PATH)}|{mode}|{unit}|{CSV_PARSER}"
+
+
+class Checkpoints:
+    def __init__(self, db, run_key):
+        self.col = db[CHECKPOINT_COL]
+        self.run_key = run_key
+        self.col.create_index([("run", 1), ("chunk", 1)], unique=True,
+                              name="idx_checkpoint_run_chunk")
+        if RESET_CHECKPOINTS:
+            self.col.delete_many({"run": run_key})
+
+    def committed(self):
+        return {d["chunk"]: d for d in self.col.find({"run": self.run_key}, {"_id": 0})}
+
+    def commit(self, chunk, rows, start=None, end=None):
+        self.col.update_one(
+            {"run": self.run_key, "chunk": chunk},
+            {"$set": {"rows": rows, "start": start, "end": end,
+                      "committed_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+
+# --------------------------------------------------------------
+# SEQUENTIAL INGESTION (original path)
+# --------------------------------------------------------------
+def ingest_sequential(col, checkpoints):
+    done = checkpoints.committed()
+
+    # resume after the last contiguous committed chunk
+    first_chunk = 0
+    while first_chunk in done:
+        first_chunk += 1
+    total = sum(done[i]["rows"] for i in range(first_chunk))
+    if first_chunk:
+        print(f"Resuming after chunk {first_chunk - 1} ({total:,} rows already committed)")
+
+    reader = CHUNK_READERS[CSV_PARSER](CSV_PATH, CHUNK_SIZE, skip_rows=first_chunk * CHUNK_SIZE)
+    reader = instrumentation.timed_batches(reader, "ingest", "parse")
+
+    for chunk_no, records in enumerate(reader, start=first_chunk):
         if records:
-            col.insert_many(records, ordered=False)
+            with instrumentation.timed("ingest", "insert", len(records)):
+                write_records(col, records, chunk_no * CHUNK_SIZE)
             total += len(records)
             print(f"Inserted so far: {total:,}")
+        checkpoints.commit(chunk_no, len(records))
+
+    return total
+
+
+# --------------------------------------------------------------
+# PARALLEL INGESTION
+#   parse byte ranges in a process pool, write with a bounded
+#   number of insert_many threads fed through a bounded queue
+# --------------------------------------------------------------
+def ingest_parallel(col, checkpoints):
+    header, ranges = split_byte_ranges(CSV_PATH, RANGE_BYTES)
+    print(f"Split {CSV_PATH} into {len(ranges)} byte ranges "
+          f"({PARSE_WORKERS} parse workers, {WRITE_WORKERS} writers)")
+
+    done = checkpoints.committed()
+    todo = [(i, start, end) for i, (start, end) in enumerate(ranges) if i not in done]
+    already = sum(d["rows"] for d in done.values())
+    if done:
+        print(f"Resuming: {len(done)} ranges ({already:,} rows) already committed, {len(todo)} left")
+
+    # Small queue = backpressure: parsing pauses when writers fall behind
+    write_queue = queue.Queue(maxsize=WRITE_WORKERS * 2)
+    lock = threading.Lock()
+    stats = {"total": already, "parse_s": 0.0, "write_s": 0.0, "queue_wait_s": 0.0}
+    errors = []
+
+    # a range is committed once every one of its sub-batches has been written
+    remaining = {}
+    range_rows = {}
+
+    def writer():
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            range_no, first_row, records = item
+            try:
+                t0 = time.perf_counter()
+                write_records(col, records, first_row)
+                elapsed = time.perf_counter() - t0
+            except Exception as e:  # keep draining so the producer never blocks forever
+                errors.append(e)
+                continue
+            instrumentation.record("ingest", "insert", elapsed, len(records))
+            with lock:
+                stats["write_s"] += elapsed
+                stats["total"] += len(records)
+                print(f"Inserted so far: {stats['total']:,}")
+                remaining[range_no] -= 1
+                range_done = remaining[range_no] == 0
+            if range_done:
+                start, end = ranges[range_no]
+                checkpoints.commit(range_no, range_rows[range_no], start, end)
+
+    writers = [threading.Thread(target=writer, daemon=True) for _ in range(WRITE_WORKERS)]
+    for t in writers:
+        t.start()
+
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        # only keep a limited number of ranges parsed ahead of the writers
+        max_in_flight = PARSE_WORKERS * 2
+        pending = []
+        next_range = 0
+
+        while next_range < len(todo) or pending:
+            while next_range < len(todo) and len(pending) < max_in_flight:
+                range_no, start, end = todo[next_range]
+                future = pool.submit(parse_byte_range, CSV_PATH, header, start, end, CSV_PARSER)
+                pending.append((range_no, future))
+                next_range += 1
+
+            range_no, future = pending.pop(0)
+            records, parse_s = future.result()
+            stats["parse_s"] += parse_s
+            instrumentation.record("ingest", "parse", parse_s, len(records))   # timed inside the worker
+
+            batches = [records[i:i + CHUNK_SIZE] for i in range(0, len(records), CHUNK_SIZE)]
+            with lock:
+                remaining[range_no] = len(batches)
+                range_rows[range_no] = len(records)
+            if not batches:
+                start, end = ranges[range_no]
+                checkpoints.commit(range_no, 0, start, end)
+
+            # ranges are taken in file order, so every earlier range has been parsed or committed
+            range_first_row = sum(range_rows[k] if k in range_rows else done[k]["rows"] for k in range(range_no))
+            for i, batch in enumerate(batches):
+                t0 = time.perf_counter()
+                write_queue.put((range_no, range_first_row + i * CHUNK_SIZE, batch))
+                waited = time.perf_counter() - t0
+                stats["queue_wait_s"] += waited
+                instrumentation.record("ingest", "queue_wait", waited, len(batch))
+
+    for _ in writers:
+        write_queue.put(None)
+    for t in writers:
+        t.join()
+
+    if errors:
+        raise errors[0]
+
+    print("\n--- PARALLEL INGESTION TIMING ---")
+    print(f"Parse time (summed over workers):   {stats['parse_s']:.1f}s")
+    print(f"Write time (summed over writers):   {stats['write_s']:.1f}s")
+    print(f"Producer blocked on full queue:     {stats['queue_wait_s']:.1f}s")
+
+    return stats["total"]
+
+
+# parallel mode inserts from writer threads, which cProfile would not see
+@instrumentation.stage("ingest", threaded=INGEST_MODE == "parallel")
+def main():
+    # the writer threads share the client's pool (MAX_POOL_SIZE, see pipeline/config.py)
+    get_client().admin.command("ping")
+    print(f"Connected to {backend_label()}")
+
+    db = get_db("ingest")
+    col = db[COL_NAME]
+
+    if IDEMPOTENT_WRITES:
+        check_row_ids(col)
+    checkpoints = Checkpoints(db, checkpoint_run_key(INGEST_MODE))
+
+    start = time.perf_counter()
+
+    if INGEST_MODE == "parallel":
+        total = ingest_parallel(col, checkpoints)
+    else:
+        total = ingest_sequential(col, checkpoints)
+
+    elapsed = time.perf_counter() - start
 
     print(f"Ingestion Succesful. Total inserted: {total:,}")
-    print(f"Collection: {DB_NAME}.{COL_NAME}")
+    print(f"Collection: {db.name}.{COL_NAME}")
+    print(f"Mode: {INGEST_MODE} | Parser: {CSV_PARSER} | Elapsed: {elapsed:.1f}s | "
+          f"Throughput: {total / elapsed if elapsed else 0:,.0f} rows/sec")
 
 if __name__ == "__main__":
     main()
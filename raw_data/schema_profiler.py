@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import multiprocessing
+from datetime import datetime, timezone
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # repo root, for pipeline/
+from pipeline.storage import get_client, get_db, backend_label, require_shared_storage
+
+# --------------------------------------------------------------
+# FULL-COLLECTION SCHEMA PROFILER
+#   db_row_count_schema.py only looks at SAMPLE_SIZE documents.
+#   This profiles every document with constant memory:
+#     server - one $objectToArray/$type/$group pipeline in MongoDB
+#              (type histogram, nulls, min/max; no distinct counts)
+#     stream - worker processes scan _id ranges and keep per-field
+#              type counts, min/max and a HyperLogLog sketch
+#   MAX_ROWS / MAX_SECONDS bound the run; the output says whether
+#   the profile is complete or sampled. In server mode a pipeline
+#   that runs past MAX_SECONDS is retried on a $sample of
+#   FALLBACK_SAMPLE documents.
+# --------------------------------------------------------------
+COL_NAME = os.getenv("COL_NAME", "accidents_raw")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "stream")
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 2)))
+MAX_ROWS = int(os.getenv("MAX_ROWS", "0"))          # 0 = no row budget
+MAX_SECONDS = float(os.getenv("MAX_SECONDS", "0"))  # 0 = no time budget
+FALLBACK_SAMPLE = int(os.getenv("FALLBACK_SAMPLE", "50000"))  # server mode, after a timeout
+OUTPUT_PATH = os.getenv("OUTPUT_PATH", "schema_profile.json")
+BATCH_SIZE = 5000
+HLL_PRECISION = 12   # 4096 registers, ~1.6% standard error
+
+
+# --------------------------------------------------------------
+# HYPERLOGLOG (approximate distinct count, mergeable)
+# --------------------------------------------------------------
+class HyperLogLog:
+    def __init__(self, p=HLL_PRECISION):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        key = f"{type(value).__name__}:{value}".encode()
+        h = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            return round(self.m * math.log(self.m / zeros))   # linear counting for small sets
+        return round(raw)
+
+
+# --------------------------------------------------------------
+# PER-FIELD PROFILE
+# --------------------------------------------------------------
+def _type_name(v):
+    if v is None:
+        return "None"
+    return type(v).__name__
+
+
+def _range_kind(v):
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return None if isinstance(v, float) and math.isnan(v) else "number"
+    if isinstance(v, str):
+        return "string"
+    if isinstance(v, datetime):
+        return "datetime"
+    return None
+
+
+class FieldProfile:
+    def __init__(self):
+        self.types = Counter()
+        self.minmax = {}
+        self.hll = HyperLogLog()
+
+    def add(self, v):
+        self.types[_type_name(v)] += 1
+        if v is None:
+            return
+        kind = _range_kind(v)
+        if kind:
+            low, high = self.minmax.get(kind, (v, v))
+            self.minmax[kind] = (min(low, v), max(high, v))
+        self.hll.add(v)
+
+    def merge(self, other):
+        self.types.update(other.types)
+        for kind, (low, high) in other.minmax.items():
+            mine = self.minmax.get(kind, (low, high))
+            self.minmax[kind] = (min(mine[0], low), max(mine[1], high))
+        self.hll.merge(other.hll)
+
+
+# --------------------------------------------------------------
+# STREAM MODE
+# --------------------------------------------------------------
+# Split the collection into _id ranges by ObjectId timestamp, or
+# by value for the CSV row numbers ingest_accidents.py stores.
+# Much cheaper than $bucketAuto (no full sort) and close enough
+# to even because ingestion writes at a steady rate.
+def id_ranges(col, n):
+    first = col.find_one({}, {"_id": 1}, sort=[("_id", 1)])
+    last = col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if first is None:
+        return []
+    if n <= 1 or type(first["_id"]) is not type(last["_id"]):
+        return [{}]
+
+    if isinstance(first["_id"], int):
+        step = (last["_id"] + 1 - first["_id"]) / n
+        cuts = sorted({first["_id"] + int(i * step) for i in range(1, n)} - {first["_id"]})
+    elif isinstance(first["_id"], ObjectId):
+        t0 = first["_id"].generation_time.timestamp()
+        t1 = last["_id"].generation_time.timestamp() + 1
+        step = (t1 - t0) / n
+        cuts = [ObjectId.from_datetime(datetime.fromtimestamp(t0 + i * step, tz=timezone.utc)) for i in range(1, n)]
+    else:
+        return [{}]
+
+    bounds = [first["_id"]] + cuts
+    ranges = []
+    for i, low in enumerate(bounds):
+        query = {"$gte": low}
+        if i + 1 < len(bounds):
+            query["$lt"] = bounds[i + 1]
+        ranges.append({"_id": query})
+    return ranges
+
+
+def profile_range(query, max_rows, deadline):
+    col = get_db()[COL_NAME]
+
+    fields = {}
+    rows = 0
+    stopped = False
+
+    for doc in col.find(query, {"_id": 0}).batch_size(BATCH_SIZE):
+        for k, v in doc.items():
+            if k not in fields:
+                fields[k] = FieldProfile()
+            fields[k].add(v)
+        rows += 1
+
+        if (max_rows and rows >= max_rows) or (deadline and rows % 1000 == 0 and time.time() > deadline):
+            stopped = True
+            break
+
+    return rows, stopped, fields
+
+
+def run_stream(col):
+    require_shared_storage("PROFILE_MODE=stream")
+    ranges = id_ranges(col, WORKERS)
+    deadline = time.time() + MAX_SECONDS if MAX_SECONDS else 0
+    per_worker_rows = math.ceil(MAX_ROWS / max(len(ranges), 1)) if MAX_ROWS else 0
+
+    fields = {}
+    rows = 0
+    stopped = False
+
+    with ProcessPoolExecutor(max_workers=max(WORKERS, 1), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(profile_range, q, per_worker_rows, deadline) for q in ranges]
+        for future in futures:
+            part_rows, part_stopped, part_fields = future.result()
+            rows += part_rows
+            stopped = stopped or part_stopped
+            for k, profile in part_fields.items():
+                if k in fields:
+                    fields[k].merge(profile)
+                else:
+                    fields[k] = profile
+
+    report = {}
+    for k, profile in fields.items():
+        present = sum(profile.types.values())
+        report[k] = {
+            "types": dict(profile.types),
+            "missing": rows - present,
+            "null_rate": (profile.types.get("None", 0) + rows - present) / rows if rows else 0,
+            "min_max": {kind: [low, high] for kind, (low, high) in profile.minmax.items()},
+            "approx_distinct": profile.hll.estimate(),
+        }
+    return rows, stopped, report
+
+
+# --------------------------------------------------------------
+# SERVER MODE
+# --------------------------------------------------------------
+def server_pipeline(head):
+    return head + [
+        {"$project": {"_id": 0, "kv": {"$objectToArray": "$$ROOT"}}},
+        {"$unwind": "$kv"},
+        {"$group": {
+            "_id": {"field": "$kv.k", "type": {"$type": "$kv.v"}},
+            "count": {"$sum": 1},
+            "min": {"$min": "$kv.v"},
+            "max": {"$max": "$kv.v"},
+        }},
+    ]
+
+
+def run_server(col):
+    from pymongo.errors import ExecutionTimeout
+
+    total = col.estimated_document_count()
+    head = [{"$limit": MAX_ROWS}] if MAX_ROWS else []
+    options = {"allowDiskUse": True}
+    if MAX_SECONDS:
+        options["maxTimeMS"] = int(MAX_SECONDS * 1000)
+
+    try:
+        groups = list(col.aggregate(server_pipeline(head), **options))
+        rows = col.count_documents({}, limit=MAX_ROWS) if MAX_ROWS else col.count_documents({})
+        stopped = bool(MAX_ROWS) and rows < total
+    except ExecutionTimeout:
+        # out of time: profile a random sample instead ($sample reads a random cursor, not the whole collection)
+        size = min(FALLBACK_SAMPLE, MAX_ROWS or FALLBACK_SAMPLE)
+        print(f"Pipeline ran past MAX_SECONDS={MAX_SECONDS:g}; profiling a $sample of {size:,} documents instead")
+        groups = list(col.aggregate(server_pipeline([{"$sample": {"size": size}}]), allowDiskUse=True))
+        rows = min(size, total)
+        stopped = True
+
+    report = {}
+    for g in groups:
+        field = report.setdefault(g["_id"]["field"], {"types": {}, "min_max": {}, "approx_distinct": None})
+        bson_type = g["_id"]["type"]
+        field["types"][bson_type] = g["count"]
+        if bson_type not in {"null", "bool"}:
+            field["min_max"][bson_type] = [g["min"], g["max"]]
+
+    for field in report.values():
+        present = sum(field["types"].values())
+        field["missing"] = rows - present
+        field["null_rate"] = (field["types"].get("null", 0) + rows - present) / rows if rows else 0
+
+    return rows, stopped, report
+
+
+def main():
+    get_client().admin.command("ping")
+    col = get_db()[COL_NAME]
+    print(f"Profiling {col.full_name} on {backend_label()} (mode={PROFILE_MODE})")
+
+    start = time.perf_counter()
+    if PROFILE_MODE == "server":
+        rows, stopped, report = run_server(col)
+    else:
+        rows, stopped, report = run_stream(col)
+    elapsed = time.perf_counter() - start
+
+    total = col.estimated_document_count()
+    sampled = stopped or rows < total
+    coverage = f"sampled ({rows:,} of ~{total:,} documents)" if sampled else "complete"
+
+    print(f"\n--- SCHEMA PROFILE ({coverage}) ---")
+    for field in sorted(report):
+        info = report[field]
+        types_seen = ", ".join(f"{t}={n:,}" for t, n in sorted(info["types"].items()))
+        distinct = info["approx_distinct"]
+        print(f"{field}: {types_seen} | null rate {info['null_rate']:.2%}"
+              + (f" | ~{distinct:,} distinct" if distinct is not None else ""))
+
+    with open(OUTPUT_PATH, "w") as f:
+        json.dump({"collection": col.full_name, "mode": PROFILE_MODE, "coverage": coverage,
+                   "sampled": sampled, "rows_profiled": rows, "seconds": round(elapsed, 2), "fields": report},
+                  f, indent=2, default=str)
+
+    print(f"\nProfiled {rows:,} documents in {elapsed:.1f}s. Full profile written to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
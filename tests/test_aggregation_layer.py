@@ -1,18 +1,11 @@
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from pipeline.storage import get_db
 
 
 def test_aggregated_layer_has_expected_fields():
     """
     Test 3: Proves the GOLD layer exists and documents have the expected fields
     """
-    load_dotenv()
-    uri = os.getenv("MONGO_URI")
-    assert uri is not None and uri != "", "MONGO_URI missing."
-
-    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
-    db = client["bigdata_capstone"]
+    db = get_db()
     agg = db["accidents_aggregated"]
 
     doc = agg.find_one({})
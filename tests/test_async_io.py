@@ -0,0 +1,212 @@
+import time
+import socket
+import asyncio
+import threading
+from itertools import islice
+import pytest
+from pipeline.async_io import InFlight, prefetched_batches
+from pipeline.latency_proxy import LatencyProxy
+
+
+class ListCursor:
+    """Just enough of an AsyncCursor: to_list(n) hands out the next n documents."""
+
+    def __init__(self, docs, delay_s):
+        self.docs = list(docs)
+        self.delay_s = delay_s
+        self.reads = 0
+
+    async def to_list(self, length):
+        await asyncio.sleep(self.delay_s)
+        self.reads += 1
+        batch, self.docs = self.docs[:length], self.docs[length:]
+        return batch
+
+
+def test_prefetch_and_in_flight_overlap_io_with_work():
+    """
+    Test 18: Proves prefetched_batches reads ahead of the consumer and InFlight keeps
+    several awaitables running while handing results back in submission order.
+    """
+    async def scenario():
+        cursor = ListCursor(range(10), delay_s=0.05)
+        windows = InFlight(3)
+        seen, finished = [], []
+
+        async def slow_write(batch):
+            await asyncio.sleep(0.05 if batch[0] == 0 else 0.01)   # the first write finishes last
+            return sum(batch)
+
+        start = time.perf_counter()
+        async for batch in prefetched_batches(cursor, 3, depth=2):
+            seen.append(batch)
+            await asyncio.sleep(0.05)   # "transform" while the next batch is read
+            finished += await windows.submit(slow_write(batch), tag=len(seen))
+        finished += await windows.drain()
+        return seen, finished, time.perf_counter() - start
+
+    seen, finished, elapsed = asyncio.run(scenario())
+    assert seen == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert finished == [(1, 3), (2, 12), (3, 21), (4, 9)]
+    # 5 reads + 4 transforms of 50ms each would take 0.45s back to back
+    assert elapsed < 0.4
+
+
+def test_latency_proxy_adds_round_trip_delay():
+    """
+    Test 19: Proves latency_proxy.py forwards bytes unchanged and adds about
+    LATENCY_MS to every request/response round trip.
+    """
+    async def echo(reader, writer):
+        while data := await reader.read(1024):
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    async def serve(ready, stop):
+        server = await asyncio.start_server(echo, "127.0.0.1", 0)
+        ready.append(server.sockets[0].getsockname()[1])
+        async with server:
+            while not stop:
+                await asyncio.sleep(0.01)
+
+    ready, stop = [], []
+    thread = threading.Thread(target=lambda: asyncio.run(serve(ready, stop)), daemon=True)
+    thread.start()
+    while not ready:
+        time.sleep(0.01)
+
+    proxy = LatencyProxy(latency_ms=60, target_host="127.0.0.1", target_port=ready[0], listen_port=0)
+    port = proxy.start()
+    try:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            for message in [b"hello", b"mongo" * 1000]:
+                start = time.perf_counter()
+                sock.sendall(message)
+                received = b""
+                while len(received) < len(message):
+                    received += sock.recv(65536)
+                elapsed = time.perf_counter() - start
+                assert received == message
+                assert 0.055 <= elapsed < 0.5
+        assert proxy.connections == 1
+    finally:
+        proxy.stop()
+        stop.append(True)
+        thread.join(timeout=5)
+
+
+# --------------------------------------------------------------
+# A THIN ASYNC FRONT ON MONGOMOCK
+#   just the AsyncMongoClient calls clean_async and
+#   validate_async make, each one answered synchronously
+# --------------------------------------------------------------
+class AsyncMockCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length):
+        await asyncio.sleep(0)
+        return list(islice(self.cursor, length))
+
+
+class AsyncMockCollection:
+    def __init__(self, col):
+        self.col = col
+
+    def find(self, *args, **kwargs):
+        return AsyncMockCursor(self.col.find(*args, **kwargs))
+
+    async def insert_many(self, docs, **kwargs):
+        await asyncio.sleep(0)
+        return self.col.insert_many(docs, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return self.col.update_one(*args, **kwargs)
+
+
+class AsyncMockClient:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return AsyncMockCollection(self.db[name])
+
+    async def close(self):
+        pass
+
+
+def test_async_cleaning_and_validation_match_sync(tmp_path, monkeypatch):
+    """
+    Test 28: Proves IO_MODE=async cleaning and validation give the same accidents_clean and
+    summary as the sync path, and that a MAX_RECORDS stop mid-batch leaves the silver
+    watermark on the raw document that hit the limit, so an incremental run finishes the rest
+    (with one write in flight under the index backend).
+    """
+    pytest.importorskip("mongomock")
+    from pipeline import storage, run_local
+    from pipeline.synthetic_accidents import write_synthetic_csv
+    from validate_accidents_schema import validate_cursor, validate_async
+    from validation_report import ValidationSummary
+    import ingest_accidents
+    import silver_cleaning
+    import validate_accidents_schema
+
+    csv_path = tmp_path / "synthetic.csv"
+    write_synthetic_csv(str(csv_path), 300, seed=28)
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+    run_local.run(["ingest", "silver"])
+    db = storage.get_db()
+    clean = db["accidents_clean"]
+    sync_docs = list(clean.find({}, {"_id": 0}).sort("ID", 1))
+    sync_summary = validate_cursor(clean.find({}, {"_id": 0}), ValidationSummary("rules"))
+
+    for module in [silver_cleaning, validate_accidents_schema]:
+        monkeypatch.setattr(module, "async_client", lambda: AsyncMockClient(db))
+        monkeypatch.setattr(module, "async_db", lambda client, stage=None: client)
+        monkeypatch.setattr(module, "BATCH_SIZE", 64)
+    monkeypatch.setattr(silver_cleaning, "IO_MODE", "async")
+    monkeypatch.setattr(silver_cleaning, "MAX_RECORDS", 0)
+
+    run_local.run_stage("silver")
+    assert list(clean.find({}, {"_id": 0}).sort("ID", 1)) == sync_docs
+    summary = asyncio.run(validate_async(ValidationSummary("rules")))
+    assert (summary.processed, summary.valid, summary.rule_failures) == \
+        (sync_summary.processed, sync_summary.valid, sync_summary.rule_failures)
+
+    # stop at 100 documents, in the middle of the second 64-document batch
+    monkeypatch.setattr(silver_cleaning, "MAX_RECORDS", 100)
+    run_local.run_stage("silver")
+    assert clean.count_documents({}) == 100
+    seen = set()
+    for raw in db["accidents_raw"].find({}, {"ID": 1}).sort("_id", 1):
+        seen.add(raw["ID"])
+        if len(seen) == 100:
+            break
+    assert silver_cleaning.get_watermark(db, "silver") == raw["_id"] < 127
+
+    # with the index backend the unique index settles duplicates, so only one write is in flight
+    limits = []
+
+    class RecordedInFlight(InFlight):
+        def __init__(self, limit):
+            limits.append(limit)
+            super().__init__(limit)
+
+    monkeypatch.setattr(silver_cleaning.async_io, "InFlight", RecordedInFlight)
+    monkeypatch.setattr(silver_cleaning, "MAX_RECORDS", 0)
+    monkeypatch.setattr(silver_cleaning, "RUN_MODE", "incremental")
+    monkeypatch.setattr(silver_cleaning, "DEDUP_BACKEND", "index")
+    run_local.run_stage("silver")
+    assert list(clean.find({}, {"_id": 0}).sort("ID", 1)) == sync_docs
+    assert limits[-1] == 1
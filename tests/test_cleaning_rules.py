@@ -0,0 +1,28 @@
+import copy
+from datetime import datetime
+from cleaning_rules import clean_document, clean_batch
+
+
+def test_batch_cleaning_matches_row_cleaning():
+    """
+    Test 5: Proves vectorized batch cleaning produces the same documents as per-row cleaning
+    """
+    raw_docs = [
+        {"_id": 1, "ID": "A-1", "Severity": 2, "City": "  Dayton ", "State": "n/a",
+         "Start_Time": "2016-02-08 05:46:00", "End_Time": "2016-02-08 06:46:00.000000000",
+         "Weather_Timestamp": float("nan"), "Distance(mi)": float("nan"), "Zipcode": 45424},
+        {"_id": 2, "ID": "A-2", "City": "unknown", "Street": "",
+         "Start_Time": "Feb 8 2016 10am", "End_Time": datetime(2020, 1, 1),
+         "Weather_Timestamp": "garbage"},
+        {"_id": 3, "ID": "A-3", "Severity": 3, "Start_Time": None, "Traffic_Signal": True},
+    ]
+
+    expected = [clean_document(copy.deepcopy(doc)) for doc in raw_docs]
+    actual = clean_batch(copy.deepcopy(raw_docs))
+
+    assert actual == expected
+    assert actual[0]["City"] == "Dayton"
+    assert actual[0]["State"] is None
+    assert actual[0]["Distance(mi)"] is None
+    assert actual[1]["Weather_Timestamp"] is None
+    assert "Severity" not in actual[1]
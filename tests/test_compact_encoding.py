@@ -0,0 +1,72 @@
+import bson
+import pytest
+
+pytest.importorskip("mongomock")
+
+from pipeline import storage, run_local, compact_encoding
+from pipeline.synthetic_accidents import write_synthetic_csv
+from validate_accidents_schema import validate_cursor
+from validation_report import ValidationSummary
+from query_modeling import INDEX_PLAN
+import ingest_accidents
+
+
+def test_compact_silver_encoding_round_trips_and_keeps_gold(tmp_path, monkeypatch):
+    """
+    Test 20: Proves SILVER_FORMAT=compact (short aliases, POI bitmask, enum codes,
+    no nulls) stores smaller documents that decode back exactly, and that gold and
+    schema validation give the same results as the wide format.
+    """
+    csv_path = tmp_path / "synthetic.csv"
+    write_synthetic_csv(str(csv_path), 300, seed=20)
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+
+    run_local.run(["ingest", "silver", "gold"])
+    db = storage.get_db()
+    fields = {"_id": 0, "State": 1, "Severity": 1, "accident_count": 1, "distance_n": 1,
+              "avg_distance": 1, "avg_temperature": 1, "temperature_n": 1}
+    order = [("State", 1), ("Severity", 1)]
+    wide_gold = list(db["accidents_aggregated"].find({}, fields).sort(order))
+    wide_docs = list(db["accidents_clean"].find({}, {"_id": 0}).sort("_id", 1))
+    wide_summary = validate_cursor(db["accidents_clean"].find({}, {"_id": 0}), ValidationSummary("rules"))
+    assert compact_encoding.stored_format(db) == {"format": "wide", "layout": "collection"}
+
+    monkeypatch.setattr(compact_encoding, "SILVER_FORMAT", "compact")
+    run_local.run_stage("silver")
+    run_local.run_stage("gold")
+    assert compact_encoding.stored_format(db) == {"format": "compact", "layout": "collection"}
+
+    stored = list(db["accidents_clean"].find({}, {"_id": 0}).sort("_id", 1))
+    assert len(stored) == len(wide_docs)
+    assert "Weather_Timestamp" not in stored[0] and isinstance(stored[0]["wx"], int)
+    decoder = compact_encoding.decoder_for(db)
+    assert decoder.decode_batch(stored) == wide_docs
+    assert sum(map(len, map(bson.encode, stored))) < 0.6 * sum(map(len, map(bson.encode, wide_docs)))
+
+    # gold reads the aliased fields in MongoDB, validation decodes first
+    assert list(db["accidents_aggregated"].find({}, fields).sort(order)) == pytest.approx(wide_gold)
+    summary = validate_cursor(db["accidents_clean"].find({}, {"_id": 0}), ValidationSummary("rules"),
+                              decoder=decoder)
+    assert (summary.processed, summary.valid, summary.invalid) == \
+        (wide_summary.processed, wide_summary.valid, wide_summary.invalid)
+    assert summary.rule_failures == wide_summary.rule_failures
+
+    # POI flags: True/False/None survive the bitmask; a non-string enum value is never taken for a code
+    codes = compact_encoding.EnumCodes(db)
+    doc = {"ID": "A-x", "Bump": True, "Stop": False, "Junction": None, "Weather_Condition": 7, "Source": "Source2"}
+    encoded = compact_encoding.encode(doc, codes)
+    assert encoded["poi"] == compact_encoding.POI_BITS["Bump"]
+    assert encoded["Weather_Condition"] == 7 and encoded["src"] == codes.code("Source", "Source2")
+    decoded = decoder.decode(encoded)
+    assert (decoded["Bump"], decoded["Stop"], decoded["Junction"], decoded["Amenity"]) == (True, False, None, None)
+    assert decoded["Weather_Condition"] == 7 and decoded["Source"] == "Source2"
+
+    # wide-only readers refuse, the index plan follows the aliases
+    with pytest.raises(ValueError):
+        compact_encoding.require_wide(db, "cube_builder.py")
+    specs = compact_encoding.stored_index_specs(INDEX_PLAN["accidents_clean"], compact_encoding.stored_format(db))
+    assert [s["keys"][0][0] for s in specs] == ["ID", "st", "t"]
+    assert specs[2]["partialFilterExpression"] == {"t": {"$type": "date"}}
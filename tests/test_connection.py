@@ -1,16 +1,10 @@
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from pipeline.storage import get_client
 
 
 def test_mongo_connection_ping():
     """
-    Test 1: Proves we can connect to MongoDB Atlas using MONGO_URI
+    Test 1: Proves we can connect to STORAGE_BACKEND (MongoDB Atlas using MONGO_URI by default)
     """
-    load_dotenv()
-    uri = os.getenv("MONGO_URI")
-    assert uri is not None and uri != "", "MONGO_URI missing."
-
-    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    client = get_client()
     # If ping fails, pytest will fail
     client.admin.command("ping")
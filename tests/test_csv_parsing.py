@@ -0,0 +1,23 @@
+from csv_parsing import ACCIDENT_COLUMNS, parse_typed
+
+
+def test_typed_parser_keeps_types_and_nulls():
+    """
+    Test 4: Proves the typed pyarrow parser follows the declared column types and stores blanks as None (not NaN)
+    """
+    data = (
+        b"ID,Severity,Start_Time,Distance(mi),City,Zipcode,Traffic_Signal\n"
+        b"A-1,2,2016-02-08 05:46:00,0.01,Dayton,45424,False\n"
+        b"A-2,3,2016-02-08 06:07:59,,,45424-1234,True\n"
+    )
+    records = parse_typed(data)
+
+    assert len(ACCIDENT_COLUMNS) == 46
+    assert records[0] == {
+        "ID": "A-1", "Severity": 2, "Start_Time": "2016-02-08 05:46:00",
+        "Distance(mi)": 0.01, "City": "Dayton", "Zipcode": "45424", "Traffic_Signal": False,
+    }
+    assert records[1]["Distance(mi)"] is None
+    assert records[1]["City"] is None
+    assert records[1]["Zipcode"] == "45424-1234"
+    assert records[1]["Traffic_Signal"] is True
@@ -0,0 +1,52 @@
+from datetime import datetime
+import pytest
+
+
+def test_cube_rollups_match_a_direct_group_by(monkeypatch):
+    """
+    Test 31: Proves a cube built in facet mode, re-aggregated at a coarser grain with rollup_pipeline,
+    gives the same counts and averages as grouping accidents_clean directly, and is indexed on its dims.
+    """
+    pytest.importorskip("mongomock")
+    from pipeline import storage, config
+    import cube_builder
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    storage.get_client().drop_database(config.DB_NAME)
+    db = storage.get_db()
+
+    name = "accidents_cube_state_severity_month"
+    monkeypatch.setattr(cube_builder, "ROLLUPS", {name: cube_builder.ROLLUPS[name]})
+    monkeypatch.setattr(cube_builder, "CUBE_MODE", "facet")
+
+    docs = []
+    for i in range(200):
+        docs.append({
+            "ID": f"A-{i}",
+            "State": ["CA", "TX", "OH"][i % 3],
+            "Severity": 1 + i % 4,
+            "Start_Time": datetime(2020 + i % 2, 1 + i % 12, 1 + i % 28, i % 24),
+            "Distance(mi)": None if i % 7 == 0 else i / 10,      # nulls must not count towards the average
+            "Temperature(F)": None if i % 5 == 0 else 30 + i % 50,
+        })
+    db["accidents_clean"].insert_many(docs)
+
+    cube_builder.main()
+    assert f"idx_{name}_dims" in db[name].index_information()
+
+    for keep in [["State"], ["State", "year"]]:
+        key = {dim: f"${dim}" if dim != "year" else {"$year": "$Start_Time"} for dim in keep}
+        direct = {tuple(d["_id"].values()): d for d in db["accidents_clean"].aggregate([
+            {"$group": {"_id": key, "accident_count": {"$sum": 1},
+                        "avg_distance": {"$avg": "$Distance(mi)"},
+                        "avg_temperature": {"$avg": "$Temperature(F)"}}},
+        ])}
+        rolled = {tuple(d["_id"].values()): d for d in db[name].aggregate(cube_builder.rollup_pipeline(keep))}
+
+        assert rolled.keys() == direct.keys()
+        for group, want in direct.items():
+            got = rolled[group]
+            assert got["accident_count"] == want["accident_count"]
+            assert got["avg_distance"] == pytest.approx(want["avg_distance"])
+            assert got["avg_temperature"] == pytest.approx(want["avg_temperature"])
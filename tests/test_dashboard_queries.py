@@ -0,0 +1,21 @@
+from dashboard_queries import build_filter, month_range_pipeline, query_aggregated, query_distributions
+from query_modeling import DASHBOARD_PROJECTION, INDEX_PLAN
+
+
+def test_dashboard_filters_are_pushed_into_mongo_queries():
+    """
+    Test 10: Proves the dashboard sends its sidebar filters to MongoDB and the plain query fits the covering index
+    """
+    assert build_filter(("CA", "TX"), (2, 3)) == {"State": {"$in": ["CA", "TX"]}, "Severity": {"$in": [2, 3]}}
+
+    # every projected field is in the covering index, so no documents are fetched
+    covering = dict(INDEX_PLAN["accidents_aggregated"][0]["keys"])
+    assert {f for f, keep in DASHBOARD_PROJECTION.items() if keep} <= set(covering)
+
+    match = month_range_pipeline(("CA",), (2,), 202101, 202106)[0]["$match"]
+    assert match["State"] == {"$in": ["CA"]} and match["Severity"] == {"$in": [2]}
+    assert "$expr" in match
+
+    # an empty selection never reaches the database
+    assert query_aggregated(None, (), (2,)) == []
+    assert query_distributions(None, ("CA",), ()) == []
@@ -0,0 +1,95 @@
+import pytest
+from dedup_backends import SetDedup, BitmapDedup, BloomDedup
+
+
+def test_dedup_backends_agree_with_set():
+    """
+    Test 6: Proves the bitmap and Bloom filter backends flag exactly the same duplicates as a Python set,
+    within a batch and across batches, where the Bloom backend has to confirm a hit against stored IDs
+    """
+    batches = [["A-1", "A-2", "A-1", "A-900000"], ["B-7", "A-2", "B-7", "A-3"], ["A-900000", "A-4"]]
+    expected = [[False, False, True, False], [False, True, True, False], [True, False]]
+
+    for make in [SetDedup, BitmapDedup, lambda: BloomDedup(stored.__contains__, expected_items=100)]:
+        stored = set()
+        backend = make()
+        for batch, want in zip(batches, expected):
+            flags = [backend.seen(accident_id) for accident_id in batch]
+            assert flags == want, backend.name
+            # what silver_cleaning does after each insert_many
+            stored.update(accident_id for accident_id, flag in zip(batch, flags) if not flag)
+            backend.flushed()
+
+    # A-2 and A-900000 were repeated after a flush, so only the stored set could confirm them
+    assert backend.pending == set()
+    assert backend.confirm_queries >= 2
+
+
+def test_bloom_incremental_run_counts_earlier_ids_as_duplicates(monkeypatch, capsys):
+    """
+    Test 22: Proves an incremental silver run with the Bloom backend (empty filter) skips IDs
+    stored by an earlier run via the unique index instead of failing, and moves the watermark.
+    """
+    pytest.importorskip("mongomock")
+    from pipeline import storage, config
+    import silver_cleaning
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    storage.get_client().drop_database(config.DB_NAME)
+    db = storage.get_db()
+    raw = db["accidents_raw"]
+
+    def load(rows):
+        raw.insert_many([{"_id": row, "ID": accident_id, "Start_Time": "2021-01-01 08:00:00"}
+                         for row, accident_id in rows])
+
+    monkeypatch.setattr(silver_cleaning, "DEDUP_BACKEND", "bloom")
+    load([(i, f"A-{i}") for i in range(10)])
+    monkeypatch.setattr(silver_cleaning, "RUN_MODE", "full")
+    silver_cleaning.main()
+
+    load([(10, "A-3"), (11, "A-10"), (12, "A-11"), (13, "A-10"), (14, "A-12")])
+    monkeypatch.setattr(silver_cleaning, "RUN_MODE", "incremental")
+    capsys.readouterr()
+    silver_cleaning.main()
+
+    assert "Duplicates skipped: 2" in capsys.readouterr().out
+    assert sorted(d["ID"] for d in db["accidents_clean"].find({})) == sorted(f"A-{i}" for i in range(13))
+    assert db["pipeline_watermarks"].find_one({"_id": "silver"})["last_id"] == 14
+
+
+def test_parallel_partitions_keep_the_first_copy_whichever_writes_first(monkeypatch):
+    """
+    Test 29: Proves WORKERS>1 cleaning keeps the copy of a repeated ID with the lowest raw _id
+    even when the range holding a later copy is cleaned first, and refuses MAX_RECORDS.
+    """
+    pytest.importorskip("mongomock")
+    from pipeline import storage, config
+    from dedup_backends import ensure_clean_id_index
+    import silver_cleaning
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    storage.get_client().drop_database(config.DB_NAME)
+    db = storage.get_db()
+    ids = ["A-0", "A-1", "A-2", "A-3", "A-4", "A-5", "A-6", "A-1", "A-3", "A-1"]
+    db["accidents_raw"].insert_many([{"_id": row, "ID": accident_id, "Start_Lat": float(row)}
+                                     for row, accident_id in enumerate(ids)])
+    ensure_clean_id_index(db["accidents_clean"])
+
+    first_copy = silver_cleaning.first_copies(db["accidents_raw"], {})
+    assert first_copy == {"A-1": 1, "A-3": 3}
+
+    # the later range finishes first
+    late = silver_cleaning.clean_partition({"$gte": 5, "$lte": 9}, first_copy)
+    early = silver_cleaning.clean_partition({"$gte": 0, "$lt": 5}, first_copy)
+    assert (late["inserted"], late["duplicates"]) == (2, 3)
+    assert (early["inserted"], early["duplicates"]) == (5, 0)
+    kept = {d["ID"]: d["Start_Lat"] for d in db["accidents_clean"].find({})}
+    assert kept == {f"A-{i}": float(i) for i in range(7)}
+
+    monkeypatch.setattr(silver_cleaning, "WORKERS", 2)
+    monkeypatch.setattr(silver_cleaning, "MAX_RECORDS", 100)
+    with pytest.raises(ValueError, match="MAX_RECORDS"):
+        silver_cleaning.main()
@@ -0,0 +1,47 @@
+import random
+import pytest
+from geo_tiles import ZOOM_LEVELS, TILE_COL, cell_index, pick_zoom, viewport_query
+from dashboard_queries import query_tiles
+
+
+def test_geo_tile_levels_nest_and_viewport_picks_zoom():
+    """
+    Test 11: Proves every fine grid cell rolls up into exactly one coarser cell and the zoom follows the viewport size
+    """
+    rng = random.Random(3)
+    zooms = sorted(ZOOM_LEVELS, reverse=True)
+    for fine, coarse in zip(zooms, zooms[1:]):
+        ratio = ZOOM_LEVELS[coarse] / ZOOM_LEVELS[fine]
+        assert ratio == round(ratio)
+        for _ in range(1000):
+            lat, lng = rng.uniform(24, 50), rng.uniform(-125, -66)
+            row, col = cell_index(lat, lng, ZOOM_LEVELS[fine])
+            assert cell_index(lat, lng, ZOOM_LEVELS[coarse]) == (row // round(ratio), col // round(ratio))
+
+    # whole country -> coarse cells, one city -> finest cells
+    assert pick_zoom(24, -125, 50, -66) < pick_zoom(33.5, -118.7, 34.3, -117.6) == max(ZOOM_LEVELS)
+
+    query = viewport_query(2, 30, -100, 35, -95)
+    assert query == {"zoom": 2, "row": {"$gte": 480, "$lte": 500}, "col": {"$gte": 320, "$lte": 340}}
+
+
+def test_viewport_keeps_cells_along_its_edges():
+    """
+    Test 25: Proves the heatmap query keeps every cell that overlaps the viewport, including the
+    cells on its south edge (which a great-circle $geoWithin polygon leaves out) and the ones
+    it only partly covers, and nothing outside it.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient().db
+    size = ZOOM_LEVELS[1]
+    cells = []
+    for lat, lng in [(30.5, -97.5), (29.5, -97.5), (34.5, -99.5), (33.5, -94.5),   # south edge, partly in, inside, partly in
+                     (28.5, -97.5), (32.5, -93.5), (32.5, -97.5)]:               # out, out; zoom 2 (below)
+        row, col = cell_index(lat, lng, size)
+        cells.append({"zoom": 1, "row": row, "col": col, "location": {"type": "Point", "coordinates": [lng, lat]},
+                      "accident_count": 1, "avg_severity": 2.0, "severity_counts": {"2": 1}})
+    cells[-1]["zoom"] = 2
+    db[TILE_COL].insert_many(cells)
+
+    found = query_tiles(db, 1, 29.8, -100, 35, -94.2)
+    assert sorted((c["lat"], c["lng"]) for c in found) == [(29.5, -97.5), (30.5, -97.5), (33.5, -94.5), (34.5, -99.5)]
@@ -0,0 +1,100 @@
+import json
+import pstats
+import threading
+import pytest
+from pipeline import instrumentation
+
+
+def test_phase_timings_export_as_json_and_prometheus(tmp_path, monkeypatch):
+    """
+    Test 16: Proves the phase timers are free no-ops until METRICS_FORMAT is set,
+    then record per-batch calls/docs/seconds that export as JSON and Prometheus text.
+    """
+    monkeypatch.setattr(instrumentation, "METRICS_DIR", str(tmp_path))
+    instrumentation.reset()
+
+    # off: nothing recorded, nothing written
+    monkeypatch.setattr(instrumentation, "METRICS_FORMAT", "")
+    assert list(instrumentation.timed_cursor(iter(range(5)), "silver", 2)) == [0, 1, 2, 3, 4]
+    with instrumentation.timed("silver", "insert", 5):
+        pass
+    assert instrumentation.snapshot()["phases"] == []
+    assert instrumentation.export("silver") is None
+
+    monkeypatch.setattr(instrumentation, "METRICS_FORMAT", "json")
+    assert list(instrumentation.timed_cursor(iter(range(5)), "silver", 2)) == [0, 1, 2, 3, 4]
+    assert list(instrumentation.timed_batches(iter([[1, 2, 3], [4]]), "ingest", "parse")) == [[1, 2, 3], [4]]
+    for _ in range(3):
+        with instrumentation.timed("silver", "insert", 5):
+            pass
+
+    phases = {(p["stage"], p["phase"]): p for p in instrumentation.snapshot()["phases"]}
+    assert (phases[("silver", "fetch")]["calls"], phases[("silver", "fetch")]["docs"]) == (3, 5)
+    assert (phases[("ingest", "parse")]["calls"], phases[("ingest", "parse")]["docs"]) == (2, 4)
+    assert (phases[("silver", "insert")]["calls"], phases[("silver", "insert")]["docs"]) == (3, 15)
+    assert phases[("silver", "insert")]["max_seconds"] <= phases[("silver", "insert")]["seconds"]
+
+    path = instrumentation.export("silver")
+    assert path == str(tmp_path / "silver.json")
+    written = json.loads((tmp_path / "silver.json").read_text())
+    assert written["stage"] == "silver" and len(written["phases"]) == 3
+
+    monkeypatch.setattr(instrumentation, "METRICS_FORMAT", "prometheus")
+    instrumentation.export("silver")
+    prom = (tmp_path / "silver.prom").read_text().splitlines()
+    assert "# TYPE pipeline_phase_seconds_total counter" in prom
+    assert 'pipeline_phase_docs_total{stage="silver",phase="insert"} 15' in prom
+    instrumentation.reset()
+
+
+def test_stage_decorator_profiles_main(tmp_path, monkeypatch):
+    """
+    Test 17: Proves PROFILER wraps a stage's main() and leaves a pstats file
+    (cprofile) or collapsed stacks for a flamegraph (sample), and that cprofile is
+    refused for a stage that works in other threads.
+    """
+    monkeypatch.setattr(instrumentation, "METRICS_FORMAT", "")
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(instrumentation, "PROFILE_INTERVAL_MS", 1)
+
+    def busy_loop():
+        return sum(i * i for i in range(300_000))
+
+    @instrumentation.stage("demo")
+    def main():
+        return busy_loop()
+
+    monkeypatch.setattr(instrumentation, "PROFILER", "cprofile")
+    assert main() == busy_loop()
+    stats = pstats.Stats(str(tmp_path / "demo.prof"))
+    assert any(func[2] == "busy_loop" for func in stats.stats)
+
+    monkeypatch.setattr(instrumentation, "PROFILER", "sample")
+    main()
+    lines = (tmp_path / "demo.folded").read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_loop" in line for line in lines)
+
+    # cprofile cannot see a threaded stage's work, so it is refused; sample sees every thread
+    calls = []
+
+    @instrumentation.stage("threads", threaded=True)
+    def threaded_main():
+        worker = threading.Thread(target=lambda: calls.append(busy_loop()), name="stage-demo")
+        worker.start()
+        worker.join()
+
+    monkeypatch.setattr(instrumentation, "PROFILER", "cprofile")
+    with pytest.raises(ValueError, match="PROFILER=sample"):
+        threaded_main()
+    assert calls == []
+    monkeypatch.setattr(instrumentation, "PROFILER", "sample")
+    threaded_main()
+    assert any(line.startswith("stage-demo;") and "busy_loop" in line
+               for line in (tmp_path / "threads.folded").read_text().splitlines())
+
+    # other stages are left alone when PROFILE_STAGES names one
+    monkeypatch.setattr(instrumentation, "PROFILE_STAGES", ["silver"])
+    (tmp_path / "demo.folded").unlink()
+    main()
+    assert not (tmp_path / "demo.folded").exists()
@@ -0,0 +1,52 @@
+import json
+import pytest
+
+pytest.importorskip("mongomock")
+
+from pipeline import storage, run_local, orchestrator
+from pipeline.synthetic_accidents import write_synthetic_csv
+import ingest_accidents
+
+
+def test_streaming_run_matches_batch_pipeline(tmp_path, monkeypatch):
+    """
+    Test 15: Proves the streaming orchestrator (bounded queues between threads)
+    builds the same silver and gold layers as the batch-at-a-time scripts, and
+    reports per-stage and per-queue metrics.
+    """
+    csv_path = tmp_path / "synthetic.csv"
+    injected = write_synthetic_csv(str(csv_path), 400, seed=15)
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+    monkeypatch.setattr(orchestrator, "SUMMARY_PATH", str(tmp_path / "summary.json"))
+    monkeypatch.setattr(orchestrator, "STREAM_BATCH_SIZE", 64)
+    monkeypatch.setattr(orchestrator, "QUEUE_DEPTH", 1)
+
+    run_local.run(["ingest", "silver", "gold"])
+    db = storage.get_db()
+    fields = {"_id": 0, "State": 1, "Severity": 1, "accident_count": 1, "distance_n": 1,
+              "avg_distance": 1, "avg_temperature": 1}
+    batch_gold = list(db["accidents_aggregated"].find({}, fields).sort([("State", 1), ("Severity", 1)]))
+    batch_clean = db["accidents_clean"].count_documents({})
+
+    metrics = orchestrator.run_stream()
+
+    assert db["accidents_clean"].count_documents({}) == batch_clean == 400 - injected["duplicate_ids"]
+    stream_gold = list(db["accidents_aggregated"].find({}, fields).sort([("State", 1), ("Severity", 1)]))
+    assert len(stream_gold) == len(batch_gold)
+    for streamed, batched in zip(stream_gold, batch_gold):
+        assert streamed == pytest.approx(batched)
+
+    last_clean = db["accidents_clean"].find_one({}, sort=[("_id", -1)])["_id"]
+    assert db["pipeline_watermarks"].find_one({"_id": "gold"})["last_id"] == last_clean
+
+    stages = metrics["stages"]
+    assert list(stages) == ["ingest", "clean", "validate", "gold"]
+    assert stages["ingest"]["docs"] == 400 and stages["ingest"]["batches"] == 7
+    assert stages["validate"]["docs"] == stages["gold"]["docs"] == batch_clean
+    assert all(q["max_seen"] <= 1 for q in metrics["queues"].values())
+
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary["processed"] == batch_clean
@@ -0,0 +1,67 @@
+import os
+import re
+from datetime import datetime
+import pytest
+import parquet_mirror
+import aggregation
+
+
+def test_parquet_mirror_partitions_and_pushdown(tmp_path, monkeypatch):
+    """
+    Test 12: Proves the silver Parquet mirror is partitioned by State/year, filters prune correctly and gold matches
+    """
+    monkeypatch.setattr(parquet_mirror, "PARQUET_DIR", str(tmp_path))
+    docs = [
+        {"ID": f"A-{i}", "State": ["CA", "TX", None][i % 3], "Severity": i % 4 + 1,
+         "Start_Time": datetime(2019 + i % 2, 6, 1), "Distance(mi)": None if i % 5 == 0 else i / 10,
+         "Temperature(F)": 50.0 + i, "Zipcode": "45424"}
+        for i in range(200)
+    ]
+
+    batches = [parquet_mirror.clean_record_batch(docs[i:i + 64]) for i in range(0, len(docs), 64)]
+    parquet_mirror.write_layer("accidents_clean", batches, parquet_mirror.CLEAN_SCHEMA)
+    parquet_mirror.write_manifest("accidents_clean", rows=len(docs), last_id="65f1a2b3c4d5e6f708091a2b")
+
+    assert sorted(os.listdir(tmp_path / "accidents_clean" / "State=CA")) == ["year=2019", "year=2020"]
+
+    rows = parquet_mirror.read_layer("accidents_clean", columns=["ID", "Zipcode"],
+                                     filters={"State": "TX", "year": 2020}).to_pylist()
+    assert sorted(r["ID"] for r in rows) == sorted(
+        d["ID"] for d in docs if d["State"] == "TX" and d["Start_Time"].year == 2020)
+    assert all(r["Zipcode"] == "45424" for r in rows)
+
+    results, last_id = aggregation.parquet_gold_results()
+    assert str(last_id) == "65f1a2b3c4d5e6f708091a2b"
+    ca_1 = next(r for r in results if r["State"] == "CA" and r["Severity"] == 1)
+    group = [d for d in docs if d["State"] == "CA" and d["Severity"] == 1]
+    distances = [d["Distance(mi)"] for d in group if isinstance(d["Distance(mi)"], float)]
+    assert ca_1["accident_count"] == len(group)
+    assert ca_1["distance_n"] == len(distances)
+    assert abs(ca_1["avg_distance"] - sum(distances) / len(distances)) < 1e-9
+    assert all(r["State"] is not None for r in results)
+
+
+def test_parquet_export_refuses_values_that_do_not_fit(tmp_path, monkeypatch):
+    """
+    Test 26: Proves a silver value that does not fit the declared Arrow type fails the export
+    (instead of being nulled or stringified) and keeps the previous mirror, and that an empty
+    gold collection exports nothing instead of failing.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(parquet_mirror, "PARQUET_DIR", str(tmp_path))
+    db = mongomock.MongoClient().db
+    col = db["accidents_clean"]
+    col.insert_many([{"ID": f"A-{i}", "State": "OH", "Severity": 2, "Start_Time": datetime(2020, 1, 1),
+                      "Zipcode": "45424", "Distance(mi)": 0.5} for i in range(10)])
+    assert parquet_mirror.export_clean(db) == 10
+
+    for field, value in [("Zipcode", 45424), ("Distance(mi)", "n/a")]:
+        col.insert_one({"ID": "A-bad", "State": "OH", "Severity": 2, "Start_Time": datetime(2020, 1, 2), field: value})
+        with pytest.raises(ValueError, match=re.escape(field)):
+            parquet_mirror.export_clean(db)
+        col.delete_one({"ID": "A-bad"})
+
+    assert parquet_mirror.read_layer("accidents_clean").num_rows == 10
+    assert parquet_mirror.read_manifest("accidents_clean")["rows"] == 10
+    assert parquet_mirror.export_gold(db, "accidents_aggregated") == 0
+    assert not os.path.exists(parquet_mirror.layer_path("accidents_aggregated"))
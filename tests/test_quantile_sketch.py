@@ -0,0 +1,35 @@
+import random
+from quantile_sketch import KLLSketch, Distribution, HISTOGRAM_BINS, bin_index
+
+
+def test_kll_sketch_merges_and_stays_accurate():
+    """
+    Test 8: Proves two merged KLL sketches give percentiles within 1% rank error and exact histogram counts
+    """
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 3) for _ in range(100_000)]
+
+    left, right = Distribution("distance", rng=random.Random(1)), Distribution("distance", rng=random.Random(2))
+    for i, v in enumerate(values):
+        (left if i % 2 else right).add(v)
+    left.add(None)
+    left.add(float("nan"))
+    left.merge(right)
+
+    result = left.to_dict()
+    assert result["n"] == len(values)
+
+    ordered = sorted(values)
+    for q, estimate in zip([0.5, 0.9, 0.99], result["percentiles"]):
+        rank = sum(v <= estimate for v in ordered) / len(ordered)
+        assert abs(rank - q) < 0.01
+
+    expected = [0] * len(HISTOGRAM_BINS["distance"])
+    for v in values:
+        expected[bin_index(HISTOGRAM_BINS["distance"], v)] += 1
+    assert result["hist"] == expected
+    assert sum(result["hist"]) == len(values)
+
+    # memory stays bounded however many values went in
+    assert sum(len(level) for level in left.sketch.levels) < 3 * left.sketch.k
+    assert KLLSketch().quantiles([0.5]) == [None]
@@ -0,0 +1,33 @@
+from query_modeling import summarize_explain, redundant_indexes, INDEX_PLAN
+
+
+def test_index_advisor_reads_explain_and_finds_redundant_indexes():
+    """
+    Test 9: Proves the index advisor tells COLLSCAN, IXSCAN and covered plans apart and only drops prefix indexes
+    """
+    collscan = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+                "executionStats": {"nReturned": 10, "totalKeysExamined": 0, "totalDocsExamined": 5000,
+                                   "executionTimeMillis": 40}}
+    fetch = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {
+                 "stage": "IXSCAN", "indexName": "idx_clean_start_time"}}},
+             "executionStats": {"nReturned": 10, "totalKeysExamined": 10, "totalDocsExamined": 10}}
+    # aggregate explain: the plan sits inside the $cursor stage
+    covered = {"stages": [{"$cursor": {
+                   "queryPlanner": {"winningPlan": {"stage": "PROJECTION_COVERED", "inputStage": {
+                       "stage": "IXSCAN", "indexName": "idx_clean_agg_covering"}}},
+                   "executionStats": {"nReturned": 10, "totalKeysExamined": 10, "totalDocsExamined": 0}}},
+               {"$group": {}}]}
+
+    assert summarize_explain(collscan)["access"] == "COLLSCAN"
+    assert summarize_explain(collscan)["docs_examined"] == 5000
+    assert summarize_explain(fetch)["access"] == "IXSCAN"
+    assert summarize_explain(covered) == {"access": "COVERED", "indexes": ["idx_clean_agg_covering"],
+                                          "keys_examined": 10, "docs_examined": 0, "returned": 10, "millis": 0}
+
+    existing = {
+        "_id_": {"key": [("_id", 1)]},
+        "idx_clean_id_unique": {"key": [("ID", 1)], "unique": True},
+        "idx_clean_state_severity": {"key": [("State", 1), ("Severity", 1)]},
+        "idx_clean_weather": {"key": [("Weather_Condition", 1)]},
+    }
+    assert redundant_indexes(existing, INDEX_PLAN["accidents_clean"]) == ["idx_clean_state_severity"]
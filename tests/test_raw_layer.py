@@ -1,18 +1,11 @@
-import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from pipeline.storage import get_db
 
 
 def test_raw_layer_has_required_volume():
     """
     Test 2: Proves the RAW layer exists and contains > 1,000,000 documents.
     """
-    load_dotenv()
-    uri = os.getenv("MONGO_URI")
-    assert uri is not None and uri != "", "MONGO_URI missing"
-
-    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
-    db = client["bigdata_capstone"]
+    db = get_db()
     raw = db["accidents_raw"]
 
     row_count = raw.count_documents({})
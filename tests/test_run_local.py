@@ -0,0 +1,103 @@
+import csv
+import random
+from collections import Counter
+import pytest
+from csv_parsing import ACCIDENT_COLUMNS, STRING, INT, FLOAT, BOOL
+
+pytest.importorskip("mongomock")
+
+from pipeline import storage, run_local
+import ingest_accidents
+
+
+def write_sample_csv(path, rows, rng):
+    expected = Counter()
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(ACCIDENT_COLUMNS))
+        writer.writeheader()
+        for i in range(rows):
+            state, severity = rng.choice(["CA", "TX", "FL"]), rng.randint(1, 4)
+            expected[(state, severity)] += 1
+            row = {}
+            for column, kind in ACCIDENT_COLUMNS.items():
+                if kind == INT:
+                    row[column] = severity
+                elif kind == FLOAT:
+                    row[column] = round(rng.uniform(0, 90), 3)
+                elif kind == BOOL:
+                    row[column] = rng.choice(["True", "False"])
+                elif kind == STRING:
+                    row[column] = f"{column}-{i % 7}"
+            row.update({
+                "ID": f"A-{i}",
+                "State": state,
+                "Start_Time": f"2021-03-{1 + i % 28:02d} 08:{i % 60:02d}:00",
+                "End_Time": f"2021-03-{1 + i % 28:02d} 09:{i % 60:02d}:00",
+                "Weather_Timestamp": f"2021-03-{1 + i % 28:02d} 07:53:00",
+            })
+            writer.writerow(row)
+    return expected
+
+
+def test_pipeline_runs_in_memory_end_to_end(tmp_path, monkeypatch):
+    """
+    Test 13: Proves bronze -> silver -> gold runs in one process on the in-memory
+    backend (no MONGO_URI, no server) and the gold counts match the CSV.
+    """
+    rng = random.Random(13)
+    csv_path = tmp_path / "sample.csv"
+    expected = write_sample_csv(csv_path, 300, rng)
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+
+    timings = run_local.run(["ingest", "silver", "gold"])
+    assert list(timings) == ["ingest", "silver", "gold"]
+
+    db = storage.get_db()
+    assert db["accidents_raw"].count_documents({}) == 300
+    assert db["accidents_clean"].count_documents({}) == 300
+
+    gold = {(d["State"], d["Severity"]): d["accident_count"] for d in db["accidents_aggregated"].find({})}
+    assert gold == dict(expected)
+    assert "accidents_aggregated_staging" not in db.list_collection_names()
+
+    # a second run starts from an empty database instead of resuming
+    run_local.run(["ingest"])
+    assert db["accidents_raw"].count_documents({}) == 300
+
+
+def test_ingest_keeps_every_row_and_replays_idempotently(tmp_path, monkeypatch):
+    """
+    Test 21: Proves bronze keeps every CSV row (repeated IDs included) under its row
+    number, a replayed load does not add rows, and silver keeps the first copy of an ID.
+    """
+    from pipeline.synthetic_accidents import write_synthetic_csv
+
+    csv_path = tmp_path / "synthetic.csv"
+    injected = write_synthetic_csv(str(csv_path), 300, seed=21)
+    assert injected["duplicate_ids"] > 0
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+    monkeypatch.setattr(ingest_accidents, "CHUNK_SIZE", 64)
+
+    run_local.run(["ingest", "silver"])
+    db = storage.get_db()
+    raw = db["accidents_raw"]
+    assert sorted(d["_id"] for d in raw.find({}, {"_id": 1})) == list(range(300))
+
+    # replay the whole file: every row is upserted onto itself
+    monkeypatch.setattr(ingest_accidents, "RESET_CHECKPOINTS", True)
+    run_local.run_stage("ingest")
+    assert raw.count_documents({}) == 300
+
+    first_copy = {}
+    for doc in raw.find({}).sort("_id", 1):
+        first_copy.setdefault(doc["ID"], doc["_id"])
+    clean = db["accidents_clean"]
+    assert clean.count_documents({}) == len(first_copy) == 300 - injected["duplicate_ids"]
+    for accident_id, row in first_copy.items():
+        assert clean.find_one({"ID": accident_id})["Start_Lat"] == raw.find_one({"_id": row})["Start_Lat"]
@@ -0,0 +1,32 @@
+from schema_profiler import HyperLogLog, FieldProfile
+
+
+def test_hyperloglog_distinct_counts_stay_within_error():
+    """
+    Test 24: Proves HyperLogLog distinct counts stay within 5% (about three standard errors)
+    from small to large sets, ignore repeats, and merge to the same sketch as the union.
+    """
+    for n in [50, 1_000, 20_000, 100_000]:
+        sketch = HyperLogLog()
+        for i in range(n):
+            sketch.add(f"A-{i}")
+            sketch.add(f"A-{i}")   # repeats do not count
+        assert abs(sketch.estimate() - n) <= 0.05 * n
+
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(30_000):
+        left.add(i)
+        union.add(i)
+    for i in range(20_000, 50_000):
+        right.add(i)
+        union.add(i)
+    left.merge(right)
+    assert left.registers == union.registers
+    assert abs(left.estimate() - 50_000) <= 0.05 * 50_000
+
+    # the same value with a different type is a different value (1 vs "1")
+    profile = FieldProfile()
+    for v in [1, "1", 1, None]:
+        profile.add(v)
+    assert profile.hll.estimate() == 2
+    assert profile.types == {"int": 2, "str": 1, "None": 1}
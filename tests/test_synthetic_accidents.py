@@ -0,0 +1,76 @@
+import csv
+from collections import Counter
+import pytest
+from csv_parsing import ACCIDENT_COLUMNS, CHUNK_READERS
+from pipeline.synthetic_accidents import write_synthetic_csv, DIRTY_VALUES, BAD_TIMESTAMPS
+from pipeline.benchmark_pipeline import compare, previous_result
+
+
+def test_synthetic_generator_is_seeded_and_dirty(tmp_path):
+    """
+    Test 14: Proves the benchmark generator is reproducible, matches the US Accidents
+    columns, injects duplicates / dirty strings / bad timestamps, and that runs compare.
+    """
+    first, second, other = tmp_path / "a.csv", tmp_path / "b.csv", tmp_path / "c.csv"
+    stats = write_synthetic_csv(str(first), 5000, seed=7)
+    write_synthetic_csv(str(second), 5000, seed=7)
+    write_synthetic_csv(str(other), 5000, seed=8)
+
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+    with open(first, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == list(ACCIDENT_COLUMNS)
+    assert len(rows) == 5000
+
+    ids = Counter(r["ID"] for r in rows)
+    assert sum(n - 1 for n in ids.values()) == stats["duplicate_ids"] > 0
+    assert sum(r["Start_Time"] in BAD_TIMESTAMPS or r["End_Time"] in BAD_TIMESTAMPS for r in rows) \
+        == stats["bad_timestamps"] > 0
+    assert any(r["City"] in DIRTY_VALUES for r in rows)
+    assert 0.3 < sum(r["End_Lat"] == "" for r in rows) / len(rows) < 0.6
+
+    # the typed parser reads every row with the declared types
+    parsed = [r for chunk in CHUNK_READERS["typed"](str(first), 2000) for r in chunk]
+    assert len(parsed) == 5000
+    assert {r["Severity"] for r in parsed} <= {1, 2, 3, 4}
+
+    old = {"backend": "local mongod", "stages": {"ingest": {"seconds": 10.0}, "gold": {"seconds": 2.0}}}
+    new = {"backend": "local mongod", "stages": {"ingest": {"seconds": 8.0}, "gold": {"seconds": 3.0}}}
+    history = [{"results": {"5000": old}}, {"results": {"5000": {**old, "backend": "in-memory mongomock"}}}]
+    assert previous_result(history, "local mongod", 5000) is old
+    assert compare(new, old) == {"ingest": -20.0, "gold": 50.0}
+
+
+def test_synthetic_duplicates_reach_silver_and_only_bad_times_fail(tmp_path, monkeypatch, capsys):
+    """
+    Test 27: Proves a synthetic CSV loaded with the default parser keeps Zipcode as a string
+    (a share are ZIP+4), silver dedup drops exactly the injected duplicate IDs, and the only
+    validation failures are the injected bad timestamps.
+    """
+    pytest.importorskip("mongomock")
+    from pipeline import storage, run_local
+    from validate_accidents_schema import validate_cursor
+    from validation_report import ValidationSummary
+    import ingest_accidents
+
+    csv_path = tmp_path / "synthetic.csv"
+    stats = write_synthetic_csv(str(csv_path), 400, seed=14)
+    assert stats["duplicate_ids"] > 0 and stats["bad_timestamps"] > 0
+
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(ingest_accidents, "CSV_PATH", str(csv_path))
+    monkeypatch.setattr(ingest_accidents, "CHUNK_SIZE", 100)
+    run_local.run(["ingest", "silver"])
+
+    assert f"Duplicates skipped: {stats['duplicate_ids']}" in capsys.readouterr().out
+    db = storage.get_db()
+    clean = db["accidents_clean"]
+    assert clean.count_documents({}) == 400 - stats["duplicate_ids"]
+    assert clean.count_documents({"Zipcode": {"$regex": "-"}}) > 0
+
+    summary = validate_cursor(clean.find({}, {"_id": 0}), ValidationSummary("rules"))
+    assert summary.invalid <= stats["bad_timestamps"]
+    assert {rule.split(":")[0] for rule in summary.rule_failures} <= {"Start_Time", "End_Time"}
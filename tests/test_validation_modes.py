@@ -0,0 +1,57 @@
+from datetime import datetime
+from benchmark_validation import make_clean_docs
+from validate_accidents_schema import validate_batch_adapter, validate_batch_rules
+
+
+def test_fast_validators_agree():
+    """
+    Test 7: Proves the TypeAdapter batch path and the vectorized rule engine flag the same invalid documents
+    """
+    docs = make_clean_docs(2000, invalid_rate=0.05)
+
+    adapter_valid, adapter_failures, adapter_invalid = validate_batch_adapter(docs)
+    rules_valid, rules_failures, rules_invalid = validate_batch_rules(docs)
+
+    assert adapter_valid == rules_valid < len(docs)
+    assert {i for i, _ in adapter_invalid} == {i for i, _ in rules_invalid}
+    assert sum(adapter_failures.values()) == sum(rules_failures.values())
+
+
+
+def test_rules_follow_pydantic_defaults_and_coercions():
+    """
+    Test 30: Proves the rule engine follows pydantic's defaults and lax coercions:
+    absent State/Country, numeric strings, 1 for a bool and ISO-string times are valid
+    in both modes, while explicit nulls, text, fractions and out-of-range values fail in both.
+    """
+    base = {"Severity": 2, "Start_Time": datetime(2021, 1, 1, 8), "End_Time": datetime(2021, 1, 1, 9),
+            "Start_Lat": 39.7, "Start_Lng": -84.2, "State": "OH", "Country": "US", "Zipcode": "45424",
+            "Traffic_Signal": False}
+    valid = {
+        "lat-string": {"Start_Lat": "30.5"},
+        "signal-int": {"Traffic_Signal": 1},
+        "signal-string": {"Traffic_Signal": "true"},
+        "time-iso-string": {"Start_Time": "2021-01-01T08:00:00"},
+        "severity-whole-float": {"Severity": 3.0},
+        "severity-string": {"Severity": "4"},
+    }
+    invalid = {
+        "state-null": {"State": None},
+        "state-long": {"State": "Ohio"},
+        "lat-text": {"Start_Lat": "north"},
+        "lat-range-string": {"Start_Lat": "95"},
+        "lat-nan": {"Start_Lat": float("nan")},
+        "severity-fraction": {"Severity": 2.5},
+        "zip-int": {"Zipcode": 45424},
+        "time-text": {"Start_Time": "not a date"},
+        "signal-text": {"Traffic_Signal": "maybe"},
+    }
+    docs = [dict(base, ID=name, **change) for name, change in {**valid, **invalid}.items()]
+    no_state = dict(base, ID="no-state-country")
+    del no_state["State"], no_state["Country"]
+    docs.append(no_state)
+
+    for validate in [validate_batch_adapter, validate_batch_rules]:
+        n_valid, _, failed = validate(docs)
+        assert n_valid == len(valid) + 1
+        assert {i for i, _ in failed} == set(invalid)
@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+from validation_report import Reservoir, ValidationSummary
+
+
+def failure(accident_id, *rules):
+    return accident_id, [{"loc": (field,), "type": kind} for field, kind in rules]
+
+
+def test_summaries_merge_and_reservoirs_sample_uniformly():
+    """
+    Test 23: Proves ValidationSummary.add_batch counts rules and samples failing IDs,
+    merged worker summaries equal one summary of all batches, and Reservoir (also after
+    merge) keeps a uniform sample weighted by how many items each side saw.
+    """
+    batches = [
+        (10, 7, Counter({"City:string_type": 2, "Zipcode:string_type": 1}),
+         [failure("A-1", ("City", "string_type")),
+          failure("A-2", ("City", "string_type"), ("Zipcode", "string_type")),
+          failure("A-3", ("Zipcode", "string_type"))]),
+        (5, 4, Counter({"City:string_type": 1}), [failure("A-9", ("City", "string_type"))]),
+    ]
+    whole = ValidationSummary("rules", sample_size=2)
+    parts = [ValidationSummary("rules", sample_size=2) for _ in batches]
+    for batch, part in zip(batches, parts):
+        whole.add_batch(*batch)
+        part.add_batch(*batch)
+    parts[0].merge(parts[1])
+
+    for summary in [whole, parts[0]]:
+        assert (summary.processed, summary.valid, summary.invalid) == (15, 11, 4)
+        assert summary.rule_failures == Counter({"City:string_type": 3, "Zipcode:string_type": 1})
+        assert summary.samples["City:string_type"].seen == 3
+        assert len(summary.samples["City:string_type"].items) == 2
+        assert set(summary.samples["City:string_type"].items) <= {"A-1", "A-2", "A-9"}
+        assert set(summary.samples["Zipcode:string_type"].items) == {"A-2", "A-3"}
+    assert whole.to_dict()["rules"]["City:string_type"]["failures"] == 3
+
+    # every item of a stream is equally likely to be kept (5 of 50 -> 10% each)
+    rng = random.Random(23)
+    kept = Counter()
+    for _ in range(4000):
+        reservoir = Reservoir(5, rng)
+        for item in range(50):
+            reservoir.add(item)
+        kept.update(reservoir.items)
+    assert all(300 < kept[item] < 500 for item in range(50))
+
+    # a merged sample draws from each side in proportion to what it saw (100 vs 300 items)
+    from_first = 0
+    for _ in range(1000):
+        first, second = Reservoir(20, rng), Reservoir(20, rng)
+        for item in range(100):
+            first.add(item)
+        for item in range(100, 400):
+            second.add(item)
+        first.merge(second)
+        assert first.seen == 400 and len(first.items) == 20 == len(set(first.items))
+        from_first += sum(item < 100 for item in first.items)
+    assert 0.22 < from_first / 20_000 < 0.28